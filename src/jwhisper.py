@@ -1,48 +1,150 @@
 import threading
 import time
+import_start = time.time()  # Startup timing includes the imports below
 import sys
 import os
-from typing import List
 import logging
 from logging.handlers import RotatingFileHandler
-from datetime import datetime
-import subprocess
-
-import numpy as np
-import sounddevice as sd
-from pynput import keyboard
-from pynput.keyboard import Controller, Key
-from faster_whisper import WhisperModel
-import pyperclip
-import pyautogui
-import winsound
-
-# System tray imports
-import pystray
-from PIL import Image, ImageDraw
-import winreg
-import win32api
-import win32con
-import win32gui_struct
-import win32gui
-
-# Disable pyautogui failsafe
-pyautogui.FAILSAFE = False
+
+# Desktop libraries (pywin32, pystray, pynput, sounddevice) are imported by the platform backend
+# and in main(), so this module also imports headless
+from jwhisper_audio import CaptureConverter, RingBuffer, trim_silence, quietest_point
+from jwhisper_engine import (
+    SAMPLE_RATE, DECODE_OPTIONS, BATCH_MAX_CLIP_SEC,
+    REJECT_EMPTY, REJECT_TOO_SHORT, REJECT_TOO_QUIET, REJECT_NO_SPEECH, REJECT_NO_TEXT,
+    warm_up_model, choose_decode, gate_clip, normalize_audio, transcribe_audio, with_language,
+    prepare_clip, apply_decode, transcribe_batch,
+)
+from jwhisper_cache import ResultCache, fingerprint
+from jwhisper_commands import CommandMatcher, KIND_KEY
+from jwhisper_config import SETTINGS, LIVE, MODEL, ConfigError, ConfigWatcher, load_config
+from jwhisper_insert import ClipboardPasteBackend, TypingBackend, TextInserter, IncrementalInserter
+from jwhisper_metrics import metrics
+from jwhisper_models import ModelPool, route_model, plan_cpu_threads, load_tuning
+from jwhisper_platform import NullPlatform, TrayItem, load_platform
+from jwhisper_server import RemoteModelPool, start_server
+from jwhisper_streaming import StreamingTranscriber
+from jwhisper_worker import TranscriptionWorker
 
 # -------------------- SETTINGS --------------------
-SAMPLE_RATE = 16000         
-CHANNELS = 1                
+# Any setting below can be overridden in CONFIG_FILE (JSON, same names); changes are picked up while running
+CONFIG_FILE = "jwhisper_config.json"
+CONFIG_POLL_SEC = 1.0
+
+CAPTURE_SAMPLE_RATE = None  # None = the input device's own rate; resampled to 16 kHz off the audio thread
+CHANNELS = None             # None = the input device's own channel count; mixed down to mono
 DTYPE = "float32"           
-PUSH_TO_TALK_KEY = keyboard.Key.f9  
+RING_BUFFER_SEC = 120       # Preallocated capture buffer; longer recordings keep only the newest audio
+PREROLL_MS = 300            # Audio kept from just before F9 so the first syllable isn't clipped; 0 disables
+MAX_RECORDING_SEC = 600     # Recording stops by itself after this long (e.g. a stuck key)
+CHUNK_SEC = 30              # Longer recordings are decoded in chunks of about this length while recording
+CHUNK_SEARCH_SEC = 3        # Chunks are cut at the quietest moment within this many seconds of the limit
+PUSH_TO_TALK_KEY = "f9"        # pynput key name ("f9", "scroll_lock", ...) or a single character
+PLATFORM = "auto"              # "windows", or "null" to run headless (no tray, sounds or real insertion)
 
 WHISPER_MODEL_NAME = "small"   
 WHISPER_DEVICE = "cpu"         
 WHISPER_COMPUTE_TYPE = "int8"  
+WHISPER_CPU_THREADS = None     # Threads per decode; None splits the cores left after CPU_RESERVED_CORES, 0 is the library default (4)
+WHISPER_NUM_WORKERS = 1        # Decodes one model instance can run at the same time
+MODEL_REPLICAS = 1             # Copies of each model; concurrent decodes (streaming, chunks, server clients) use separate copies
+CPU_RESERVED_CORES = 2         # Cores left to the audio callback and UI
+INFERENCE_CPU_CORES = []       # Pin the inference server to these cores, e.g. list(range(2, 16)); server only
+TUNING_FILE = "jwhisper_tuning.json"  # Written by jwhisper_bench.py --tune; overrides the three settings above
+WARMUP_ENABLED = True          # Run a short synthetic decode right after loading
+WARMUP_AUDIO_SEC = 1.0
+PARALLEL_STARTUP = True        # Start hotkeys and audio while the model loads; early recordings wait in the queue
+
+BEAM_SIZE = 5                  # Decoding when ADAPTIVE_DECODING is off
+BEST_OF = 5
+TEMPERATURE = 0.0
+
+# Adaptive decoding: pick beam size and model per utterance instead of always beam 5
+ADAPTIVE_DECODING = True
+DECODE_PROFILES = [            # (clip up to N seconds or None for longer, beam_size, best_of, model tier)
+    (3.0, 1, 1, "default"),    # Short commands - greedy
+    (15.0, 3, 3, "default"),
+    (None, 5, 5, "default"),
+]
+BUSY_QUEUE_DEPTH = 2           # With this many recordings waiting, decode greedily on the "fast" tier
+FAST_MODEL_NAME = None         # Smaller model for the "fast" tier, e.g. "base"; None reuses the main model
 
 LANGUAGE = None  # Auto-detect language                
+LANGUAGE_ID_MODEL = None       # Small model that identifies the language before routing, e.g. "tiny"
+LANGUAGE_ID_MIN_PROBABILITY = 0.5
+
+# Model pool: several models can stay loaded; routes pick one per utterance
+MODEL_ROUTES = [               # (clip up to N seconds or None, language or None for any, model name) - first match wins
+    # (3.0, None, "base"),     # Clips that match no route use WHISPER_MODEL_NAME
+]
+MODEL_POOL_MAX_MB = 2000       # Idle models are unloaded, least recently used first, above this estimate
+
+# Inference server: models live in a background process that survives restarts of this script
+INFERENCE_SERVER = False       # Decode through jwhisper_server.py, launching it if it isn't running
+INFERENCE_SERVER_PORT = 50731
 MIN_SPEECH_SEC = 0.5           
 AUDIO_THRESHOLD = 0.001        
 
+# Energy VAD: trim silence before Whisper sees the clip, so it decodes fewer seconds
+VAD_TRIM_ENABLED = True
+VAD_FRAME_MS = 30
+VAD_THRESHOLD_DB = 10.0        # Speech is this far above the noise floor
+VAD_PADDING_MS = 200           # Audio kept around speech
+VAD_MAX_PAUSE_MS = 1000        # Longer pauses inside the clip are shortened; 0 keeps them all
+
+# Streaming: decode rolling windows while F9 is held so only the tail is left on release
+STREAMING_ENABLED = True
+STREAM_INTERVAL_SEC = 1.0      # Pause between rolling passes
+STREAM_MIN_WINDOW_SEC = 2.0    # Don't decode less uncommitted audio than this while recording
+STREAM_STABLE_MARGIN_SEC = 1.0 # Never commit segments this close to the live edge
+STREAM_MAX_WINDOW_SEC = 25.0   # Force commits before the window outgrows Whisper's 30s context
+
+# Transcription worker: what to do when F9 is pressed while the last recording is still decoding
+WORKER_POLICY = "queue"        # "queue", "preempt" (drop the old one) or "merge" (insert both together)
+WORKER_MAX_PENDING = 4         # Recordings waiting beyond this are dropped
+BATCH_MAX_SIZE = 4             # Queued recordings decoded together in one batched pass; 1 disables batching
+BATCH_WINDOW_SEC = 0.0         # Extra wait for more recordings before decoding a batch that isn't full
+
+# Text insertion
+INSERT_BACKEND = "clipboard"   # "clipboard" (paste with Ctrl+V) or "type" (simulated key presses)
+INSERT_ROUTES = [              # (window title or program name substring, backend) - first match wins
+    # ("putty.exe", "type"),
+]
+CLIPBOARD_CONFIRM_TIMEOUT_SEC = 0.5  # Longest wait for the clipboard to take the text
+CLIPBOARD_RESTORE = True       # Put the previous clipboard contents back after pasting
+CLIPBOARD_RESTORE_DELAY_SEC = 0.3    # Time the target window gets to read the clipboard first
+INCREMENTAL_INSERT = False     # Type words while F9 is still held as streaming commits them (needs STREAMING_ENABLED)
+
+# Spoken commands: short phrases that press keys or insert a snippet instead of being typed
+COMMAND_KEY = None             # e.g. "f8": hold it to say a command; None disables the key
+COMMAND_AUTO_DETECT = False    # Also try short F9 recordings as commands before dictating them
+COMMAND_MAX_SEC = 2.0          # Longer recordings are never commands
+COMMAND_MODEL = "tiny"         # Small model that recognizes commands in well under 100 ms
+COMMAND_MIN_SCORE = 0.8        # Similarity (0-1) between what was heard and a phrase; below it the clip is dictated
+COMMANDS = [                   # (phrase, "key" or "text", key combination or snippet)
+    ("enter", "key", "enter"),
+    ("new line", "key", "shift+enter"),
+    ("undo", "key", "ctrl+z"),
+    ("redo", "key", "ctrl+y"),
+    ("select all", "key", "ctrl+a"),
+    ("delete", "key", "backspace"),
+]
+
+# Result cache: phrases you say over and over are answered without running Whisper
+RESULT_CACHE_ENABLED = False
+RESULT_CACHE_FILE = "jwhisper_cache.npz"  # Kept next to the log; None keeps the cache in memory only
+RESULT_CACHE_MAX_ENTRIES = 500
+RESULT_CACHE_THRESHOLD = 0.97  # Fingerprint similarity (0-1) needed to reuse a stored text
+RESULT_CACHE_MAX_CLIP_SEC = 5.0  # Only clips up to this long (after VAD) are cached
+
+# Metrics: per-stage histograms and rejection counters
+METRICS_FILE = "jwhisper_metrics.json"  # Flushed next to the log; None disables
+METRICS_FLUSH_SEC = 10
+METRICS_PORT = None            # e.g. 8765 serves JSON on http://127.0.0.1:8765/metrics
+
+# Built-in values, restored when a setting is removed from CONFIG_FILE
+DEFAULT_SETTINGS = {name: globals()[name] for name in SETTINGS}
+
 # -------------------- LOGGING SETUP --------------------
 def setup_logging():
     """Setup rotating log file for JWhisper activities"""
@@ -67,66 +169,66 @@ def setup_logging():
     
     return logger
 
-# Initialize logging
-logger = setup_logging()
+# The log file is attached in main(), so importing this module has no side effects
+logger = logging.getLogger('JWhisperHotkey')
 
-# Create status file to indicate service is running
+# Status file to indicate service is running
 status_file = os.path.join(os.environ.get('TEMP', ''), 'jwhisper_running.lock')
 
-# Check if already running
-if os.path.exists(status_file):
+def acquire_instance_lock():
+    """Write the status file; exits if another instance is still running"""
+    if os.path.exists(status_file):
+        try:
+            with open(status_file, 'r') as f:
+                old_pid = int(f.read())
+            # Check if old process still running - only this PID, not every process on the system
+            name = platform_backend.process_name(old_pid) if old_pid != os.getpid() else None
+            if name is not None and (not name or "python" in name.lower()):
+                logger.error("Another instance is already running!")
+                print("ERROR: JWhisper is already running in system tray!")
+                sys.exit(1)
+        except (OSError, ValueError):
+            pass  # File exists but can't read/check - continue
+    
     try:
-        with open(status_file, 'r') as f:
-            old_pid = int(f.read())
-        # Check if old process still running
-        import psutil
-        if old_pid in [p.pid for p in psutil.process_iter() if p.name() == 'pythonw.exe']:
-            logger.error("Another instance is already running!")
-            print("ERROR: JWhisper is already running in system tray!")
-            sys.exit(1)
-    except:
-        pass  # File exists but can't read/check - continue
-
-try:
-    with open(status_file, 'w') as f:
-        f.write(str(os.getpid()))
-    logger.info(f"Created status file: {status_file}")
-except Exception as e:
-    logger.error(f"Failed to create status file: {e}")
+        with open(status_file, 'w') as f:
+            f.write(str(os.getpid()))
+        logger.info(f"Created status file: {status_file}")
+    except Exception as e:
+        logger.error(f"Failed to create status file: {e}")
 
 # -------------------- GLOBAL STATE --------------------
 recording_flag = False
-buffer_lock = threading.Lock()
-buffers: List[np.ndarray] = []  
-kb = Controller()
-tray_icon = None
+audio_ring = None             # Capture RingBuffer, sized from RING_BUFFER_SEC in main() once settings are loaded
+preroll_samples = 0
+current_recording = None
+recording_lock = threading.Lock()  # Start, stop and chunk splits come from different threads
+last_recording_end = 0      # Ring position where the previous recording stopped
+transcription_worker = None
+platform_backend = NullPlatform()  # Replaced by the PLATFORM backend in main()
+text_inserter = None
 audio_stream = None
+capture_converter = None      # Set when the device doesn't capture 16 kHz mono itself
 keyboard_listener = None
-model = None
+push_to_talk = None            # pynput key resolved from PUSH_TO_TALK_KEY in main()
+command_key = None             # pynput key resolved from COMMAND_KEY in main()
+command_matcher = None
+model_pool = None
+result_cache = None
+config_watcher = None
+model_swap_lock = threading.Lock()
+restart_pending = {}        # Settings file values that only apply after a restart
+model_ready = threading.Event()
+model_failed = threading.Event()
+hotkeys_ready = threading.Event()
+startup_lock = threading.Lock()
+startup_stages = {}         # Startup stage name -> seconds
+time_to_ready = None        # Seconds from process start until the first dictation can be decoded
 is_running = True
-recording_start_time = None
 start_time = time.time()  # Track when application started
 
 # -------------------- TRAY ICON --------------------
-def create_icon_image():
-    """Create an icon for the system tray"""
-    # Create a simple microphone icon
-    width = 64
-    height = 64
-    image = Image.new('RGB', (width, height), color='white')
-    draw = ImageDraw.Draw(image)
-    
-    # Draw a simple microphone shape
-    # Microphone body
-    draw.ellipse([20, 10, 44, 40], fill='black')
-    # Microphone stand
-    draw.rectangle([30, 40, 34, 50], fill='black')
-    # Microphone base
-    draw.rectangle([20, 50, 44, 54], fill='black')
-    
-    return image
-
-def on_quit(icon, item):
+def on_quit():
     """Quit the application from tray"""
     global is_running, audio_stream, keyboard_listener
     print("\nExiting from tray...")
@@ -142,6 +244,16 @@ def on_quit(icon, item):
         logger.error(f"Failed to remove status file: {e}")
     
     # Clean shutdown
+    if transcription_worker:
+        transcription_worker.stop()
+    if config_watcher:
+        config_watcher.stop()
+    metrics.stop()  # Final flush of the metrics file
+    save_result_cache()
+    if isinstance(model_pool, RemoteModelPool):
+        model_pool.close()  # The server keeps running with the model loaded
+    if current_recording:
+        current_recording.cancel()
     if audio_stream:
         audio_stream.stop()
         audio_stream.close()
@@ -149,16 +261,14 @@ def on_quit(icon, item):
         keyboard_listener.stop()
     
     # Stop the tray icon
-    icon.stop()
+    platform_backend.stop_tray()
     
     # Exit the application
     os._exit(0)
 
-def on_show_status(icon, item):
+def on_show_status():
     """Show status in a message box"""
     def show_status_window():
-        import ctypes
-        
         # Get process info
         pid = os.getpid()
         uptime = time.time() - start_time if 'start_time' in globals() else 0
@@ -169,12 +279,61 @@ def on_show_status(icon, item):
         log_size = os.path.getsize(log_file) if os.path.exists(log_file) else 0
         log_size_str = f"{log_size/1024:.1f} KB" if log_size < 1024*1024 else f"{log_size/(1024*1024):.1f} MB"
         
+        memory = platform_backend.memory_info()
+        memory_str = f"{memory[0]:.0f} MB (peak {memory[1]:.0f} MB)" if memory else "unknown"
+        
+        if time_to_ready is not None:
+            stages = ", ".join(f"{name} {sec:.1f}s" for name, sec in startup_stages.items())
+            startup_str = f"ready in {time_to_ready:.1f}s ({stages})"
+        else:
+            startup_str = "model loading..." if not model_failed.is_set() else "model failed to load"
+        
+        if model_pool is not None and model_pool.loaded():
+            models_str = ", ".join(f"{name} (~{size_mb:.0f} MB)" for name, size_mb, _ in model_pool.loaded())
+        else:
+            models_str = "none"
+        
+        if preroll_samples:
+            preroll_kb = audio_ring.nbytes * preroll_samples / audio_ring.capacity / 1024
+            preroll_str = (f"{PREROLL_MS} ms ({preroll_kb:.0f} KB "
+                           f"of the fixed {audio_ring.nbytes / (1024 * 1024):.1f} MB capture buffer)")
+        else:
+            preroll_str = "off"
+        
+        latency_lines = []
+        for label, name, unit in (("Decode", "decode_sec", "ms"), ("RTF", "rtf", ""), ("Queue wait", "queue_wait_sec", "ms"),
+                                  ("Paste", "paste_sec", "ms"), ("Total", "processing_sec", "ms")):
+            p50, p95 = metrics.percentiles(name)
+            if p50 is None:
+                continue
+            scale = 1000 if unit else 1
+            latency_lines.append(f"• {label}: p50 {p50 * scale:.{0 if unit else 2}f}{unit} / p95 {p95 * scale:.{0 if unit else 2}f}{unit}")
+        latency_str = "\n".join(latency_lines) if latency_lines else "• no dictations yet"
+        rejected = metrics.counters("rejected.")
+        rejected_str = ", ".join(f"{name.split('.', 1)[1]} {n}" for name, n in rejected.items()) or "none"
+        
+        converter = capture_converter
+        if converter is not None:
+            capture_str = f"{converter.in_rate} Hz x{converter.channels} → {SAMPLE_RATE} Hz mono"
+            if converter.dropped_sec:
+                capture_str += f" ({converter.dropped_sec:.1f}s dropped)"
+        else:
+            capture_str = f"{SAMPLE_RATE} Hz mono"
+        
+        if result_cache is not None:
+            cache_str = (f"{result_cache.hit_rate:.0%} hits, {len(result_cache)} phrases, "
+                         f"{result_cache.saved_sec:.1f}s of decoding saved")
+        else:
+            cache_str = "off"
+        
         status_text = f"""JWhisper Voice-to-Text Status
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 ✅ Service: RUNNING
 📍 Process ID: {pid}
 ⏱️ Uptime: {uptime_str}
 📝 Log size: {log_size_str}
+💾 Memory: {memory_str}
+🚀 Startup: {startup_str}
 
 Hotkeys:
 • F9 (hold) = Start recording
@@ -182,15 +341,17 @@ Hotkeys:
 • ESC = Exit application
 
 Model: {WHISPER_MODEL_NAME}
+Loaded models: {models_str}
+Capture: {capture_str}
+Pre-roll: {preroll_str}
+
+Latency ({metrics.counter("transcriptions")} dictations):
+{latency_str}
+Rejected: {rejected_str}
+Result cache: {cache_str}
 Language: {LANGUAGE if LANGUAGE else 'Auto-detect'}"""
         
-        # Use Windows MessageBox API directly
-        ctypes.windll.user32.MessageBoxW(
-            0, 
-            status_text, 
-            "JWhisper Status", 
-            0x40 | 0x0  # MB_ICONINFORMATION | MB_OK
-        )
+        platform_backend.show_message("JWhisper Status", status_text)
     
     # Run in separate thread to avoid blocking
     status_thread = threading.Thread(target=show_status_window, daemon=True)
@@ -198,12 +359,12 @@ Language: {LANGUAGE if LANGUAGE else 'Auto-detect'}"""
     
     logger.info("Status displayed to user")
 
-def on_view_logs(icon, item):
+def on_view_logs():
     """Open log file in notepad"""
     log_file = os.path.join(os.path.dirname(__file__), 'jwhisper.log')
     try:
         if os.path.exists(log_file):
-            subprocess.run(['notepad.exe', log_file], check=False)
+            platform_backend.open_file(log_file)
             logger.info("Log file opened in notepad")
         else:
             show_notification("JWhisper Hotkey", "No log file found yet. Start using the application to generate logs.", quiet=True)
@@ -211,7 +372,7 @@ def on_view_logs(icon, item):
         logger.error(f"Error opening log file: {e}")
         show_notification("Error", f"Could not open log file: {e}", quiet=True)
 
-def on_restart_service(icon, item):
+def on_restart_service():
     """Restart the whisper service"""
     logger.info("Service restart requested from tray")
     show_notification("JWhisper Hotkey", "Restarting service...", quiet=True)
@@ -222,77 +383,46 @@ def on_restart_service(icon, item):
     
     try:
         # Start new instance
-        subprocess.Popen([vbs_path], shell=True)
+        platform_backend.launch(vbs_path)
         time.sleep(1)
         
         # Exit current instance
         logger.info("Restarting application")
-        on_quit(icon, item)
+        on_quit()
     except Exception as e:
         logger.error(f"Error restarting service: {e}")
         show_notification("Error", f"Could not restart service: {e}", quiet=True)
 
-def toggle_autostart(icon, item):
-    """Toggle autostart in Windows registry"""
+def toggle_autostart():
+    """Toggle autostart at login"""
     app_name = "JWhisperHotkey"
     app_path = sys.executable if getattr(sys, 'frozen', False) else f'"{sys.executable}" "{os.path.abspath(__file__)}"'
     
     try:
-        # Open registry key
-        key = winreg.OpenKey(
-            winreg.HKEY_CURRENT_USER,
-            r"Software\Microsoft\Windows\CurrentVersion\Run",
-            0,
-            winreg.KEY_ALL_ACCESS
-        )
-        
-        # Check if already in autostart
-        try:
-            winreg.QueryValueEx(key, app_name)
-            # Remove from autostart
-            winreg.DeleteValue(key, app_name)
+        if platform_backend.autostart_enabled(app_name):
+            platform_backend.set_autostart(app_name, None)
             print("✓ Removed from autostart")
             show_notification("JWhisper Hotkey", "Removed from autostart", quiet=True)
-        except FileNotFoundError:
-            # Add to autostart
-            winreg.SetValueEx(key, app_name, 0, winreg.REG_SZ, app_path)
+        else:
+            platform_backend.set_autostart(app_name, app_path)
             print("✓ Added to autostart")
             show_notification("JWhisper Hotkey", "Added to autostart", quiet=True)
-        
-        winreg.CloseKey(key)
     except Exception as e:
         print(f"Error toggling autostart: {e}")
 
 def is_in_autostart():
     """Check if app is in autostart"""
-    app_name = "JWhisperHotkey"
-    try:
-        key = winreg.OpenKey(
-            winreg.HKEY_CURRENT_USER,
-            r"Software\Microsoft\Windows\CurrentVersion\Run",
-            0,
-            winreg.KEY_READ
-        )
-        winreg.QueryValueEx(key, app_name)
-        winreg.CloseKey(key)
-        return True
-    except:
-        return False
+    return platform_backend.autostart_enabled("JWhisperHotkey")
 
 def show_notification(title, message, timeout=3000, quiet=False):
-    """Show Windows notification - can be suppressed for quiet operation"""
+    """Show a desktop notification - can be suppressed for quiet operation"""
     if quiet:
         # Only log, don't show notification for quiet operation
         logger.info(f"Notification (quiet): {title} - {message}")
         return
         
     try:
-        # Try to show system tray notification first
-        if tray_icon:
-            tray_icon.notify(message, title)
-        else:
-            # Fallback to message box
-            win32api.MessageBox(0, message, title, win32con.MB_OK | win32con.MB_ICONINFORMATION)
+        platform_backend.notify(title, message)
         logger.info(f"Notification shown: {title} - {message}")
     except Exception as e:
         logger.warning(f"Could not show notification: {e}")
@@ -300,35 +430,72 @@ def show_notification(title, message, timeout=3000, quiet=False):
 
 def setup_tray():
     """Setup system tray icon"""
-    global tray_icon
-    
-    # Create menu
-    menu = pystray.Menu(
-        pystray.MenuItem("Show Status", on_show_status),
-        pystray.MenuItem("View Logs", on_view_logs),
-        pystray.MenuItem("Restart Service", on_restart_service),
-        pystray.Menu.SEPARATOR,
-        pystray.MenuItem("Autostart", toggle_autostart, checked=lambda item: is_in_autostart()),
-        pystray.Menu.SEPARATOR,
-        pystray.MenuItem("Exit", on_quit)
-    )
-    
-    # Create icon
-    image = create_icon_image()
-    tray_icon = pystray.Icon("JWhisperHotkey", image, "JWhisper Voice-to-Text\nF9 to record\nRight-click for options", menu)
-    
-    # Run icon in separate thread
-    threading.Thread(target=tray_icon.run, daemon=True).start()
+    platform_backend.start_tray("JWhisperHotkey", "JWhisper Voice-to-Text\nF9 to record\nRight-click for options", [
+        TrayItem("Show Status", on_show_status),
+        TrayItem("View Logs", on_view_logs),
+        TrayItem("Restart Service", on_restart_service),
+        None,
+        TrayItem("Autostart", toggle_autostart, checked=is_in_autostart),
+        None,
+        TrayItem("Exit", on_quit),
+    ])
 
 # -------------------- MODEL LOADING --------------------
+def record_stage(name, stage_start):
+    """Remember how long a startup stage took"""
+    startup_stages[name] = time.time() - stage_start
+    logger.info(f"Startup stage '{name}': {startup_stages[name]:.2f}s")
+
+def apply_tuning(overridden=()):
+    """Take CPU thread, worker and replica counts from the tuning file, if it was tuned for this model
+
+    Settings already given in the settings file (overridden) are left alone.
+    """
+    tuning = load_tuning(os.path.join(os.path.dirname(__file__), TUNING_FILE)) if TUNING_FILE else None
+    if tuning is None:
+        return
+    tuned_for = (tuning.get("model"), tuning.get("device"), tuning.get("compute_type"))
+    if tuned_for != (WHISPER_MODEL_NAME, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE):
+        logger.info(f"Tuning file is for {'/'.join(map(str, tuned_for))} - not applied")
+        return
+    tuned = {"WHISPER_CPU_THREADS": tuning["cpu_threads"], "WHISPER_NUM_WORKERS": tuning["num_workers"],
+             "MODEL_REPLICAS": tuning["replicas"]}
+    tuned = {name: value for name, value in tuned.items() if name not in overridden}
+    globals().update(tuned)
+    DEFAULT_SETTINGS.update(tuned)  # Removing a setting from the file falls back to the tuned value
+    logger.info(f"Applied tuning: {WHISPER_CPU_THREADS} threads, {WHISPER_NUM_WORKERS} workers, {MODEL_REPLICAS} replicas")
+
+def model_settings():
+    """Current values of the settings that need a model reload"""
+    return {name: globals()[name] for name, setting in SETTINGS.items() if setting.reload == MODEL}
+
+def create_model_pool(settings):
+    """Model pool for the given model settings (see model_settings)"""
+    name = settings["WHISPER_MODEL_NAME"]
+    device, compute_type = settings["WHISPER_DEVICE"], settings["WHISPER_COMPUTE_TYPE"]
+    num_workers, replicas = settings["WHISPER_NUM_WORKERS"], settings["MODEL_REPLICAS"]
+    if INFERENCE_SERVER:
+        # The server loads and warms the model once; later starts find it already resident
+        client = start_server(INFERENCE_SERVER_PORT, device, compute_type, settings["MODEL_POOL_MAX_MB"],
+                              preload=[name], cpu_threads=settings["WHISPER_CPU_THREADS"], num_workers=num_workers,
+                              replicas=replicas, cpu_cores=INFERENCE_CPU_CORES)
+        return RemoteModelPool(client)
+    cpu_threads = plan_cpu_threads(settings["WHISPER_CPU_THREADS"], num_workers, replicas, settings["CPU_RESERVED_CORES"])
+    logger.info(f"CPU threads per decode: {cpu_threads}, workers: {num_workers}, replicas: {replicas}")
+    return ModelPool(device, compute_type, settings["MODEL_POOL_MAX_MB"], pinned=[name],
+                     replicas=replicas, cpu_threads=cpu_threads, num_workers=num_workers)
+
 def load_model():
-    """Load JWhisper model"""
-    global model
+    """Create the model pool and load the main JWhisper model"""
+    global model_pool
     print("Loading JWhisper model...")
     logger.info(f"Loading JWhisper model: {WHISPER_MODEL_NAME} on {WHISPER_DEVICE}")
     
+    stage_start = time.time()
     try:
-        model = WhisperModel(WHISPER_MODEL_NAME, device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE_TYPE)
+        model_pool = create_model_pool(model_settings())
+        model_pool.get(WHISPER_MODEL_NAME)
+        record_stage("model_load", stage_start)
         print(f"Model loaded: {WHISPER_MODEL_NAME}")
         logger.info(f"Model successfully loaded: {WHISPER_MODEL_NAME}")
         # Quiet startup - no notification sound, just log
@@ -338,207 +505,761 @@ def load_model():
         show_notification("Error", f"Failed to load JWhisper model: {e}", quiet=True)
         raise
 
+def preload_models():
+    """Load the language-ID, fast-tier and routed models that fit under the pool cap"""
+    names = [LANGUAGE_ID_MODEL, FAST_MODEL_NAME if ADAPTIVE_DECODING else None]
+    names.append(COMMAND_MODEL if COMMAND_KEY or COMMAND_AUTO_DETECT else None)
+    names += [name for _, _, name in MODEL_ROUTES]
+    names = [name for name in dict.fromkeys(names) if name and not model_pool.is_loaded(name)]
+    if not names:
+        return
+    stage_start = time.time()
+    for name in names:
+        try:
+            model_pool.preload([name])
+            if WARMUP_ENABLED and not INFERENCE_SERVER and model_pool.is_loaded(name):
+                with model_pool.use(name) as extra_model:
+                    warm_up_model(extra_model, WARMUP_AUDIO_SEC)
+        except Exception as e:
+            # The main model still serves every route
+            logger.warning(f"Failed to preload model {name}: {e}")
+    record_stage("extra_models", stage_start)
+
+def resolve_language(audio_chunk):
+    """Language to decode in: LANGUAGE, else what LANGUAGE_ID_MODEL hears, else None (the decoder detects it)"""
+    if LANGUAGE:
+        return LANGUAGE
+    if not LANGUAGE_ID_MODEL:
+        return None
+    try:
+        language, probability = model_pool.detect_language(LANGUAGE_ID_MODEL, audio_chunk)
+    except Exception as e:
+        logger.warning(f"Language detection failed: {e}")
+        return None
+    if probability < LANGUAGE_ID_MIN_PROBABILITY:
+        logger.info(f"Language unclear ({language} {probability:.2f}) - leaving detection to the decoding model")
+        return None
+    return language
+
+def pick_decoding(duration_sec, language):
+    """Return (model name, decode options, choice) for a clip of the given length and language"""
+    model_name = route_model(MODEL_ROUTES, duration_sec, language, WHISPER_MODEL_NAME)
+    decode_options = dict(DECODE_OPTIONS, beam_size=BEAM_SIZE, best_of=BEST_OF, temperature=TEMPERATURE)
+    choice = None
+    if ADAPTIVE_DECODING:
+        queue_depth = transcription_worker.pending if transcription_worker else 0
+        choice = choose_decode(duration_sec, queue_depth, DECODE_PROFILES, BUSY_QUEUE_DEPTH)
+        if choice.tier == "fast" and FAST_MODEL_NAME:
+            model_name = FAST_MODEL_NAME
+        decode_options = choice.options(decode_options)
+    return model_name, with_language(decode_options, language), choice
+
+def prepare_model():
+    """Load and warm up the model, then release any recordings queued in the meantime"""
+    global is_running
+    try:
+        load_model()
+    except Exception as e:
+        logger.critical(f"Failed to initialize model: {e}")
+        show_notification("Critical Error", "Failed to load JWhisper model. Check logs for details.", quiet=True)
+        model_failed.set()
+        is_running = False
+        return False
+    if WARMUP_ENABLED and not INFERENCE_SERVER:  # The server warms its own models
+        stage_start = time.time()
+        try:
+            with model_pool.use(WHISPER_MODEL_NAME) as main_model:
+                warm_up_model(main_model, WARMUP_AUDIO_SEC)
+            record_stage("warm_up", stage_start)
+        except Exception as e:
+            # Not fatal - the first dictation will just be slower
+            logger.warning(f"Model warm-up failed: {e}")
+    model_ready.set()
+    report_ready()
+    # Secondary models load after the main one is already serving
+    preload_models()
+    return True
+
+def wait_for_model():
+    """Block the worker until the model is usable; False if loading failed"""
+    while not model_ready.wait(0.5):
+        if model_failed.is_set() or not is_running:
+            return False
+    return True
+
+def report_ready():
+    """Log time-to-ready once both the model and the hotkey listener are up"""
+    global time_to_ready
+    with startup_lock:
+        if time_to_ready is not None or not model_ready.is_set() or not hotkeys_ready.is_set():
+            return
+        time_to_ready = time.time() - import_start
+    stages = ", ".join(f"{name} {sec:.2f}s" for name, sec in startup_stages.items())
+    print(f"✓ Ready in {time_to_ready:.2f}s")
+    logger.info(f"READY in {time_to_ready:.2f}s ({stages})")
+
+# -------------------- SETTINGS FILE --------------------
+# Live settings that objects built at startup copied, and the attribute that holds them
+WORKER_SETTINGS = {"WORKER_POLICY": "policy", "WORKER_MAX_PENDING": "max_pending",
+                   "BATCH_MAX_SIZE": "max_batch", "BATCH_WINDOW_SEC": "batch_window_sec"}
+INSERT_SETTINGS = ("INSERT_BACKEND", "INSERT_ROUTES", "CLIPBOARD_CONFIRM_TIMEOUT_SEC",
+                   "CLIPBOARD_RESTORE", "CLIPBOARD_RESTORE_DELAY_SEC")
+COMMAND_SETTINGS = ("COMMANDS", "COMMAND_MIN_SCORE")
+
+def config_path():
+    return os.path.join(os.path.dirname(__file__), CONFIG_FILE)
+
+def load_settings():
+    """Apply the settings file before startup; returns the settings it overrides"""
+    try:
+        values = load_config(config_path())
+    except ConfigError as e:
+        logger.error(f"Settings file ignored: {e}")
+        show_notification("Settings Error", f"{CONFIG_FILE} ignored: {e}", quiet=True)
+        return {}
+    globals().update(values)
+    if values:
+        logger.info(f"Settings from {CONFIG_FILE}: {', '.join(sorted(values))}")
+    return values
+
+def apply_settings(values):
+    """Apply a changed settings file: live settings for the next utterance, model settings after a background load"""
+    global text_inserter, command_matcher
+    effective = dict(DEFAULT_SETTINGS, **values)
+    changes = {name: value for name, value in effective.items() if globals()[name] != value}
+    live = {name: value for name, value in changes.items() if SETTINGS[name].reload == LIVE}
+    model = {name: value for name, value in changes.items() if SETTINGS[name].reload == MODEL}
+    restart = {name: value for name, value in changes.items()
+               if name not in live and name not in model and restart_pending.get(name, globals()[name]) != value}
+    for name in [name for name in restart_pending if globals()[name] == effective[name]]:
+        del restart_pending[name]  # Back to the running value - nothing left to restart for
+
+    globals().update(live)
+    if live:
+        logger.info("Settings applied: " + ", ".join(f"{name}={value!r}" for name, value in live.items()))
+    if any(name in live for name in INSERT_SETTINGS):
+        text_inserter = create_inserter()
+    if any(name in live for name in COMMAND_SETTINGS):
+        command_matcher = CommandMatcher(COMMANDS, COMMAND_MIN_SCORE)
+    if transcription_worker:
+        for name, attribute in WORKER_SETTINGS.items():
+            if name in live:
+                setattr(transcription_worker, attribute, live[name])
+    if result_cache is not None and "RESULT_CACHE_THRESHOLD" in live:
+        result_cache.threshold = RESULT_CACHE_THRESHOLD
+    if restart:
+        restart_pending.update(restart)
+        logger.warning(f"Restart JWhisper to apply: {', '.join(restart)}")
+        show_notification("JWhisper Hotkey", f"Restart to apply: {', '.join(restart)}", quiet=True)
+    if model:
+        threading.Thread(target=swap_model, args=(model,), name="JWhisperModelSwap", daemon=True).start()
+
+def swap_model(changes):
+    """Load the model with new settings while the current one keeps serving, then switch over"""
+    global model_pool
+    with model_swap_lock:
+        if not wait_for_model():
+            return
+        if set(changes) == {"MODEL_POOL_MAX_MB"}:
+            # Only the cap changed - the loaded models stay
+            if isinstance(model_pool, ModelPool):
+                model_pool.max_memory_mb = changes["MODEL_POOL_MAX_MB"]
+            globals().update(changes)
+            return
+        settings = dict(model_settings(), **changes)
+        name = settings["WHISPER_MODEL_NAME"]
+        if INFERENCE_SERVER and set(changes) - {"WHISPER_MODEL_NAME"}:
+            logger.warning(f"The running inference server keeps its own {', '.join(sorted(set(changes) - {'WHISPER_MODEL_NAME'}))} "
+                           "- stop it with jwhisper_server.py --stop to apply")
+        logger.info(f"Loading {name} in the background - {WHISPER_MODEL_NAME} keeps serving")
+        stage_start = time.time()
+        try:
+            # A remote swap only needs the new model loaded on the server, which warms it itself
+            new_pool = model_pool if INFERENCE_SERVER else create_model_pool(settings)
+            new_pool.get(name)
+            if WARMUP_ENABLED and not INFERENCE_SERVER:
+                with new_pool.use(name) as new_model:
+                    warm_up_model(new_model, WARMUP_AUDIO_SEC)
+        except Exception as e:
+            logger.error(f"Model swap to {name} failed - still using {WHISPER_MODEL_NAME}: {e}")
+            show_notification("Error", f"Failed to load {name}: {e}", quiet=True)
+            return
+        globals().update(changes)
+        model_pool = new_pool  # Decodes still holding the old pool finish on it; it is freed afterwards
+        logger.info(f"Switched to {name} ({WHISPER_DEVICE}, {WHISPER_COMPUTE_TYPE}) in {time.time() - stage_start:.1f}s")
+        show_notification("JWhisper Hotkey", f"Now using {name}", quiet=True)
+    preload_models()
+
 # -------------------- TEXT INSERTION --------------------
+def create_inserter():
+    """Build the insertion backends and the per-window routing"""
+    backends = [
+        ClipboardPasteBackend(
+            platform_backend.read_clipboard,
+            platform_backend.write_clipboard,
+            platform_backend.send_paste,
+            confirm_timeout=CLIPBOARD_CONFIRM_TIMEOUT_SEC,
+            restore=CLIPBOARD_RESTORE,
+            restore_delay=CLIPBOARD_RESTORE_DELAY_SEC,
+            send_backspace=platform_backend.send_backspace,
+        ),
+        TypingBackend(platform_backend.type_text, platform_backend.send_backspace),
+    ]
+    return TextInserter(backends, INSERT_BACKEND, INSERT_ROUTES, platform_backend.foreground_window)
+
 def insert_text(text):
-    """Insert text with automatic clipboard pasting - prioritized method"""
+    """Insert text into the active window with the backend chosen for it"""
     logger.info(f"Attempting to insert text: {text[:50]}...")
     
-    # Save current clipboard
-    old_clipboard = None
-    try:
-        old_clipboard = pyperclip.paste()
-    except:
-        pass
-    
-    # Copy new text to clipboard
-    pyperclip.copy(text)
-    time.sleep(0.2)  # Increased delay for better reliability
-    
-    # Method 1: Try pyautogui hotkey (most reliable on Windows) - PRIORITIZED
-    try:
-        # Ensure we're not at screen edge (pyautogui failsafe)
-        pyautogui.moveTo(pyautogui.position()[0], pyautogui.position()[1])
-        pyautogui.hotkey('ctrl', 'v')
-        logger.info("✓ Text pasted from clipboard using Ctrl+V")
-        
+    if text_inserter.insert(text):
         # Quiet completion beep - very brief and low volume
-        try:
-            winsound.Beep(800, 150)  # 800Hz for 150ms - quiet success sound
-        except:
-            pass
+        platform_backend.beep(800, 150)  # 800Hz for 150ms - quiet success sound
         return
-    except Exception as e:
-        logger.warning(f"pyautogui hotkey failed: {e}")
     
-    # Method 2: Try pynput Controller
+    # If all fails, leave the text in the clipboard
     try:
-        kb.press(Key.ctrl)
-        kb.press('v')
-        time.sleep(0.01)
-        kb.release('v')
-        kb.release(Key.ctrl)
-        print("✓ Text pasted from clipboard")
-        
-        # Quiet completion beep
-        try:
-            winsound.Beep(800, 150)  # 800Hz for 150ms
-        except:
-            pass
-        return
+        platform_backend.write_clipboard(text)
     except:
         pass
-    
-    # Method 3: Type directly with pyautogui (fallback only)
-    try:
-        time.sleep(0.1)
-        pyautogui.write(text)
-        print("✓ Text typed character by character")
-        
-        # Quiet completion beep
-        try:
-            winsound.Beep(800, 150)  # 800Hz for 150ms
-        except:
-            pass
-        return
-    except:
-        pass
-    
-    # If all fails, text is still in clipboard
     print("✓ Text ready in clipboard. Press Ctrl+V to paste.")
     
     # Quiet completion beep even if auto-paste failed
-    try:
-        winsound.Beep(600, 100)  # Lower tone for partial success
-    except:
-        pass
+    platform_backend.beep(600, 100)  # Lower tone for partial success
 
 # -------------------- AUDIO STREAM --------------------
 def audio_callback(indata, frames, time_info, status):
-    global recording_flag, buffers
-    if recording_flag:
-        with buffer_lock:
-            buffers.append(indata.copy())
+    # Real-time thread: no allocation, no locks - just copy into the ring
+    # Between recordings the ring keeps running so its newest samples are the pre-roll;
+    # not until the model is ready, so recordings queued during loading can't be lapped
+    if recording_flag or (preroll_samples and model_ready.is_set()):
+        if capture_converter is not None:
+            capture_converter.write(indata)  # Mixed down and resampled on the converter thread
+        else:
+            audio_ring.write(indata[:, 0])
+
+def open_audio_stream(sd):
+    """Start capture at the device's own rate and channel count, falling back to 16 kHz mono"""
+    global capture_converter
+    device = sd.query_devices(kind='input')
+    logger.info(f"Using audio device: {device['name']}")
+    native = (CAPTURE_SAMPLE_RATE or int(device['default_samplerate']), CHANNELS or max(1, int(device['max_input_channels'])))
+    last_error = None
+    for rate, channels in dict.fromkeys([native, (native[0], 1), (SAMPLE_RATE, 1)]):
+        # Set before the stream starts, so the first callback already writes to the right place
+        capture_converter = None if (rate, channels) == (SAMPLE_RATE, 1) else CaptureConverter(audio_ring, rate, channels, SAMPLE_RATE)
+        stream = None
+        try:
+            stream = sd.InputStream(callback=audio_callback, channels=channels, samplerate=rate, dtype=DTYPE)
+            stream.start()
+        except Exception as e:
+            last_error = e
+            logger.warning(f"Can't capture at {rate} Hz x{channels}: {e}")
+            if stream is not None:
+                stream.close()
+            continue
+        if capture_converter is not None:
+            capture_converter.start()
+            latency_ms = capture_converter.resampler.latency_sec * 1000 if capture_converter.resampler else 0.0
+            logger.info(f"Capturing at {rate} Hz x{channels} - mixed down and resampled to {SAMPLE_RATE} Hz "
+                        f"every {capture_converter.block_sec * 1000:.0f} ms (filter latency {latency_ms:.1f} ms)")
+        else:
+            logger.info(f"Capturing at {SAMPLE_RATE} Hz mono")
+        return stream
+    capture_converter = None
+    raise last_error
 
 # -------------------- RECORDING LOGIC --------------------
-def start_recording():
-    global recording_flag, buffers, recording_start_time
-    with buffer_lock:
-        buffers = []
-    recording_flag = True
-    recording_start_time = time.time()
+class Recording:
+    """One push-to-talk recording, addressed by its positions in audio_ring"""
+
+    def __init__(self, previous=None):
+        """previous: The chunk this recording continues; None for a new recording"""
+        if previous is None:
+            # Reach back into the ring for the pre-roll, but never into the previous recording
+            self.start_pos = max(audio_ring.write_pos - preroll_samples, last_recording_end, audio_ring.oldest_pos)
+        else:
+            self.start_pos = previous.end_pos
+        self.preroll_sec = (audio_ring.write_pos - self.start_pos) / SAMPLE_RATE if previous is None else 0.0
+        self.end_pos = None  # Still recording while None
+        self.started_at = time.time()
+        self.first_started_at = self.started_at if previous is None else previous.first_started_at
+        self.continuation = previous is not None
+        self.stopped_at = None
+        self.stream = None
+        self.language = None
+        self.command = False        # Recorded with COMMAND_KEY
+        self.command_match = None   # Set once the recording was recognized as a command
+        self.language_resolved = False
+        self.live = None  # IncrementalInserter while words are typed during recording
+        if previous is not None:
+            self.language = previous.language
+            self.language_resolved = previous.language_resolved
+
+    def read(self, start_sample=0):
+        """Return a zero-copy view of the recording, starting at start_sample"""
+        end_pos = audio_ring.write_pos if self.end_pos is None else self.end_pos
+        return audio_ring.view(self.start_pos + start_sample, end_pos)
+
+    def cancel(self):
+        if self.stream:
+            self.stream.cancel()
+        if self.live is not None:
+            self.live.finish()
+
+    def resolve_language(self, audio_chunk):
+        """Decide the language once per recording so every window decodes the same way"""
+        if not self.language_resolved:
+            self.language = resolve_language(audio_chunk)
+            self.language_resolved = True
+        return self.language
+
+def transcribe_window(recording, audio_chunk):
+    """Decode one streaming window into (start, end, text) tuples"""
+    window_sec = len(audio_chunk) / SAMPLE_RATE
+    model_name, decode_options, choice = pick_decoding(window_sec, recording.resolve_language(audio_chunk))
+    decode_start = time.time()
+    with model_pool.use(model_name) as window_model:
+        segments, _ = transcribe_audio(window_model, normalize_audio(audio_chunk), decode_options)
+    if choice is not None:
+        logger.debug(f"Streaming window {window_sec:.1f}s - profile: {choice} | RTF: {(time.time() - decode_start) / window_sec:.3f}")
+    return [(seg.start, seg.end, seg.text) for seg in segments]
+
+def vad_options():
+    """Keyword arguments for trim_silence, or None when trimming is off"""
+    if not VAD_TRIM_ENABLED:
+        return None
+    return dict(frame_ms=VAD_FRAME_MS, threshold_db=VAD_THRESHOLD_DB,
+                padding_ms=VAD_PADDING_MS, max_pause_ms=VAD_MAX_PAUSE_MS)
+
+def trim_tail(audio_chunk):
+    """Trim silence from the uncommitted streaming tail"""
+    return trim_silence(audio_chunk, SAMPLE_RATE, **vad_options())
+
+def start_recording(command=False):
+    """Start a recording; command=True when it was made with COMMAND_KEY"""
+    global recording_flag, current_recording
+    if transcription_worker and not command:
+        # A command never preempts or merges into the dictation before it
+        transcription_worker.recording_started()
+    with recording_lock:
+        current_recording = Recording()
+        current_recording.command = command
+        recording_flag = True
+        # Only when nothing is waiting to be inserted, so dictations never land out of order
+        if STREAMING_ENABLED and INCREMENTAL_INSERT and model_ready.is_set() and not transcription_worker.busy and not command:
+            current_recording.live = IncrementalInserter(text_inserter.backends[text_inserter.choose()])
+        start_streaming(current_recording)
     print("\n▶ Recording...")
-    logger.info("Recording started")
+    logger.info(f"Recording started (pre-roll {current_recording.preroll_sec * 1000:.0f} ms)")
+
+def start_streaming(recording):
+    """Begin rolling passes over a recording when streaming is on and the model is ready"""
+    if STREAMING_ENABLED and model_ready.is_set() and not recording.command:
+        recording.stream = StreamingTranscriber(
+            recording.read,
+            lambda audio_chunk: transcribe_window(recording, audio_chunk),
+            SAMPLE_RATE,
+            interval_sec=STREAM_INTERVAL_SEC,
+            min_window_sec=STREAM_MIN_WINDOW_SEC,
+            stable_margin_sec=STREAM_STABLE_MARGIN_SEC,
+            max_window_sec=STREAM_MAX_WINDOW_SEC,
+            trim=trim_tail if VAD_TRIM_ENABLED else None,
+            on_commit=recording.live.update if recording.live else None,
+        )
+        recording.stream.start()
 
 def stop_recording_and_transcribe():
-    global recording_flag, buffers, model, recording_start_time
-    recording_flag = False
-    print("■ Processing...")
-    
-    processing_start = time.time()
-    recording_duration = processing_start - recording_start_time if recording_start_time else 0
+    """Hand the finished recording to the worker - runs on the listener thread and never blocks"""
+    global recording_flag, current_recording, last_recording_end
+    with recording_lock:
+        recording_flag = False
+        recording = current_recording
+        current_recording = None
+        if recording is None:
+            return
+        if capture_converter is not None:
+            capture_converter.flush()  # The last few ms may still be waiting for the converter thread
+        recording.end_pos = last_recording_end = audio_ring.write_pos
+        recording.stopped_at = time.time()
+        print("■ Processing...")
+        metrics.observe("capture_sec", recording.stopped_at - recording.first_started_at)
+        if not transcription_worker.submit(recording):
+            metrics.increment("dropped")
 
-    # Concatenate all chunks
-    with buffer_lock:
-        if not buffers:
-            print("Empty recording")
-            logger.warning("Empty recording - no audio data captured")
+def split_recording():
+    """Hand the first CHUNK_SEC of a long recording to the worker and keep recording into a new chunk"""
+    global current_recording
+    with recording_lock:
+        recording = current_recording
+        if recording is None:
             return
-        audio_chunk = np.concatenate(buffers, axis=0)
-        buffers = []
+        audio_chunk = recording.read()
+        search = min(int(CHUNK_SEARCH_SEC * SAMPLE_RATE), len(audio_chunk))
+        cut = len(audio_chunk) - search + quietest_point(audio_chunk[len(audio_chunk) - search:], SAMPLE_RATE)
+        recording.end_pos = recording.start_pos + cut
+        recording.stopped_at = time.time()
+        current_recording = Recording(previous=recording)
+        start_streaming(current_recording)
+        logger.info(f"Long recording - chunk of {cut / SAMPLE_RATE:.1f}s handed to the decoder")
+        if not transcription_worker.submit(recording, final=False):
+            metrics.increment("dropped")
 
-    # Flatten if multi-channel
-    if len(audio_chunk.shape) > 1:
-        audio_chunk = audio_chunk.flatten()
-    
-    # Check duration
-    duration_sec = len(audio_chunk) / SAMPLE_RATE
-    if duration_sec < MIN_SPEECH_SEC:
-        print(f"Too short ({duration_sec:.1f}s)")
-        logger.info(f"Recording too short: {duration_sec:.2f}s (min: {MIN_SPEECH_SEC}s)")
+def check_recording_limits():
+    """Cut long recordings into chunks and stop ones that run past MAX_RECORDING_SEC"""
+    recording = current_recording
+    if recording is None or not recording_flag:
         return
+    if time.time() - recording.first_started_at >= MAX_RECORDING_SEC:
+        print(f"Recording stopped after {MAX_RECORDING_SEC}s")
+        logger.warning(f"Recording reached MAX_RECORDING_SEC ({MAX_RECORDING_SEC}s) - stopped")
+        stop_recording_and_transcribe()
+    elif audio_ring.write_pos - recording.start_pos >= CHUNK_SEC * SAMPLE_RATE:
+        split_recording()
 
-    # Check audio level
-    audio_level = np.abs(audio_chunk).mean()
-    max_level = np.abs(audio_chunk).max()
-    
-    if audio_level < AUDIO_THRESHOLD:
+def report_rejection(result, processing_time):
+    """Tell the user why a recording produced no text"""
+    if result.reason == REJECT_EMPTY:
+        print("Empty recording")
+        logger.warning("Empty recording - no audio data captured")
+    elif result.reason == REJECT_TOO_SHORT:
+        print(f"Too short ({result.duration:.1f}s)")
+        logger.info(f"Recording too short: {result.duration:.2f}s (min: {MIN_SPEECH_SEC}s)")
+    elif result.reason == REJECT_TOO_QUIET:
         print("No speech detected")
-        logger.info(f"No speech detected - audio level too low: {audio_level:.4f} (threshold: {AUDIO_THRESHOLD})")
-        return
+        logger.info(f"No speech detected - audio level too low: {result.level:.4f} (threshold: {AUDIO_THRESHOLD})")
+    elif result.reason == REJECT_NO_SPEECH:
+        print("No speech detected")
+        logger.info(f"No speech detected - VAD found only silence in {result.duration:.2f}s")
+    else:
+        print("No text recognized")
+        logger.info(f"No text recognized after {processing_time:.2f}s processing")
 
-    # Normalize if quiet
-    if max_level < 0.1:
-        audio_chunk = audio_chunk / max_level * 0.5
+def record_metrics(result, job, processing_time):
+    """Feed one recording's stage timings and outcome into the metrics registry"""
+    for stage, seconds in result.timings.items():
+        metrics.observe(f"{stage}_sec", seconds)
+    if result.rtf is not None:
+        metrics.observe("rtf", result.rtf)
+    metrics.observe("queue_wait_sec", job.queue_wait)
+    metrics.observe("processing_sec", processing_time)
+    if result.vad_saved:
+        metrics.observe("vad_saved_sec", result.vad_saved)
+    metrics.increment(f"rejected.{result.reason}" if result.reason else "transcriptions")
 
-    # Transcribe
+def read_recording(recording):
+    """View a finished recording in the ring buffer and pick (audio, model name, decode options, choice)"""
+    if not audio_ring.is_valid(recording.start_pos):
+        lost_sec = (audio_ring.oldest_pos - recording.start_pos) / SAMPLE_RATE
+        logger.warning(f"Recording longer than {RING_BUFFER_SEC}s buffer - first {lost_sec:.1f}s dropped")
+    audio_chunk = recording.read()
+    duration_sec = len(audio_chunk) / SAMPLE_RATE
+    if duration_sec >= MIN_SPEECH_SEC:
+        recording.resolve_language(audio_chunk)
+    model_name, decode_options, choice = pick_decoding(duration_sec, recording.language)
+    return audio_chunk, model_name, decode_options, choice
+
+def transcribe_recording(recording, job):
+    """Gate and decode one recording on the worker thread, returning its text"""
+    if not model_ready.is_set():
+        logger.info("Recording queued until the model is ready")
+        if not wait_for_model():
+            recording.cancel()
+            return ""
+    processing_start = time.time()
+
+    # View the recording straight out of the ring buffer
+    audio_chunk, model_name, decode_options, choice = read_recording(recording)
+    if is_command_candidate(recording, audio_chunk) and try_command(recording, audio_chunk):
+        return recording.command_match.text
+    if result_cache is not None and len(audio_chunk) <= RESULT_CACHE_MAX_CLIP_SEC * SAMPLE_RATE:
+        drop_idle_stream(recording)
+    # finish() still decodes the tail after a batch cancelled the rolling passes
+    streaming = recording.stream is not None
+
+    # Gate and transcribe
     try:
-        logger.info(f"Starting transcription - Duration: {duration_sec:.2f}s, Audio level: {audio_level:.4f}")
-        
-        segments, info = model.transcribe(
-            audio_chunk,
-            language="ru",              
-            vad_filter=True,            
-            beam_size=5,
-            best_of=5,
-            temperature=0.0,
-            initial_prompt="Это русская речь."
-        )
-        
-        detected_language = getattr(info, 'language', 'unknown')
-        language_probability = getattr(info, 'language_probability', 0)
-        
+        if streaming:
+            stage_start = time.perf_counter()
+            result = gate_clip(audio_chunk, MIN_SPEECH_SEC, AUDIO_THRESHOLD)
+            result.timings["gate"] = time.perf_counter() - stage_start
+            if not result.reason:
+                # Rolling passes already decoded the stable part - only the tail is left
+                stage_start = time.perf_counter()
+                result.text = recording.stream.finish(audio_chunk)
+                result.timings["tail_decode"] = time.perf_counter() - stage_start
+                if not result.text:
+                    result.reason = REJECT_NO_TEXT
+        else:
+            result, clip_audio = prepare_clip(audio_chunk, MIN_SPEECH_SEC, AUDIO_THRESHOLD, vad_options())
+            if not result.reason:
+                fp = cache_lookup(recording, result, clip_audio)
+                if not result.text:
+                    stage_start = time.perf_counter()
+                    with model_pool.use(model_name) as clip_model:
+                        segments, info = transcribe_audio(clip_model, clip_audio, decode_options, job.cancelled)
+                    apply_decode(result, segments, info, time.perf_counter() - stage_start)
+                    cache_store(fp, recording, result)
     except Exception as e:
+        recording.cancel()
         print(f"Error: {e}")
         logger.error(f"Transcription error: {e}")
-        return
+        return ""
 
-    # Combine segments
-    text_parts = []
-    for seg in segments:
-        text_parts.append(seg.text.strip())
-    final_text = " ".join(t for t in text_parts if t).strip()
+    return complete_recording(recording, job, result, processing_start, streaming, model_name, choice)
+
+def is_command_candidate(recording, audio_chunk):
+    """Whether a recording should first be tried as a spoken command"""
+    if command_matcher is None or not command_matcher.commands:
+        return False
+    return recording.command or (COMMAND_AUTO_DETECT and len(audio_chunk) <= COMMAND_MAX_SEC * SAMPLE_RATE)
+
+def try_command(recording, audio_chunk):
+    """Recognize a short recording as a command; sets recording.command_match and returns True on a match
+
+    Anything that isn't confidently a command is left to normal dictation.
+    """
+    try:
+        result, clip_audio = prepare_clip(audio_chunk, MIN_SPEECH_SEC, AUDIO_THRESHOLD, vad_options())
+        if result.reason:
+            return False
+        with model_pool.use(COMMAND_MODEL) as command_model:
+            match = command_matcher.recognize(command_model, clip_audio, recording.language or LANGUAGE)
+    except Exception as e:
+        logger.error(f"Command recognition error: {e}")
+        return False
+    metrics.observe("command_sec", match.decode_sec)
+    if match.command is None:
+        metrics.increment("commands.fallback")
+        logger.info(f"Not a command ({match.reason}): {match.text[:50]!r} - dictating instead")
+        return False
+    metrics.increment("commands")
+    recording.cancel()  # An auto-detected command may have started rolling passes
+    print(f"⌨ Command: {match.command.phrase}")
+    logger.info(f"Command {match.command.phrase!r} (score {match.score:.2f}) in {match.decode_sec * 1000:.0f} ms")
+    recording.command_match = match
+    return True
+
+def transcribe_recordings(recordings, jobs):
+    """Decode several queued recordings together on the worker thread, returning their texts in order
+
+    Recordings whose streaming passes already committed text only need their
+    tail decoded and go through transcribe_recording. The rest are prepared
+    one by one and decoded in batches of clips that share a model, decode
+    options and a known language. Clips whose language is left to the decoder
+    are decoded alone, since a batch detects one language for all of them.
+    A batch that fails is retried clip by clip through transcribe_recording.
+    """
+    if not model_ready.is_set():
+        logger.info("Recordings queued until the model is ready")
+        if not wait_for_model():
+            for recording in recordings:
+                recording.cancel()
+            return [""] * len(recordings)
+    texts = [""] * len(recordings)
+    groups = {}  # (model name, decode options) -> [(index, result, audio, choice, processing start)]
+    for index, (recording, job) in enumerate(zip(recordings, jobs)):
+        if is_command_candidate(recording, recording.read()) or not drop_idle_stream(recording):
+            texts[index] = transcribe_recording(recording, job)
+            continue
+        processing_start = time.time()
+        audio_chunk, model_name, decode_options, choice = read_recording(recording)
+        try:
+            result, clip_audio = prepare_clip(audio_chunk, MIN_SPEECH_SEC, AUDIO_THRESHOLD, vad_options())
+        except Exception as e:
+            recording.cancel()
+            print(f"Error: {e}")
+            logger.error(f"Transcription error: {e}")
+            continue
+        if result.reason or len(clip_audio) > BATCH_MAX_CLIP_SEC * SAMPLE_RATE:
+            if result.reason:
+                texts[index] = complete_recording(recording, job, result, processing_start, False, model_name, choice)
+            else:
+                texts[index] = transcribe_recording(recording, job)
+            continue
+        fp = cache_lookup(recording, result, clip_audio)
+        if result.text:
+            texts[index] = complete_recording(recording, job, result, processing_start, False, model_name, choice)
+            continue
+        # A batch detects one language for all of its clips, so only clips whose language
+        # is already known are batched (their decode options carry it); the rest decode alone
+        key = (model_name, repr(sorted(decode_options.items())) if recording.language else index)
+        groups.setdefault(key, []).append((index, result, clip_audio, choice, processing_start, decode_options, fp))
 
+    for (model_name, _), items in groups.items():
+        decode_start = time.perf_counter()
+        try:
+            with model_pool.use(model_name) as batch_model:
+                decoded = transcribe_batch(batch_model, [item[2] for item in items], items[0][5])
+        except Exception as e:
+            if len(items) == 1:
+                recordings[items[0][0]].cancel()
+                print(f"Error: {e}")
+                logger.error(f"Transcription error: {e}")
+                continue
+            # One bad clip shouldn't cost the others their dictation - retry them one at a time
+            logger.error(f"Batched transcription error: {e} - decoding the {len(items)} clips one at a time")
+            for item in items:
+                texts[item[0]] = transcribe_recording(recordings[item[0]], jobs[item[0]])
+            continue
+        decode_sec = time.perf_counter() - decode_start
+        if len(items) > 1:
+            metrics.observe("batch_size", len(items))
+            logger.info(f"Batched decode of {len(items)} clips with {model_name} in {decode_sec:.2f}s")
+        batch_samples = sum(len(item[2]) for item in items)
+        for (index, result, clip_audio, choice, processing_start, _, fp), (segments, info) in zip(items, decoded):
+            # Each clip is charged its share of the batch's decode time, by length
+            apply_decode(result, segments, info, decode_sec * len(clip_audio) / batch_samples)
+            cache_store(fp, recordings[index], result)
+            texts[index] = complete_recording(recordings[index], jobs[index], result, processing_start, False,
+                                              model_name, choice)
+    return texts
+
+def drop_idle_stream(recording):
+    """Stop rolling passes; if they committed nothing, the recording is decoded as a plain clip
+
+    Returns False when committed text means only the streaming tail is left to decode.
+    """
+    if recording.stream is None:
+        return True
+    recording.stream.cancel()
+    if recording.stream.committed_samples:
+        return False
+    recording.stream = None  # Nothing committed - the whole clip is the tail
+    return True
+
+def cache_lookup(recording, result, clip_audio):
+    """Answer a prepared clip from the result cache; returns its fingerprint for cache_store (None if not cached)"""
+    if result_cache is None or len(clip_audio) > RESULT_CACHE_MAX_CLIP_SEC * SAMPLE_RATE:
+        return None
+    stage_start = time.perf_counter()
+    fp = fingerprint(clip_audio, SAMPLE_RATE)
+    hit = result_cache.lookup(fp, len(clip_audio) / SAMPLE_RATE, recording.language)
+    result.timings["cache"] = time.perf_counter() - stage_start
+    if hit is None:
+        metrics.increment("cache.misses")
+        return fp
+    result.text = hit.text
+    result.language = recording.language or "cached"
+    metrics.increment("cache.hits")
+    metrics.observe("cache_saved_sec", max(0.0, hit.decode_sec - result.timings["cache"]))
+    logger.info(f"Result cache hit (similarity {hit.similarity:.3f}) - saved ~{hit.decode_sec:.2f}s of decoding")
+    return None
+
+def save_result_cache():
+    if result_cache is not None:
+        try:
+            result_cache.save()
+        except Exception as e:
+            logger.warning(f"Failed to save result cache: {e}")
+
+def cache_store(fp, recording, result):
+    """Remember a freshly decoded clip under the fingerprint cache_lookup computed"""
+    if fp is not None and not result.reason:
+        result_cache.put(fp, result.duration - result.vad_saved, recording.language or result.language,
+                         result.text, result.timings.get("decode", 0.0))
+
+def complete_recording(recording, job, result, processing_start, streaming, model_name, choice):
+    """Record metrics, report the outcome and return the text to insert"""
     processing_time = time.time() - processing_start
+    record_metrics(result, job, processing_time)
     
-    if not final_text:
-        print("No text recognized")
-        logger.info(f"No text recognized after {processing_time:.2f}s processing")
-        return
+    if result.reason:
+        recording.cancel()
+        if not recording.continuation:
+            report_rejection(result, processing_time)
+        return ""
 
+    if not audio_ring.is_valid(recording.start_pos):
+        logger.warning("Recording was overwritten while it was being decoded - result dropped")
+        return ""
+
+    final_text = result.text
     print(f"📄 Text: {final_text}")
     
+    if choice is not None and result.rtf is not None:
+        logger.info(f"Decode profile: {model_name} {choice} | RTF: {result.rtf:.3f}")
+    
+    if recording.live is not None and recording.live.typed:
+        # Most of the text is already in the window - only correct the difference
+        finish_live_insert(recording.live, final_text)
+        final_text = ""
+    
     # Log successful transcription
     logger.info(
         f"TRANSCRIPTION SUCCESS | "
-        f"Duration: {duration_sec:.2f}s | "
-        f"Language: {detected_language} ({language_probability:.3f}) | "
-        f"Processing: {processing_time:.2f}s | "
-        f"Text: {final_text[:100]}{'...' if len(final_text) > 100 else ''}"
+        f"Duration: {result.duration:.2f}s | "
+        f"Audio level: {result.level:.4f} | "
+        f"Language: {result.language} ({result.language_probability:.3f}) | "
+        f"Queue wait: {job.queue_wait:.2f}s | "
+        f"Processing: {processing_time:.2f}s{' (streaming)' if streaming else ''} | "
+        f"VAD saved: {result.vad_saved:.2f}s | "
+        f"Text: {result.text[:100]}{'...' if len(result.text) > 100 else ''}"
     )
-    
+    return final_text
+
+def finish_live_insert(live, text):
+    """Bring incrementally typed text in line with the final transcription"""
+    if live.update(text):
+        live.finish()
+        metrics.increment("incremental_erased_chars", live.erased)
+        logger.info(f"✓ Incremental insertion finished via {live.backend.name} ({live.erased} characters corrected)")
+        platform_backend.beep(800, 150)
+        return
+    # Part of the text may be in the window already - leave the full text in the clipboard
+    try:
+        platform_backend.write_clipboard(text)
+    except:
+        pass
+    print("✓ Text ready in clipboard. Press Ctrl+V to paste.")
+
+def deliver_text(job, text):
+    """Insert the text of a finished job into the active window, or run it when it was a command"""
+    match = job.parts[0].command_match if len(job.parts) == 1 else None
+    if match is not None:
+        run_command(match.command)
+        return
+    if any(part.live is not None and part.live.typed for part in job.parts):
+        # Earlier chunks were typed live and left out of text - continue after them
+        text = " " + text
     # Insert text automatically into active window
-    time.sleep(0.1)  # Small delay to ensure active window is ready
-    insert_text(final_text)
+    insert_text(text)
+
+def run_command(command):
+    """Press a command's key combination or insert its snippet"""
+    if command.kind != KIND_KEY:
+        insert_text(command.value)
+        return
+    try:
+        platform_backend.send_keys(command.value)
+        platform_backend.beep(800, 150)
+    except Exception as e:
+        logger.error(f"Failed to send {command.value} for command {command.phrase!r}: {e}")
 
 # -------------------- KEY HANDLING --------------------
 pressed_keys = set()
+recording_key = None  # The key that started the current recording; only its release stops it
 
 def on_press(key):
-    if key == PUSH_TO_TALK_KEY and PUSH_TO_TALK_KEY not in pressed_keys:
-        pressed_keys.add(PUSH_TO_TALK_KEY)
+    global recording_key
+    if key in (push_to_talk, command_key) and key not in pressed_keys:
+        pressed_keys.add(key)
         if not recording_flag:
-            start_recording()
+            recording_key = key
+            start_recording(command=key == command_key)
 
 def on_release(key):
-    if key == PUSH_TO_TALK_KEY:
-        if PUSH_TO_TALK_KEY in pressed_keys:
-            pressed_keys.remove(PUSH_TO_TALK_KEY)
-        if recording_flag:
+    if key in (push_to_talk, command_key):
+        if key in pressed_keys:
+            pressed_keys.remove(key)
+        if recording_flag and key == recording_key:
             stop_recording_and_transcribe()
 
 # -------------------- MAIN --------------------
 def main():
-    global audio_stream, keyboard_listener, is_running
+    global audio_stream, keyboard_listener, is_running, transcription_worker, text_inserter, result_cache, config_watcher
+    global platform_backend, push_to_talk, command_key, command_matcher, audio_ring, preroll_samples
+    
+    setup_logging()
     
     print("=" * 60)
     print("WHISPER VOICE-TO-TEXT SERVER")
@@ -549,6 +1270,21 @@ def main():
     print("Right-click tray icon for options")
     print("=" * 60)
     
+    overridden = load_settings()
+    # Sized from the settings file, so RING_BUFFER_SEC and PREROLL_MS there apply
+    audio_ring = RingBuffer(int(RING_BUFFER_SEC * SAMPLE_RATE))
+    preroll_samples = int(PREROLL_MS * SAMPLE_RATE / 1000)
+    
+    stage_start = time.time()
+    try:
+        platform_backend = load_platform(PLATFORM)
+    except Exception as e:
+        print(f"Error: can't load the {PLATFORM} platform: {e}")
+        logger.critical(f"Failed to load platform {PLATFORM}: {e}")
+        return
+    record_stage("platform", stage_start)
+    acquire_instance_lock()
+    
     # Log startup
     logger.info("="*50)
     logger.info("WHISPER HOTKEY SERVICE STARTING")
@@ -556,38 +1292,75 @@ def main():
     logger.info(f"Hotkey: {PUSH_TO_TALK_KEY}, Min duration: {MIN_SPEECH_SEC}s")
     logger.info("="*50)
     
-    # Load model
+    # Audio and keyboard libraries need a desktop session, so they are loaded here rather than at import
+    import sounddevice as sd
+    from pynput import keyboard
+    push_to_talk = getattr(keyboard.Key, PUSH_TO_TALK_KEY, None) or keyboard.KeyCode.from_char(PUSH_TO_TALK_KEY)
+    if COMMAND_KEY:
+        command_key = getattr(keyboard.Key, COMMAND_KEY, None) or keyboard.KeyCode.from_char(COMMAND_KEY)
+    command_matcher = CommandMatcher(COMMANDS, COMMAND_MIN_SCORE)
+    record_stage("imports", import_start)
+    apply_tuning(overridden)
+    
+    # Load model - in the background when hotkeys should come up first
+    if PARALLEL_STARTUP:
+        threading.Thread(target=prepare_model, name="JWhisperModelLoader", daemon=True).start()
+    elif not prepare_model():
+        return
+    
+    if STREAMING_ENABLED:
+        logger.info(f"Streaming transcription enabled - pass every {STREAM_INTERVAL_SEC}s")
+    
+    text_inserter = create_inserter()
+    
+    if RESULT_CACHE_ENABLED:
+        cache_file = os.path.join(os.path.dirname(__file__), RESULT_CACHE_FILE) if RESULT_CACHE_FILE else None
+        result_cache = ResultCache(cache_file, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_THRESHOLD)
+    
+    transcription_worker = TranscriptionWorker(
+        transcribe_recording,
+        deliver_text,
+        discard=Recording.cancel,
+        max_pending=WORKER_MAX_PENDING,
+        policy=WORKER_POLICY,
+        decode_batch=transcribe_recordings,
+        max_batch=BATCH_MAX_SIZE,
+        batch_window_sec=BATCH_WINDOW_SEC,
+    )
+    transcription_worker.start()
+    logger.info(f"Transcription worker started - policy: {WORKER_POLICY}")
+    
+    config_watcher = ConfigWatcher(config_path(), apply_settings, poll_sec=CONFIG_POLL_SEC)
+    config_watcher.start()
+    
     try:
-        load_model()
+        metrics_file = os.path.join(os.path.dirname(__file__), METRICS_FILE) if METRICS_FILE else None
+        metrics.start(metrics_file, METRICS_FLUSH_SEC, METRICS_PORT)
     except Exception as e:
-        logger.critical(f"Failed to initialize model: {e}")
-        show_notification("Critical Error", "Failed to load JWhisper model. Check logs for details.", quiet=True)
-        return
+        # Metrics are optional - e.g. the port may be taken
+        logger.warning(f"Failed to start metrics export: {e}")
     
     # Setup system tray
+    stage_start = time.time()
     setup_tray()
+    record_stage("tray", stage_start)
     
     # Start audio stream
     try:
-        # List available audio devices for logging
-        devices = sd.query_devices()
-        default_input = sd.query_devices(kind='input')
-        logger.info(f"Using audio device: {default_input['name']}")
-        
-        audio_stream = sd.InputStream(
-            callback=audio_callback, 
-            channels=CHANNELS, 
-            samplerate=SAMPLE_RATE, 
-            dtype=DTYPE
-        )
-        audio_stream.start()
+        stage_start = time.time()
+        audio_stream = open_audio_stream(sd)
+        record_stage("audio_stream", stage_start)
         
         # Start keyboard listener
+        stage_start = time.time()
         keyboard_listener = keyboard.Listener(
             on_press=on_press, 
             on_release=on_release
         )
         keyboard_listener.start()
+        record_stage("hotkeys", stage_start)
+        hotkeys_ready.set()
+        report_ready()
         
         print("\n✓ Server started successfully!")
         print("Minimize this window - app will run quietly in system tray")
@@ -596,7 +1369,8 @@ def main():
         
         # Keep running
         while is_running:
-            time.sleep(1)
+            time.sleep(0.25)
+            check_recording_limits()
             
     except Exception as e:
         error_msg = f"Failed to start audio/keyboard services: {e}"
@@ -608,12 +1382,19 @@ def main():
         if audio_stream:
             audio_stream.stop()
             audio_stream.close()
+        if capture_converter:
+            capture_converter.stop()
         if keyboard_listener:
             keyboard_listener.stop()
+        if transcription_worker:
+            transcription_worker.stop()
+        if config_watcher:
+            config_watcher.stop()
+        metrics.stop()
+        save_result_cache()
+        if isinstance(model_pool, RemoteModelPool):
+            model_pool.close()
         logger.info("Service stopped")
 
 if __name__ == "__main__":
-    # Hide console window (optional)
-    # win32gui.ShowWindow(win32gui.GetForegroundWindow(), win32con.SW_MINIMIZE)
-    
     main()
\ No newline at end of file
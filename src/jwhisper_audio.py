@@ -0,0 +1,422 @@
+"""Audio capture buffers and signal processing for JWhisper.
+
+The PortAudio callback runs on a real-time thread, so nothing on the ring
+buffer's write path allocates or takes a lock. Clip conditioning works
+through reusable per-thread scratch memory, since recordings can be minutes
+long and each full-size temporary is an allocation plus a pass over memory.
+"""
+import math
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+SCRATCH_MIN_SAMPLES = 16000 * 30  # Conditioning scratch starts at one 30s window and grows with longer clips
+
+
+class RingBuffer:
+    """Fixed-capacity float32 ring buffer for one writer and one reader.
+
+    Every sample is stored twice, at ``i`` and ``i + capacity``, so any window
+    of up to ``capacity`` samples is a single contiguous slice and can be handed
+    to the transcriber as a view without copying.
+
+    Positions are absolute sample counts since the buffer was created. The
+    writer publishes a block by advancing ``write_pos`` after the data is in
+    place; a plain attribute store is atomic under the GIL, so the reader never
+    sees a position whose samples have not been written yet.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=np.float32)
+        self.write_pos = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the buffer"""
+        return self._data.nbytes
+
+    @property
+    def oldest_pos(self) -> int:
+        """Oldest position that has not been overwritten yet"""
+        return max(0, self.write_pos - self.capacity)
+
+    def write(self, block: np.ndarray):
+        """Append a 1-D block of samples (called from the audio thread)"""
+        n = len(block)
+        pos = self.write_pos
+        if n > self.capacity:
+            # Only the newest samples can survive anyway
+            pos += n - self.capacity
+            block = block[n - self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        data = self._data
+        i = pos % cap
+        first = min(n, cap - i)
+        data[i:i + first] = block[:first]
+        data[i + cap:i + cap + first] = block[:first]
+        if first < n:
+            rest = n - first
+            data[:rest] = block[first:]
+            data[cap:cap + rest] = block[first:]
+        self.write_pos = pos + n
+
+    def view(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the samples in [start, end)
+
+        Positions older than ``oldest_pos`` have already been overwritten and
+        are clipped off. The view aliases the buffer, so it stays valid only
+        until the writer laps ``start`` - check with ``is_valid``.
+        """
+        write_pos = self.write_pos
+        if end is None or end > write_pos:
+            end = write_pos
+        start = max(start, write_pos - self.capacity, 0)
+        if end <= start:
+            return self._data[:0]
+
+        i = start % self.capacity
+        out = self._data[i:i + (end - start)]
+        out.flags.writeable = False
+        return out
+
+    def is_valid(self, start: int) -> bool:
+        """True while samples from ``start`` on have not been overwritten"""
+        return start >= self.write_pos - self.capacity
+
+
+# -------------------- VOICE ACTIVITY --------------------
+def trim_silence(
+    audio: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 30,
+    threshold_db: float = 10.0,
+    padding_ms: int = 200,
+    max_pause_ms: int = 1000,
+    min_energy: float = 1e-8,
+) -> Tuple[np.ndarray, float]:
+    """Cut leading/trailing silence and shorten long pauses using frame energies
+
+    Frame energies are computed in a single vectorized pass over a reshaped
+    view of the clip. A frame counts as speech when its energy is
+    ``threshold_db`` above the noise floor (the 10th percentile frame), capped
+    at 10 dB below the loudest frame so a clip that is speech throughout is
+    never trimmed away.
+
+    Trimming only the ends returns a view; shortening internal pauses copies.
+
+    Args:
+        audio: Mono float32 clip
+        sample_rate: Sample rate of the clip
+        frame_ms: Analysis frame length
+        threshold_db: Speech threshold above the noise floor
+        padding_ms: Audio kept on each side of speech
+        max_pause_ms: Pauses longer than this are cut down to 2 * padding_ms; 0 keeps every pause
+
+    Returns:
+        (trimmed audio, seconds removed)
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(audio) // frame
+    if n_frames < 3:
+        return audio, 0.0
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy = np.einsum('ij,ij->i', frames, frames) / frame
+    peak = float(energy.max())
+    if peak <= min_energy:
+        # Digital silence
+        return audio[:0], len(audio) / sample_rate
+    floor = float(np.percentile(energy, 10))
+    threshold = max(min_energy, min(floor * 10 ** (threshold_db / 10), peak * 0.1))
+    speech = np.flatnonzero(energy > threshold)
+
+    pad = -(-padding_ms // frame_ms)
+    first = max(int(speech[0]) - pad, 0)
+    last = min(int(speech[-1]) + pad + 1, n_frames)
+    start = first * frame
+    end = len(audio) if last == n_frames else last * frame
+
+    spans = [(start, end)]
+    if max_pause_ms > 0:
+        gaps = np.diff(speech) - 1
+        long_gaps = np.flatnonzero(gaps * frame_ms > max(max_pause_ms, 2 * padding_ms))
+        if len(long_gaps):
+            spans = []
+            span_start = start
+            for gap in long_gaps:
+                spans.append((span_start, (int(speech[gap]) + pad + 1) * frame))
+                span_start = (int(speech[gap + 1]) - pad) * frame
+            spans.append((span_start, end))
+
+    if len(spans) == 1:
+        trimmed = audio[start:end]
+    else:
+        trimmed = np.concatenate([audio[s:e] for s, e in spans])
+    return trimmed, (len(audio) - len(trimmed)) / sample_rate
+
+
+def quietest_point(audio: np.ndarray, sample_rate: int, frame_ms: int = 30) -> int:
+    """Sample offset of the middle of the quietest frame - a safe place to cut between words"""
+    frame = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return len(audio) // 2
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy = np.einsum('ij,ij->i', frames, frames)
+    return int(np.argmin(energy)) * frame + frame // 2
+
+
+# -------------------- CONDITIONING --------------------
+class AudioStats:
+    """Level statistics of a clip after DC removal"""
+
+    def __init__(self, samples: int = 0, dc: float = 0.0, mean_abs: float = 0.0, rms: float = 0.0,
+                 peak: float = 0.0, clipped: int = 0):
+        self.samples = samples
+        self.dc = dc              # Mean of the raw samples (DC offset)
+        self.mean_abs = mean_abs  # What AUDIO_THRESHOLD is compared against
+        self.rms = rms
+        self.peak = peak
+        self.clipped = clipped    # Raw samples at full scale
+
+    def __repr__(self):
+        return (f"AudioStats(dc={self.dc:.4f}, mean_abs={self.mean_abs:.4f}, rms={self.rms:.4f}, "
+                f"peak={self.peak:.4f}, clipped={self.clipped})")
+
+
+class AudioConditioner:
+    """Measures and conditions clips without temporaries the size of the clip.
+
+    measure() gets DC offset, mean absolute level, RMS, peak and clipped sample
+    count from one sum, one dot product and one pass over a scratch buffer
+    that is kept per thread and only grows. condition() removes the DC offset,
+    raises quiet clips towards ``target_rms`` and, when the result would clip,
+    soft-limits everything above ``knee``, in place when the caller owns the
+    samples.
+    """
+
+    CLIP_LEVEL = 0.999
+    DC_TOLERANCE = 1e-3  # Offsets this small are left alone
+
+    def __init__(self, target_rms: float = 0.1, max_gain: float = 100.0, knee: float = 0.8):
+        """
+        Args:
+            target_rms: RMS quiet clips are raised to (0.1 is about -20 dBFS); louder clips keep their level
+            max_gain: Largest gain applied, so near-silence isn't blown up into noise
+            knee: Level above which the limiter compresses samples smoothly towards full scale
+        """
+        self.target_rms = target_rms
+        self.max_gain = max_gain
+        self.knee = knee
+        self._local = threading.local()
+
+    def _scratch(self, n: int) -> np.ndarray:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < n:
+            buffer = self._local.buffer = np.empty(max(n, SCRATCH_MIN_SAMPLES), dtype=np.float32)
+        return buffer[:n]
+
+    def measure(self, audio: np.ndarray) -> AudioStats:
+        n = len(audio)
+        if n == 0:
+            return AudioStats()
+        dc = float(audio.sum()) / n  # Pairwise float32 summation - accurate enough, no cast buffer
+        energy = float(np.dot(audio, audio)) / n
+        scratch = self._scratch(n)
+        np.subtract(audio, np.float32(dc), out=scratch)
+        np.abs(scratch, out=scratch)
+        peak = float(scratch.max())
+        clipped = 0
+        if peak + abs(dc) >= self.CLIP_LEVEL:
+            # Rare, so counting may allocate
+            clipped = int(np.count_nonzero(np.abs(audio) >= self.CLIP_LEVEL))
+        return AudioStats(n, dc, float(scratch.sum()) / n, max(energy - dc * dc, 0.0) ** 0.5, peak, clipped)
+
+    def gain(self, stats: AudioStats) -> float:
+        if stats.rms <= 0 or stats.rms >= self.target_rms:
+            return 1.0
+        return min(self.target_rms / stats.rms, self.max_gain)
+
+    def condition(self, audio: np.ndarray, stats: Optional[AudioStats] = None,
+                  inplace: bool = False) -> Tuple[np.ndarray, float]:
+        """DC removal, gain and soft limiting; returns (audio, gain applied)
+
+        Args:
+            stats: measure(audio), if the caller already has it
+            inplace: Overwrite audio when it is a writable float32 array; otherwise one copy is made
+        """
+        if len(audio) == 0:
+            return audio, 1.0
+        if stats is None:
+            stats = self.measure(audio)
+        gain = self.gain(stats)
+        remove_dc = abs(stats.dc) > self.DC_TOLERANCE
+        limit = stats.peak * gain > 1.0  # Only when the gain (or the recording) would clip
+        if gain == 1.0 and not remove_dc and not limit:
+            return audio, gain  # Already fine - no copy at all
+        out = audio if inplace and audio.dtype == np.float32 and audio.flags.writeable else np.empty(len(audio), np.float32)
+        if remove_dc:
+            np.subtract(audio, np.float32(stats.dc), out=out)
+            np.multiply(out, np.float32(gain), out=out)
+        else:
+            np.multiply(audio, np.float32(gain), out=out)
+        if limit:
+            self._limit(out)
+        return out, gain
+
+    def _limit(self, audio: np.ndarray):
+        """Soft-knee limiter: samples above knee approach full scale along tanh"""
+        knee = np.float32(self.knee)
+        headroom = np.float32(1.0 - self.knee)
+        loud = np.flatnonzero(np.abs(audio, out=self._scratch(len(audio))) > knee)
+        if len(loud) == 0:
+            return
+        values = audio[loud]
+        magnitude = np.abs(values)
+        audio[loud] = np.sign(values) * (knee + headroom * np.tanh((magnitude - knee) / headroom))
+
+
+# -------------------- RESAMPLING --------------------
+class PolyphaseResampler:
+    """Streaming rational resampler with a Kaiser-windowed sinc filter.
+
+    The rate ratio is reduced to up/down. Output sample m sits at input time
+    m * down / up and is one row of a polyphase filter bank applied to the
+    newest input window, so each block costs one gather and one row-wise dot
+    product. The filter is centred on the output time, so output stays aligned
+    with the input (output m is input time m * down / up) at a latency of half
+    the filter length.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, zero_crossings: int = 32, rolloff: float = 0.94,
+                 beta: float = 8.6):
+        """
+        Args:
+            in_rate: Input sample rate
+            out_rate: Output sample rate
+            zero_crossings: Sinc lobes on each side of the centre; more narrows the transition band
+            rolloff: Passband edge as a fraction of the lower Nyquist frequency
+            beta: Kaiser window shape; 8.6 gives about 90 dB of stopband attenuation
+        """
+        g = math.gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // g
+        self.down = in_rate // g
+        scale = max(self.up, self.down)
+        length = 2 * zero_crossings * scale + 1
+        t = np.arange(length) - (length - 1) / 2
+        h = self.up * rolloff / scale * np.sinc(rolloff * t / scale) * np.kaiser(length, beta)
+        self.taps = -(-length // self.up)  # Input samples per output
+        bank = np.zeros(self.taps * self.up)
+        bank[:length] = h
+        # Row p holds the taps of phase p, reversed so they line up with a forward input window
+        self._bank = np.ascontiguousarray(bank.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        self._delay = (length - 1) // 2  # Centre of the filter, in upsampled samples
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._in_count = 0   # Input samples consumed so far
+        self._out_count = 0  # Output samples produced so far
+
+    @property
+    def latency_sec(self) -> float:
+        """How far output lags the newest input"""
+        return self._delay / self.up / self.in_rate
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Resample the next block of mono float32 input; returns every output sample it completes"""
+        n_before = self._in_count
+        self._in_count += len(block)
+        buffer = np.concatenate((self._history, block.astype(np.float32, copy=False)))
+        self._history = buffer[len(buffer) - len(self._history):].copy()
+        # Output m needs input up to index (m * down + delay) // up
+        last = (self._in_count * self.up - 1 - self._delay) // self.down
+        if last < self._out_count:
+            return np.empty(0, dtype=np.float32)
+        position = np.arange(self._out_count, last + 1, dtype=np.int64) * self.down + self._delay
+        self._out_count = last + 1
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps)
+        start = position // self.up - n_before
+        phase = position % self.up
+        if self.up == 1:
+            return windows[start] @ self._bank[0]
+        return np.einsum('ij,ij->i', windows[start], self._bank[phase])
+
+    def flush(self) -> np.ndarray:
+        """Output still held back by the filter latency, padding the input with silence"""
+        return self.process(np.zeros(self.taps, dtype=np.float32))
+
+
+class CaptureConverter:
+    """Moves device-rate, multi-channel capture into a 16 kHz mono RingBuffer off the audio thread.
+
+    The audio callback only copies each block into a raw ring buffer
+    (write()). A converter thread wakes every block_sec, mixes the new frames
+    down to mono, resamples them and appends them to the output ring. flush()
+    converts whatever is pending right away, so a recording that just stopped
+    has all of its audio.
+    """
+
+    def __init__(self, out_ring: RingBuffer, in_rate: int, channels: int, out_rate: int = 16000,
+                 block_sec: float = 0.02, raw_buffer_sec: float = 2.0):
+        """
+        Args:
+            out_ring: 16 kHz mono ring the rest of the service reads
+            in_rate: Device sample rate
+            channels: Device channel count; channels are averaged
+            out_rate: Rate of out_ring
+            block_sec: How often the converter thread runs
+            raw_buffer_sec: Device audio kept for the converter; a thread stalled longer than this drops audio
+        """
+        self.out_ring = out_ring
+        self.in_rate = in_rate
+        self.channels = channels
+        self.block_sec = block_sec
+        self.resampler = PolyphaseResampler(in_rate, out_rate) if in_rate != out_rate else None
+        self._raw = RingBuffer(int(raw_buffer_sec * in_rate) * channels)
+        self._read_pos = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped_sec = 0.0
+
+    def write(self, block: np.ndarray):
+        """Audio callback: block is (frames, channels) float32"""
+        self._raw.write(block.reshape(-1))
+
+    def flush(self):
+        """Convert every frame captured so far"""
+        with self._lock:
+            write_pos = self._raw.write_pos
+            if not self._raw.is_valid(self._read_pos):
+                lost = self._raw.oldest_pos - self._read_pos
+                lost += -lost % self.channels  # Stay on a frame boundary
+                self.dropped_sec += lost / self.channels / self.in_rate
+                self._read_pos += lost
+            end = write_pos - (write_pos - self._read_pos) % self.channels
+            if end <= self._read_pos:
+                return
+            raw = self._raw.view(self._read_pos, end)
+            self._read_pos = end
+            mono = raw if self.channels == 1 else raw.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+            if self.resampler is not None:
+                mono = self.resampler.process(mono)
+            self.out_ring.write(mono)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="JWhisperCapture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop.wait(self.block_sec):
+            self.flush()
@@ -0,0 +1,379 @@
+"""Batch transcription of recorded audio files.
+
+Runs a folder of voice notes through the same model setup, gating, VAD
+trimming, normalization and decoding as the hotkey service. Files are read
+block by block and decoded in CHUNK_SEC pieces cut at the quietest moment, so
+memory stays flat however long a recording is (WAVs at other rates are
+resampled as they stream; compressed formats are decoded whole by
+faster-whisper). Several files are decoded at once by a pool of worker
+threads sharing one model.
+
+Every finished file is appended to a JSONL transcript right away, with its
+timings. Running the same command again skips files that are already in the
+transcript, so an interrupted run picks up where it stopped. A summary with
+the aggregate real-time factor is printed as JSON at the end.
+
+Usage:
+    python src/jwhisper_batch.py notes/ --output notes.jsonl
+    python src/jwhisper_batch.py notes/ --model medium --workers 2 --language en
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from jwhisper_audio import PolyphaseResampler, quietest_point
+from jwhisper_config import ConfigError, load_config
+from jwhisper_engine import (
+    DECODE_OPTIONS, DEFAULT_VAD_OPTIONS, SAMPLE_RATE, process_clip, with_language,
+)
+from jwhisper_models import ModelPool, plan_cpu_threads
+
+AUDIO_EXTENSIONS = (".wav", ".npy", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".webm")
+
+BLOCK_SEC = 5  # Audio read from disk at a time
+
+# Same defaults as the hotkey service (src/jwhisper.py); the settings file overrides them
+DEFAULT_SETTINGS = {
+    "WHISPER_MODEL_NAME": "small",
+    "WHISPER_DEVICE": "cpu",
+    "WHISPER_COMPUTE_TYPE": "int8",
+    "WHISPER_CPU_THREADS": None,
+    "LANGUAGE": None,
+    "BEAM_SIZE": DECODE_OPTIONS["beam_size"],
+    "BEST_OF": DECODE_OPTIONS["best_of"],
+    "TEMPERATURE": DECODE_OPTIONS["temperature"],
+    "MIN_SPEECH_SEC": 0.5,
+    "AUDIO_THRESHOLD": 0.001,
+    "VAD_TRIM_ENABLED": True,
+    "VAD_FRAME_MS": DEFAULT_VAD_OPTIONS["frame_ms"],
+    "VAD_THRESHOLD_DB": DEFAULT_VAD_OPTIONS["threshold_db"],
+    "VAD_PADDING_MS": DEFAULT_VAD_OPTIONS["padding_ms"],
+    "VAD_MAX_PAUSE_MS": DEFAULT_VAD_OPTIONS["max_pause_ms"],
+    "CHUNK_SEC": 30,
+    "CHUNK_SEARCH_SEC": 3,
+}
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jwhisper_config.json")
+
+
+# -------------------- FILES --------------------
+def find_audio(paths: List[str]) -> List[str]:
+    """Expand directories (recursively) into the audio files they contain"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                found.extend(os.path.join(root, name) for name in sorted(names)
+                             if name.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            found.append(path)
+    return [os.path.abspath(path) for path in found]
+
+
+def pcm_to_float(frames: bytes, width: int) -> np.ndarray:
+    """Interleaved PCM samples of width bytes as float32 in -1..1"""
+    if width == 1:
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if width == 2:
+        return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples -= (samples & 0x800000) << 1  # Sign-extend
+        return samples.astype(np.float32) / 8388608.0
+    return (np.frombuffer(frames, dtype=np.int32) / 2147483648.0).astype(np.float32)
+
+
+def read_wav_blocks(wav: wave.Wave_read, block_samples: int) -> Iterator[np.ndarray]:
+    """Stream an open PCM WAV of any rate and channel count as 16 kHz mono blocks, closing it at the end"""
+    with wav:
+        rate, channels, width = wav.getframerate(), wav.getnchannels(), wav.getsampwidth()
+        resampler = PolyphaseResampler(rate, SAMPLE_RATE) if rate != SAMPLE_RATE else None
+        block_frames = max(1, block_samples * rate // SAMPLE_RATE)
+        while True:
+            frames = wav.readframes(block_frames)
+            if not frames:
+                break
+            block = pcm_to_float(frames, width)
+            if channels > 1:
+                block = block.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            yield resampler.process(block) if resampler is not None else block
+    if resampler is not None:
+        yield resampler.flush()
+
+
+def read_blocks(path: str, block_samples: int) -> Iterator[np.ndarray]:
+    """Yield a file as consecutive 16 kHz mono float32 blocks
+
+    PCM WAV is read from disk block by block and resampled as it streams, and
+    NPY is memory-mapped. Compressed formats (and WAVs that aren't PCM) go
+    through faster-whisper's decoder, which decodes the whole file at once.
+    """
+    if path.lower().endswith(".npy"):
+        audio = np.load(path, mmap_mode="r").reshape(-1)
+        for start in range(0, len(audio), block_samples):
+            block = np.asarray(audio[start:start + block_samples])
+            if block.dtype == np.int16:
+                yield block.astype(np.float32) / 32768.0
+            else:
+                yield block.astype(np.float32)
+        return
+
+    if path.lower().endswith(".wav"):
+        try:
+            wav = wave.open(path, "rb")
+        except wave.Error:
+            pass  # E.g. float samples - left to the decoder
+        else:
+            yield from read_wav_blocks(wav, block_samples)
+            return
+
+    from faster_whisper import decode_audio
+    audio = decode_audio(path, sampling_rate=SAMPLE_RATE)
+    for start in range(0, len(audio), block_samples):
+        yield audio[start:start + block_samples]
+
+
+def iter_chunks(blocks: Iterator[np.ndarray], chunk_sec: float, search_sec: float) -> Iterator[np.ndarray]:
+    """Regroup blocks into chunks of about chunk_sec, each cut at the quietest
+    moment of its last search_sec - the same rule as long hotkey recordings"""
+    chunk_samples = int(chunk_sec * SAMPLE_RATE)
+    search_samples = int(search_sec * SAMPLE_RATE)
+    pending: List[np.ndarray] = []
+    pending_samples = 0
+    for block in blocks:
+        pending.append(block)
+        pending_samples += len(block)
+        while pending_samples >= chunk_samples:
+            audio = np.concatenate(pending)
+            search = min(search_samples, chunk_samples)
+            cut = chunk_samples - search + quietest_point(audio[chunk_samples - search:chunk_samples], SAMPLE_RATE)
+            yield audio[:cut]
+            pending = [audio[cut:]]
+            pending_samples = len(audio) - cut
+    if pending_samples:
+        yield np.concatenate(pending)
+
+
+# -------------------- TRANSCRIPT --------------------
+def load_done(output: str) -> Dict[str, dict]:
+    """Records of files already transcribed without error, by path
+
+    A line cut short by an interrupted run is ignored, so that file runs again.
+    """
+    done = {}
+    if not os.path.exists(output):
+        return done
+    with open(output, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and "path" in record and not record.get("error"):
+                done[os.path.normcase(record["path"])] = record
+    return done
+
+
+# -------------------- TRANSCRIPTION --------------------
+class BatchTranscriber:
+    """Transcribes whole files chunk by chunk with the service's pipeline"""
+
+    def __init__(self, pool: ModelPool, settings: dict):
+        """
+        Args:
+            pool: Model pool holding the model named by WHISPER_MODEL_NAME
+            settings: Service settings (see DEFAULT_SETTINGS)
+        """
+        self.pool = pool
+        self.settings = settings
+        self.model_name = settings["WHISPER_MODEL_NAME"]
+        self.decode_options = with_language(
+            dict(DECODE_OPTIONS, beam_size=settings["BEAM_SIZE"], best_of=settings["BEST_OF"],
+                 temperature=settings["TEMPERATURE"]),
+            settings["LANGUAGE"])
+        self.vad_options = None
+        if settings["VAD_TRIM_ENABLED"]:
+            self.vad_options = dict(frame_ms=settings["VAD_FRAME_MS"], threshold_db=settings["VAD_THRESHOLD_DB"],
+                                    padding_ms=settings["VAD_PADDING_MS"], max_pause_ms=settings["VAD_MAX_PAUSE_MS"])
+
+    def transcribe_file(self, path: str) -> dict:
+        """Transcript record for one file; errors are recorded rather than raised"""
+        settings = self.settings
+        record = {"path": path, "text": "", "language": None, "duration_sec": 0.0, "chunks": 0, "rejected": {}}
+        timings = {"read": 0.0, "gate": 0.0, "vad": 0.0, "normalize": 0.0, "decode": 0.0}
+        vad_saved = 0.0
+        texts = []
+        file_start = time.perf_counter()
+        try:
+            record["size"] = os.path.getsize(path)
+            blocks = read_blocks(path, int(BLOCK_SEC * SAMPLE_RATE))
+            chunks = iter_chunks(blocks, settings["CHUNK_SEC"], settings["CHUNK_SEARCH_SEC"])
+            with self.pool.use(self.model_name) as model:
+                while True:
+                    stage_start = time.perf_counter()
+                    chunk = next(chunks, None)
+                    timings["read"] += time.perf_counter() - stage_start
+                    if chunk is None:
+                        break
+                    result = process_clip(model, chunk, settings["MIN_SPEECH_SEC"], settings["AUDIO_THRESHOLD"],
+                                          self.decode_options, vad_options=self.vad_options, inplace=True)
+                    record["chunks"] += 1
+                    record["duration_sec"] += len(chunk) / SAMPLE_RATE
+                    vad_saved += result.vad_saved
+                    for name, seconds in result.timings.items():
+                        timings[name] += seconds
+                    if result.reason:
+                        record["rejected"][result.reason] = record["rejected"].get(result.reason, 0) + 1
+                        continue
+                    texts.append(result.text)
+                    if record["language"] is None:
+                        record["language"] = result.language
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["text"] = " ".join(texts)
+        record["duration_sec"] = round(record["duration_sec"], 3)
+        record["vad_saved_sec"] = round(vad_saved, 3)
+        record["timings_ms"] = {name: round(seconds * 1000, 1) for name, seconds in timings.items()}
+        record["wall_sec"] = round(time.perf_counter() - file_start, 3)
+        record["rtf"] = round(timings["decode"] / record["duration_sec"], 4) if record["duration_sec"] else None
+        return record
+
+
+# -------------------- SETTINGS --------------------
+def load_settings(args) -> dict:
+    """Service defaults, then the settings file, then command-line options"""
+    settings = dict(DEFAULT_SETTINGS)
+    if args.config:
+        try:
+            overrides = load_config(args.config)
+        except ConfigError as e:
+            raise SystemExit(f"Settings file not usable: {e}")
+        settings.update({name: value for name, value in overrides.items() if name in settings})
+    for option, name in (("model", "WHISPER_MODEL_NAME"), ("device", "WHISPER_DEVICE"),
+                         ("compute_type", "WHISPER_COMPUTE_TYPE"), ("cpu_threads", "WHISPER_CPU_THREADS"),
+                         ("beam_size", "BEAM_SIZE"), ("best_of", "BEST_OF")):
+        if getattr(args, option) is not None:
+            settings[name] = getattr(args, option)
+    if args.language is not None:
+        settings["LANGUAGE"] = None if args.language == "auto" else args.language
+    if not args.vad:
+        settings["VAD_TRIM_ENABLED"] = False
+    return settings
+
+
+# -------------------- BATCH --------------------
+def run_batch(args) -> dict:
+    files = find_audio(args.paths)
+    if not files:
+        raise SystemExit("No audio files found")
+
+    if not args.resume and os.path.exists(args.output):
+        os.remove(args.output)
+    done = load_done(args.output)
+    todo = [path for path in files if os.path.normcase(path) not in done]
+    log(f"{len(files)} files, {len(files) - len(todo)} already transcribed, {len(todo)} to go")
+
+    settings = load_settings(args)
+    workers = max(1, args.workers)
+    cpu_threads = plan_cpu_threads(settings["WHISPER_CPU_THREADS"], workers, 1, args.reserved_cores)
+    pool = ModelPool(settings["WHISPER_DEVICE"], settings["WHISPER_COMPUTE_TYPE"], pinned=[settings["WHISPER_MODEL_NAME"]],
+                     cpu_threads=cpu_threads, num_workers=workers)
+    model_load_sec = 0.0
+    if todo:
+        stage_start = time.perf_counter()
+        pool.get(settings["WHISPER_MODEL_NAME"])
+        model_load_sec = time.perf_counter() - stage_start
+        log(f"Model {settings['WHISPER_MODEL_NAME']} loaded in {model_load_sec:.1f}s - "
+            f"{workers} workers, {cpu_threads} CPU threads each")
+    transcriber = BatchTranscriber(pool, settings)
+
+    audio_sec = decode_sec = 0.0
+    failed = 0
+    wall_start = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(workers) as executor:
+        # Workers open their file only when they start on it, so queued files cost no memory
+        futures = [executor.submit(transcriber.transcribe_file, path) for path in todo]
+        for count, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            name = os.path.basename(record["path"])
+            if record.get("error"):
+                failed += 1
+                log(f"[{count}/{len(todo)}] {name}: failed - {record['error']}")
+                continue
+            audio_sec += record["duration_sec"]
+            decode_sec += record["timings_ms"]["decode"] / 1000
+            log(f"[{count}/{len(todo)}] {name}: {record['duration_sec']:.1f}s audio, RTF {record['rtf']}")
+    wall_sec = time.perf_counter() - wall_start
+
+    return {
+        "output": os.path.abspath(args.output),
+        "model": settings["WHISPER_MODEL_NAME"],
+        "workers": workers,
+        "cpu_threads": cpu_threads,
+        "files": len(files),
+        "skipped": len(files) - len(todo),
+        "transcribed": len(todo) - failed,
+        "failed": failed,
+        "model_load_sec": round(model_load_sec, 3),
+        "audio_sec": round(audio_sec, 3),
+        "decode_sec": round(decode_sec, 3),
+        "wall_sec": round(wall_sec, 3),
+        # Decode time per audio second summed over workers, and wall time per audio second for the whole run
+        "rtf": round(decode_sec / audio_sec, 4) if audio_sec else None,
+        "wall_rtf": round(wall_sec / audio_sec, 4) if audio_sec else None,
+    }
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Transcribe folders of recorded audio with the JWhisper pipeline")
+    parser.add_argument("paths", nargs="+",
+                        help="Audio files or directories (searched recursively). WAV and NPY are streamed; "
+                             "compressed formats (mp3, m4a, flac, ...) are decoded whole into memory, "
+                             "about 64 KB per second of audio")
+    parser.add_argument("--output", default="transcripts.jsonl", help="JSONL transcript, appended to as files finish")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="Start a new transcript instead of skipping files already in it")
+    parser.add_argument("--workers", type=int, default=2, help="Files decoded at once (default: 2)")
+    parser.add_argument("--reserved-cores", type=int, default=0, help="Cores left free when sizing CPU threads")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE if os.path.exists(DEFAULT_CONFIG_FILE) else None,
+                        help="Service settings file to take model and gating settings from "
+                             "(default: jwhisper_config.json next to the service, if present)")
+    parser.add_argument("--model", help="Whisper model name or path (default: the service's)")
+    parser.add_argument("--device")
+    parser.add_argument("--compute-type")
+    parser.add_argument("--cpu-threads", type=int, help="Threads per decode (default: cores split across workers)")
+    parser.add_argument("--language", help='Language code, or "auto" to detect')
+    parser.add_argument("--beam-size", type=int)
+    parser.add_argument("--best-of", type=int)
+    parser.add_argument("--no-vad", dest="vad", action="store_false", help="Skip energy VAD trimming")
+    parser.add_argument("--summary", help="Also write the JSON summary to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run_batch(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
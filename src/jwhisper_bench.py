@@ -0,0 +1,625 @@
+"""Offline latency benchmark for the JWhisper pipeline.
+
+Feeds WAV/NPY fixtures through the same gating, normalization and decoding
+as the hotkey service, with text insertion replaced by a fake backend, and prints
+per-stage latency percentiles, real-time factor and peak memory as JSON.
+No microphone, Windows or keyboard is needed.
+
+Usage:
+    python src/jwhisper_bench.py fixtures/ --model tiny --beam-size 1
+    python src/jwhisper_bench.py a.wav b.npy --repeat 5 --output bench.json
+    python src/jwhisper_bench.py fixtures/ --throughput --batch-size 4
+    python src/jwhisper_bench.py fixtures/ --model small --tune
+    python src/jwhisper_bench.py --import-time
+    python src/jwhisper_bench.py --conditioning
+    python src/jwhisper_bench.py --resampler
+    python src/jwhisper_bench.py commands/ --commands
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from jwhisper_audio import AudioConditioner, PolyphaseResampler
+from jwhisper_commands import CommandMatcher, KIND_TEXT
+from jwhisper_engine import (
+    SAMPLE_RATE, DECODE_OPTIONS, DEFAULT_VAD_OPTIONS, BATCH_MAX_CLIP_SEC, create_model, warm_up_model, choose_decode,
+    process_clip, prepare_clip, transcribe_audio, transcribe_batch, join_segments, with_language,
+)
+from jwhisper_insert import FakeBackend
+from jwhisper_models import TUNING_KEYS, plan_cpu_threads
+
+FIXTURE_EXTENSIONS = (".wav", ".npy")
+
+# Same gates as the hotkey service (MIN_SPEECH_SEC / AUDIO_THRESHOLD in jwhisper.py)
+DEFAULT_MIN_SPEECH_SEC = 0.5
+DEFAULT_AUDIO_THRESHOLD = 0.001
+
+DEFAULT_TUNING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jwhisper_tuning.json")
+
+
+# -------------------- FIXTURES --------------------
+def find_fixtures(paths: List[str]) -> List[str]:
+    """Expand directories into the fixture files they contain"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(FIXTURE_EXTENSIONS):
+                    found.append(os.path.join(path, name))
+        else:
+            found.append(path)
+    return found
+
+
+def load_fixture(path: str) -> np.ndarray:
+    """Read a fixture as 16 kHz mono float32"""
+    if path.lower().endswith(".npy"):
+        audio = np.load(path)
+        if audio.dtype == np.int16:
+            audio = audio.astype(np.float32) / 32768.0
+        return np.ascontiguousarray(audio.reshape(-1), dtype=np.float32)
+
+    with wave.open(path, "rb") as wav:
+        rate, channels, width = wav.getframerate(), wav.getnchannels(), wav.getsampwidth()
+        frames = wav.readframes(wav.getnframes())
+    if rate != SAMPLE_RATE or width != 2:
+        # Let faster-whisper's decoder handle resampling and odd sample formats
+        from faster_whisper import decode_audio
+        return decode_audio(path, sampling_rate=SAMPLE_RATE)
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
+
+
+# -------------------- MEASUREMENT --------------------
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process in MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return 0.0
+
+
+def summarize(values: List[float], scale: float = 1000.0, unit: str = "_ms") -> Dict[str, float]:
+    """Percentiles of a list of seconds, in milliseconds by default"""
+    if not values:
+        return {}
+    data = np.asarray(values) * scale
+    summary = {"count": len(values), "mean" + unit: round(float(data.mean()), 4)}
+    for pct in (50, 90, 95, 99):
+        summary[f"p{pct}{unit}"] = round(float(np.percentile(data, pct)), 4)
+    summary["max" + unit] = round(float(data.max()), 4)
+    return summary
+
+
+# -------------------- THROUGHPUT --------------------
+def run_throughput(model, clips: List[np.ndarray], decode_options: dict, batch_size: int, repeat: int) -> dict:
+    """Decode the same prepared clips one by one and in batches, and compare clips per second"""
+    audio_sec = sum(len(clip) for clip in clips) / SAMPLE_RATE * repeat
+    modes = {}
+
+    stage_start = time.perf_counter()
+    sequential_texts = []
+    for _ in range(repeat):
+        sequential_texts = [join_segments(transcribe_audio(model, clip, decode_options)[0]) for clip in clips]
+    modes["sequential"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    batched_texts = []
+    for _ in range(repeat):
+        batched_texts = []
+        for i in range(0, len(clips), batch_size):
+            decoded = transcribe_batch(model, clips[i:i + batch_size], decode_options)
+            batched_texts.extend(join_segments(segments) for segments, _ in decoded)
+    modes["batched"] = time.perf_counter() - stage_start
+
+    report = {"batch_size": batch_size, "clips": len(clips) * repeat, "audio_sec": round(audio_sec, 3)}
+    for mode, seconds in modes.items():
+        report[mode] = {
+            "wall_sec": round(seconds, 3),
+            "clips_per_sec": round(len(clips) * repeat / seconds, 3) if seconds else None,
+            "audio_sec_per_sec": round(audio_sec / seconds, 3) if seconds else None,
+        }
+    report["speedup"] = round(modes["sequential"] / modes["batched"], 3) if modes["batched"] else None
+    # Batching may legitimately change a word here and there - report how many clips came out identical
+    report["identical_texts"] = sum(a == b for a, b in zip(sequential_texts, batched_texts))
+    return report
+
+
+# -------------------- AUTO-TUNE --------------------
+def tune_candidates(cores: int, workers: List[int], replicas: List[int]) -> List[Tuple[int, int, int]]:
+    """(cpu_threads, num_workers, replicas) combinations that don't oversubscribe the cores"""
+    candidates = []
+    for num_workers, copies in itertools.product(workers, replicas):
+        concurrent = num_workers * copies
+        if concurrent > cores:
+            continue
+        most = cores // concurrent
+        threads = {1 << i for i in range(most.bit_length()) if 1 << i <= most}
+        threads |= {most, plan_cpu_threads(None, num_workers, copies, cores=cores)}
+        candidates += [(t, num_workers, copies) for t in sorted(threads)]
+    return candidates
+
+
+def run_config(args, clips: List[np.ndarray], decode_options: dict, cpu_threads: int, num_workers: int, replicas: int) -> dict:
+    """Decode the clips with one thread/worker/replica setting, as many at a time as it can run"""
+    models = [create_model(args.model, args.device, args.compute_type, cpu_threads=cpu_threads, num_workers=num_workers)
+              for _ in range(replicas)]
+    for model in models:
+        warm_up_model(model, 1.0, decode_options)
+    jobs = [(i, clip) for i, clip in enumerate(clips * args.repeat)]
+    latencies: List[float] = []
+
+    def decode(job):
+        index, clip = job
+        stage_start = time.perf_counter()
+        transcribe_audio(models[index % replicas], clip, decode_options)
+        latencies.append(time.perf_counter() - stage_start)
+
+    stage_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers * replicas) as pool:
+        list(pool.map(decode, jobs))
+    wall_sec = time.perf_counter() - stage_start
+    audio_sec = sum(len(clip) for _, clip in jobs) / SAMPLE_RATE
+    return {
+        "cpu_threads": cpu_threads,
+        "num_workers": num_workers,
+        "replicas": replicas,
+        "wall_sec": round(wall_sec, 3),
+        "audio_sec_per_sec": round(audio_sec / wall_sec, 3) if wall_sec else None,
+        "latency": summarize(latencies),
+    }
+
+
+def run_tune(args) -> dict:
+    """Sweep CPU threads, workers and replicas over the fixtures and save the fastest setting"""
+    language = None if args.language in (None, "auto") else args.language
+    decode_options = with_language(dict(DECODE_OPTIONS, beam_size=args.beam_size, best_of=args.best_of), language)
+    vad_options = DEFAULT_VAD_OPTIONS if args.vad else None
+    clips = []
+    for path in find_fixtures(args.fixtures):
+        result, clip = prepare_clip(load_fixture(path), args.min_speech_sec, args.audio_threshold, vad_options,
+                                    inplace=True)
+        if not result.reason:
+            clips.append(clip)
+    if not clips:
+        raise SystemExit("No usable fixtures found")
+
+    cores = os.cpu_count() or 1
+    results = []
+    for cpu_threads, num_workers, replicas in tune_candidates(cores, args.tune_workers, args.tune_replicas):
+        result = run_config(args, clips, decode_options, cpu_threads, num_workers, replicas)
+        print(f"threads={cpu_threads} workers={num_workers} replicas={replicas}: {result['wall_sec']:.2f}s",
+              file=sys.stderr)
+        results.append(result)
+    best = min(results, key=lambda r: r["wall_sec"])
+
+    tuning = {key: best[key] for key in TUNING_KEYS}
+    tuning.update(model=args.model, device=args.device, compute_type=args.compute_type, cpu_count=cores,
+                  tuned_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    tmp_path = args.tune + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp_path, args.tune)
+    default = next((r for r in results if (r["num_workers"], r["replicas"]) == (1, 1)
+                    and r["cpu_threads"] == min(cores, 4)), None)
+    return {
+        "tuning_file": args.tune,
+        "best": tuning,
+        "speedup_vs_library_default": round(default["wall_sec"] / best["wall_sec"], 3) if default else None,
+        "clips": len(clips) * args.repeat,
+        "results": results,
+    }
+
+
+# -------------------- BENCHMARK --------------------
+def run_benchmark(args) -> dict:
+    fixtures = find_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit("No fixtures found")
+
+    language = None if args.language in (None, "auto") else args.language
+    decode_options = with_language(dict(DECODE_OPTIONS, beam_size=args.beam_size, best_of=args.best_of), language)
+
+    model_kwargs = dict(cpu_threads=args.cpu_threads or 0, num_workers=args.num_workers)
+    stage_start = time.perf_counter()
+    model = create_model(args.model, args.device, args.compute_type, **model_kwargs)
+    model_load_sec = time.perf_counter() - stage_start
+
+    fast_model = model
+    if args.adaptive and args.fast_model:
+        fast_model = create_model(args.fast_model, args.device, args.compute_type, **model_kwargs)
+
+    warmup_sec = None
+    if args.warmup:
+        stage_start = time.perf_counter()
+        warm_up_model(model, 1.0, decode_options)
+        if fast_model is not model:
+            warm_up_model(fast_model, 1.0, decode_options)
+        warmup_sec = time.perf_counter() - stage_start
+
+    stages: Dict[str, List[float]] = {"read": [], "gate": [], "vad": [], "normalize": [], "decode": [], "insert": [], "total": []}
+    rtf: List[float] = []
+    rejected: Dict[str, int] = {}
+    profiles: Dict[str, int] = {}
+    audio_sec = 0.0
+    decode_sec = 0.0
+    vad_saved_sec = 0.0
+    vad_options = DEFAULT_VAD_OPTIONS if args.vad else None
+    clips = []
+    inserter = FakeBackend()  # Keeps the insert stage in the report without touching a window
+
+    for _ in range(args.repeat):
+        for path in fixtures:
+            clip_start = time.perf_counter()
+            audio = load_fixture(path)
+            stages["read"].append(time.perf_counter() - clip_start)
+
+            clip_model, clip_options = model, decode_options
+            if args.adaptive:
+                choice = choose_decode(len(audio) / SAMPLE_RATE)
+                clip_model = fast_model if choice.tier == "fast" else model
+                clip_options = choice.options(decode_options)
+                profile = f"beam={choice.beam_size} best_of={choice.best_of} tier={choice.tier}"
+                profiles[profile] = profiles.get(profile, 0) + 1
+
+            result = process_clip(clip_model, audio, args.min_speech_sec, args.audio_threshold, clip_options,
+                                  vad_options=vad_options, inplace=True)
+            vad_saved_sec += result.vad_saved
+            for name, seconds in result.timings.items():
+                stages[name].append(seconds)
+
+            if result.reason:
+                rejected[result.reason] = rejected.get(result.reason, 0) + 1
+            else:
+                stage_start = time.perf_counter()
+                inserter.insert(result.text)
+                stages["insert"].append(time.perf_counter() - stage_start)
+            stages["total"].append(time.perf_counter() - clip_start)
+
+            if "decode" in result.timings and result.duration > 0:
+                audio_sec += result.duration
+                decode_sec += result.timings["decode"]
+                rtf.append(result.timings["decode"] / result.duration)
+            if len(clips) < len(fixtures):
+                clips.append({"file": os.path.basename(path), "duration_sec": round(result.duration, 3),
+                              "reason": result.reason, "text": result.text})
+
+    throughput = None
+    if args.throughput:
+        prepared = []
+        for path in fixtures:
+            result, clip = prepare_clip(load_fixture(path), args.min_speech_sec, args.audio_threshold, vad_options,
+                                    inplace=True)
+            if not result.reason and len(clip) <= BATCH_MAX_CLIP_SEC * SAMPLE_RATE:
+                prepared.append(clip)
+        if prepared:
+            throughput = run_throughput(model, prepared, decode_options, args.batch_size, args.repeat)
+
+    import faster_whisper
+    return {
+        "config": {
+            "model": args.model,
+            "device": args.device,
+            "compute_type": args.compute_type,
+            "cpu_threads": args.cpu_threads or "library default",
+            "num_workers": args.num_workers,
+            "beam_size": "adaptive" if args.adaptive else args.beam_size,
+            "best_of": "adaptive" if args.adaptive else args.best_of,
+            "fast_model": args.fast_model if args.adaptive else None,
+            "language": decode_options.get("language"),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "vad": args.vad,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "faster_whisper": getattr(faster_whisper, "__version__", "unknown"),
+        },
+        "model_load_sec": round(model_load_sec, 3),
+        "warmup_sec": round(warmup_sec, 3) if warmup_sec is not None else None,
+        "fixtures": len(fixtures),
+        "runs": len(stages["total"]),
+        "audio_sec": round(audio_sec, 3),
+        "vad_saved_sec": round(vad_saved_sec, 3),
+        "rejected": rejected,
+        "profiles": profiles,
+        "stages": {name: summarize(values) for name, values in stages.items() if values},
+        "rtf": dict(summarize(rtf, 1.0, ""), aggregate=round(decode_sec / audio_sec, 4) if audio_sec else None),
+        "peak_memory_mb": round(peak_memory_mb(), 1),
+        "throughput": throughput,
+        "clips": clips,
+    }
+
+
+# -------------------- CONDITIONING --------------------
+def legacy_condition(audio: np.ndarray) -> np.ndarray:
+    """Level check and peak normalization as the service did before AudioConditioner"""
+    level = float(np.abs(audio).mean())
+    max_level = np.abs(audio).max()
+    if level and 0 < max_level < 0.1:
+        audio = audio / max_level * 0.5
+    return audio
+
+
+def run_conditioning(durations=(1, 10, 60), repeat: int = 20) -> dict:
+    """Time and allocation per second of audio for the old and new level conditioning
+
+    The clip is quiet synthetic noise with a DC offset, so every method has to
+    rescale it. The in-place run gets a fresh copy of the clip each time,
+    made outside the measurement.
+    """
+    conditioner = AudioConditioner()
+    rng = np.random.default_rng(0)
+    report = {}
+    for seconds in durations:
+        clip = (rng.standard_normal(seconds * SAMPLE_RATE) * 0.01 + 0.02).astype(np.float32)
+        work = np.empty_like(clip)
+        conditioner.condition(clip)  # Size the scratch buffer before measuring
+        methods = {
+            "legacy": lambda: legacy_condition(work),
+            "conditioner_copy": lambda: conditioner.condition(work)[0],
+            "conditioner_inplace": lambda: conditioner.condition(work, inplace=True)[0],
+        }
+        results = {}
+        for name, method in methods.items():
+            times = []
+            for _ in range(repeat):
+                np.copyto(work, clip)
+                stage_start = time.perf_counter()
+                method()
+                times.append(time.perf_counter() - stage_start)
+            np.copyto(work, clip)
+            tracemalloc.start()
+            method()
+            allocated = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = {
+                "us_per_audio_sec": round(min(times) * 1e6 / seconds, 2),
+                "peak_alloc_bytes_per_audio_sec": round(allocated / seconds),
+            }
+        report[f"{seconds}s"] = results
+    return report
+
+
+# -------------------- RESAMPLER --------------------
+RESAMPLER_RATES = (8000, 22050, 32000, 44100, 48000, 96000)
+PASSBAND_TONES = (100, 440, 1000, 3000, 6000)  # Hz, kept below each rate's passband edge
+MIN_PASSBAND_SNR_DB = 60.0
+MAX_ALIAS_DB = -60.0
+
+
+def tone_snr_db(rate: int, frequency: float, seconds: float = 2.0, block: int = 0) -> float:
+    """SNR of a resampled sine against the exact 16 kHz sine; block > 0 feeds it in blocks of that size"""
+    x = np.sin(2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate).astype(np.float32)
+    resampler = PolyphaseResampler(rate, SAMPLE_RATE)
+    if block:
+        parts = [resampler.process(x[i:i + block]) for i in range(0, len(x), block)]
+    else:
+        parts = [resampler.process(x)]
+    y = np.concatenate(parts + [resampler.flush()])
+    reference = np.sin(2 * np.pi * frequency * np.arange(len(y)) / SAMPLE_RATE)
+    edge = int(0.05 * SAMPLE_RATE)  # Skip the start-up and silence-padded ends
+    error = y[edge:len(reference) - edge] - reference[edge:-edge]
+    return float(10 * np.log10(np.mean(reference[edge:-edge] ** 2) / max(np.mean(error ** 2), 1e-30)))
+
+
+def alias_db(rate: int) -> float:
+    """Power left of a full-scale tone above 8 kHz after resampling to 16 kHz, relative to the tone"""
+    alias_tone = min(10000, 0.45 * rate)
+    x = np.sin(2 * np.pi * alias_tone * np.arange(rate * 2) / rate).astype(np.float32)
+    y = PolyphaseResampler(rate, SAMPLE_RATE).process(x)[800:-800]
+    return float(10 * np.log10(max(np.mean(y.astype(np.float64) ** 2), 1e-30) / 0.5))
+
+
+def run_resampler(seconds: int = 10) -> dict:
+    """Accuracy and speed of the capture resampler on synthetic signals
+
+    Accuracy: sines in the passband must come out at 16 kHz with at least
+    MIN_PASSBAND_SNR_DB, also when streamed in odd-sized blocks, and a tone
+    above 8 kHz must be attenuated to MAX_ALIAS_DB instead of folding back.
+    Speed: white noise fed in 10 ms blocks, as the converter thread does.
+    """
+    report = {"ok": True, "rates": {}}
+    rng = np.random.default_rng(0)
+    for rate in RESAMPLER_RATES:
+        passband = 0.94 * min(rate, SAMPLE_RATE) / 2
+        tones = [f for f in PASSBAND_TONES if f < 0.9 * passband]
+        snr = {f"{f}hz": round(tone_snr_db(rate, f), 1) for f in tones}
+        streamed = round(min(tone_snr_db(rate, f, block=317) for f in tones), 1)
+        result = {"passband_snr_db": snr, "streamed_min_snr_db": streamed}
+        ok = min(min(snr.values()), streamed) >= MIN_PASSBAND_SNR_DB
+        if rate > SAMPLE_RATE:
+            result["alias_db"] = round(alias_db(rate), 1)
+            ok = ok and result["alias_db"] <= MAX_ALIAS_DB
+
+        noise = rng.standard_normal(rate * seconds).astype(np.float32)
+        resampler = PolyphaseResampler(rate, SAMPLE_RATE)
+        block = rate // 100
+        stage_start = time.perf_counter()
+        for i in range(0, len(noise), block):
+            resampler.process(noise[i:i + block])
+        elapsed = time.perf_counter() - stage_start
+        result.update(
+            ratio=f"{resampler.up}/{resampler.down}",
+            taps_per_output=resampler.taps,
+            latency_ms=round(resampler.latency_sec * 1000, 2),
+            us_per_audio_sec=round(elapsed * 1e6 / seconds, 1),
+            realtime_x=round(seconds / elapsed),
+            ok=ok,
+        )
+        report["rates"][str(rate)] = result
+        report["ok"] = report["ok"] and ok
+    return report
+
+
+# -------------------- COMMANDS --------------------
+COMMAND_BUDGET_MS = 100.0  # Commands should finish well inside this on CPU
+
+
+def command_phrase(path: str) -> str:
+    """Phrase a command fixture is named after: "select_all_2.wav" -> "select all\""""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[_-]\d+$", "", stem).replace("_", " ").replace("-", " ")
+
+
+def run_commands(args) -> dict:
+    """Recognition accuracy and latency of command mode
+
+    Each fixture is one spoken command named after its phrase; the phrase
+    list is every name in the fixture set. Clips are gated and trimmed like
+    dictation, then decoded by the command decoder.
+    """
+    fixtures = find_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit("No fixtures found")
+    expected = [command_phrase(path) for path in fixtures]
+    matcher = CommandMatcher([(phrase, KIND_TEXT, phrase) for phrase in dict.fromkeys(expected)])
+    language = None if args.language in (None, "auto") else args.language
+    model = create_model(args.model, args.device, args.compute_type, cpu_threads=args.cpu_threads or 0)
+    if args.warmup:
+        matcher.recognize(model, np.zeros(SAMPLE_RATE, dtype=np.float32), language)
+
+    decode, total, clips = [], [], []
+    correct = fallback = 0
+    vad_options = DEFAULT_VAD_OPTIONS if args.vad else None
+    for _ in range(args.repeat):
+        for path, phrase in zip(fixtures, expected):
+            audio = load_fixture(path)
+            clip_start = time.perf_counter()
+            result, clip_audio = prepare_clip(audio, args.min_speech_sec, args.audio_threshold, vad_options, inplace=True)
+            if result.reason:
+                clips.append({"fixture": os.path.basename(path), "rejected": result.reason})
+                continue
+            match = matcher.recognize(model, clip_audio, language)
+            total.append(time.perf_counter() - clip_start)
+            decode.append(match.decode_sec)
+            heard = match.command.phrase if match.command else None
+            correct += heard == phrase
+            fallback += heard is None
+            clips.append({"fixture": os.path.basename(path), "text": match.text, "command": heard,
+                          "score": round(match.score, 3), "decode_ms": round(match.decode_sec * 1000, 1)})
+    return {
+        "model": args.model,
+        "commands": len(matcher.commands),
+        "accuracy": round(correct / len(decode), 3) if decode else None,
+        "fallback_rate": round(fallback / len(decode), 3) if decode else None,
+        "decode": summarize(decode),
+        "total": summarize(total),
+        "within_budget": bool(total) and float(np.percentile(total, 95)) * 1000 <= COMMAND_BUDGET_MS,
+        "clips": clips,
+    }
+
+
+def run_import_time(top: int = 10) -> dict:
+    """Time `import jwhisper` in a fresh interpreter and list the slowest imports"""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import jwhisper"],
+                          cwd=src_dir, capture_output=True, text=True)
+    wall_sec = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"import jwhisper failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(own_us), int(cumulative_us)))
+    total_us = next((cumulative for name, _, cumulative in modules if name == "jwhisper"), None)
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return {
+        "import_sec": round(total_us / 1e6, 3) if total_us is not None else None,
+        "interpreter_sec": round(wall_sec, 3),
+        "slowest": [{"module": name, "self_ms": round(own / 1000, 1), "cumulative_ms": round(cumulative / 1000, 1)}
+                    for name, own, cumulative in slowest],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the JWhisper pipeline on recorded fixtures")
+    parser.add_argument("fixtures", nargs="*", help="WAV/NPY files or directories containing them")
+    parser.add_argument("--model", default="tiny", help="Whisper model name or path (default: tiny)")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--beam-size", type=int, default=DECODE_OPTIONS["beam_size"])
+    parser.add_argument("--best-of", type=int, default=DECODE_OPTIONS["best_of"])
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Pick beam size and model tier per clip with the default decoding profiles")
+    parser.add_argument("--fast-model", help='Model for the "fast" tier in --adaptive mode')
+    parser.add_argument("--language", help='Language code, or "auto" to detect (default: auto)')
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the fixture set")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="Skip the warm-up decode")
+    parser.add_argument("--no-vad", dest="vad", action="store_false", help="Skip energy VAD trimming")
+    parser.add_argument("--throughput", action="store_true",
+                        help="Also compare sequential and batched decoding of the fixture set")
+    parser.add_argument("--batch-size", type=int, default=4, help="Clips per batch in --throughput mode")
+    parser.add_argument("--cpu-threads", type=int, help="Threads per decode (default: library default)")
+    parser.add_argument("--num-workers", type=int, default=1)
+    parser.add_argument("--tune", nargs="?", const=DEFAULT_TUNING_FILE,
+                        help="Sweep CPU threads, workers and replicas and write the fastest to this file "
+                             "(default: jwhisper_tuning.json next to the service)")
+    parser.add_argument("--tune-workers", type=int, nargs="+", default=[1, 2], help="num_workers values to try")
+    parser.add_argument("--tune-replicas", type=int, nargs="+", default=[1], help="Replica counts to try")
+    parser.add_argument("--import-time", action="store_true",
+                        help="Only measure how long importing the service takes (no fixtures needed)")
+    parser.add_argument("--conditioning", action="store_true",
+                        help="Only run the audio conditioning micro-benchmark (no fixtures needed)")
+    parser.add_argument("--resampler", action="store_true",
+                        help="Only check the capture resampler's accuracy and speed (no fixtures needed)")
+    parser.add_argument("--commands", action="store_true",
+                        help="Recognize fixtures named after command phrases with the command decoder")
+    parser.add_argument("--min-speech-sec", type=float, default=DEFAULT_MIN_SPEECH_SEC)
+    parser.add_argument("--audio-threshold", type=float, default=DEFAULT_AUDIO_THRESHOLD)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.import_time:
+        report = run_import_time()
+    elif args.conditioning:
+        report = run_conditioning()
+    elif args.resampler:
+        report = run_resampler()
+    elif args.commands:
+        report = run_commands(args)
+    else:
+        report = run_tune(args) if args.tune else run_benchmark(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.resampler and not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
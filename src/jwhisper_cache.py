@@ -0,0 +1,190 @@
+"""Result cache for repeated short phrases.
+
+A clip is reduced to a compact acoustic fingerprint: log band energies on a
+fixed time grid, with the mean removed per band so microphone gain and
+channel colour cancel out. A new clip whose fingerprint is close enough to a
+stored one, at a similar duration and in the same language, gets the stored
+text without running Whisper. Entries are evicted least recently used first
+and can be kept on disk between sessions.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger('JWhisperHotkey')
+
+FINGERPRINT_BANDS = 16
+FINGERPRINT_FRAMES = 32
+FRAME_MS = 25
+HOP_MS = 10
+
+
+def fingerprint(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Unit-length vector of FINGERPRINT_BANDS x FINGERPRINT_FRAMES log band energies"""
+    frame = sample_rate * FRAME_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    if len(audio) < frame:
+        audio = np.pad(audio, (0, frame - len(audio)))
+    n_frames = 1 + (len(audio) - frame) // hop
+    frames = np.lib.stride_tricks.as_strided(
+        audio, shape=(n_frames, frame), strides=(audio.strides[0] * hop, audio.strides[0]), writeable=False)
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame).astype(np.float32), axis=1)) ** 2
+
+    # Log-spaced bands from 100 Hz to 8 kHz (speech energy lives there)
+    freqs = np.fft.rfftfreq(frame, 1.0 / sample_rate)
+    edges = np.geomspace(100, min(8000, sample_rate / 2), FINGERPRINT_BANDS + 1)
+    band_index = np.clip(np.searchsorted(edges, freqs) - 1, -1, FINGERPRINT_BANDS)
+    bands = np.zeros((n_frames, FINGERPRINT_BANDS), dtype=np.float64)
+    for band in range(FINGERPRINT_BANDS):
+        columns = band_index == band
+        if columns.any():
+            bands[:, band] = power[:, columns].sum(axis=1)
+    # 40 dB of dynamic range - below that, background noise decides the value
+    features = np.log(np.maximum(bands, bands.max() * 1e-4 + 1e-10))
+    features -= features.mean(axis=0)
+
+    # Fixed time grid, so clips of slightly different length line up
+    grid = np.linspace(0, n_frames - 1, FINGERPRINT_FRAMES)
+    resampled = np.stack([np.interp(grid, np.arange(n_frames), features[:, band])
+                          for band in range(FINGERPRINT_BANDS)], axis=1)
+    vector = resampled.ravel().astype(np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+class CacheHit:
+    """A stored result that matched a new clip"""
+
+    def __init__(self, text: str, similarity: float, decode_sec: float):
+        self.text = text
+        self.similarity = similarity
+        self.decode_sec = decode_sec  # What the original decode cost
+
+
+class _Entry:
+    def __init__(self, fp: np.ndarray, duration: float, language: str, text: str, decode_sec: float):
+        self.fp = fp
+        self.duration = duration
+        self.language = language
+        self.text = text
+        self.decode_sec = decode_sec
+
+
+class ResultCache:
+    """In-memory LRU of fingerprinted results, optionally saved to an .npz file"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 500,
+        threshold: float = 0.97,
+        max_duration_ratio: float = 1.25,
+        save_every: int = 10,
+    ):
+        """
+        Args:
+            path: File the cache is loaded from and saved to; None keeps it in memory only
+            max_entries: Least recently used entries beyond this are evicted
+            threshold: Cosine similarity a fingerprint needs to count as the same phrase
+            max_duration_ratio: Longest/shortest duration allowed between a clip and a stored entry
+            save_every: Save to path after this many new entries
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.max_duration_ratio = max_duration_ratio
+        self.save_every = save_every
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_sec = 0.0
+        if path and os.path.exists(path):
+            try:
+                self.load()
+            except Exception as e:
+                logger.warning(f"Failed to load result cache {path}: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    # -------------------- LOOKUP --------------------
+    def lookup(self, fp: np.ndarray, duration: float, language: Optional[str] = None) -> Optional[CacheHit]:
+        """Best stored result for a fingerprint, if it clears the similarity threshold"""
+        lookup_start = time.perf_counter()
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if max(entry.duration, duration) <= self.max_duration_ratio * min(entry.duration, duration)
+                and (language is None or entry.language in ("", language))
+            ]
+            best_key, best_similarity = None, -1.0
+            if candidates:
+                similarities = np.stack([entry.fp for _, entry in candidates]).astype(np.float32) @ fp
+                best = int(np.argmax(similarities))
+                best_key, best_similarity = candidates[best][0], float(similarities[best])
+            if best_key is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.saved_sec += max(0.0, entry.decode_sec - (time.perf_counter() - lookup_start))
+            return CacheHit(entry.text, best_similarity, entry.decode_sec)
+
+    def put(self, fp: np.ndarray, duration: float, language: Optional[str], text: str, decode_sec: float):
+        """Store a decoded result, evicting the least recently used entries over the limit"""
+        with self._lock:
+            self._entries[self._next_key] = _Entry(fp.astype(np.float16), duration, language or "", text, decode_sec)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            due = self.path and self._unsaved >= self.save_every
+        if due:
+            try:
+                self.save()
+            except Exception as e:
+                logger.warning(f"Failed to save result cache: {e}")
+
+    # -------------------- PERSISTENCE --------------------
+    def save(self):
+        """Write the cache atomically to its file"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._entries.values())
+            self._unsaved = 0
+        tmp_path = self.path + ".tmp.npz"
+        size = FINGERPRINT_BANDS * FINGERPRINT_FRAMES
+        np.savez(
+            tmp_path,
+            fingerprints=np.stack([e.fp for e in entries]) if entries else np.zeros((0, size), np.float16),
+            durations=np.array([e.duration for e in entries], dtype=np.float32),
+            decode_sec=np.array([e.decode_sec for e in entries], dtype=np.float32),
+            languages=np.array([e.language for e in entries], dtype=str),
+            texts=np.array([e.text for e in entries], dtype=str),
+        )
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            rows = zip(data["fingerprints"], data["durations"], data["languages"], data["texts"], data["decode_sec"])
+            with self._lock:
+                for fp, duration, language, text, decode_sec in rows:
+                    self._entries[self._next_key] = _Entry(fp, float(duration), str(language), str(text), float(decode_sec))
+                    self._next_key += 1
+        logger.info(f"Loaded {len(self._entries)} cached results from {self.path}")
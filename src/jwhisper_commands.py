@@ -0,0 +1,117 @@
+"""Spoken commands for JWhisper.
+
+A command is a short phrase from a user-defined list that runs a key
+combination ("undo" -> ctrl+z) or inserts a snippet instead of being typed
+as text. Recognition is cheap: a tiny model decodes greedily, with no
+timestamps, a handful of tokens at most and the phrase list as its prompt,
+which steers it towards the command vocabulary. The result is then matched
+against the phrases with a fuzzy string score. Anything that doesn't match
+confidently is left to normal dictation.
+"""
+import difflib
+import logging
+import re
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from jwhisper_engine import join_segments, transcribe_audio
+
+logger = logging.getLogger('JWhisperHotkey')
+
+KIND_KEY = "key"    # value is a key combination such as "ctrl+shift+z"
+KIND_TEXT = "text"  # value is a snippet inserted like dictated text
+KINDS = (KIND_KEY, KIND_TEXT)
+
+# Greedy, timestamp-free and short: a command is a few tokens
+COMMAND_DECODE_OPTIONS = dict(
+    beam_size=1,
+    best_of=1,
+    temperature=0.0,
+    without_timestamps=True,
+    condition_on_previous_text=False,
+    vad_filter=False,  # The clip was already gated and trimmed
+    max_new_tokens=12,
+)
+
+# Decodes Whisper itself isn't sure about are never treated as commands
+MAX_NO_SPEECH_PROB = 0.6
+MIN_AVG_LOGPROB = -1.0
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+
+
+def normalize_phrase(text: str) -> str:
+    """Lower case without punctuation or repeated spaces, e.g. "Select all." -> "select all\""""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+class Command:
+    """One phrase and what it does"""
+
+    def __init__(self, phrase: str, kind: str, value: str):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown command kind: {kind}")
+        self.phrase = phrase
+        self.kind = kind
+        self.value = value
+        self.key = normalize_phrase(phrase)
+
+    def __repr__(self):
+        return f"Command({self.phrase!r} -> {self.kind} {self.value!r})"
+
+
+class CommandMatch:
+    """Outcome of recognizing one clip as a command"""
+
+    def __init__(self, text: str, command: Optional[Command] = None, score: float = 0.0,
+                 decode_sec: float = 0.0, reason: str = ""):
+        self.text = text          # What the model heard
+        self.command = command    # None when the clip should be dictated instead
+        self.score = score        # Similarity of text to command.phrase, 0..1
+        self.decode_sec = decode_sec
+        self.reason = reason      # Why there is no command
+
+
+class CommandMatcher:
+    """Matches decoded clips against a phrase list"""
+
+    def __init__(self, commands: Iterable[Sequence[str]], min_score: float = 0.8):
+        """
+        Args:
+            commands: (phrase, kind, value) rows, as in the COMMANDS setting
+            min_score: Lowest similarity (0..1) between what was heard and a phrase that still counts
+        """
+        self.commands: List[Command] = [Command(*row) for row in commands]
+        self.min_score = min_score
+        # Spelled the way Whisper would write them, so the prompt reads like earlier transcript
+        self.prompt = ", ".join(command.phrase.capitalize() for command in self.commands) + "."
+
+    def match(self, text: str) -> Tuple[Optional[Command], float]:
+        """Best command for a transcript and its score; None below min_score"""
+        heard = normalize_phrase(text)
+        best, best_score = None, 0.0
+        if not heard:
+            return None, 0.0
+        for command in self.commands:
+            score = 1.0 if heard == command.key else difflib.SequenceMatcher(None, heard, command.key).ratio()
+            if score > best_score:
+                best, best_score = command, score
+        return (best, best_score) if best_score >= self.min_score else (None, best_score)
+
+    def recognize(self, model, audio: np.ndarray, language: Optional[str] = None) -> CommandMatch:
+        """Decode a prepared clip with the command decoder and match it"""
+        options = dict(COMMAND_DECODE_OPTIONS, language=language, initial_prompt=self.prompt)
+        stage_start = time.perf_counter()
+        segments, _ = transcribe_audio(model, audio, options)
+        decode_sec = time.perf_counter() - stage_start
+        text = join_segments(segments)
+        if not text:
+            return CommandMatch(text, decode_sec=decode_sec, reason="no text")
+        if any(getattr(seg, "no_speech_prob", 0.0) > MAX_NO_SPEECH_PROB for seg in segments):
+            return CommandMatch(text, decode_sec=decode_sec, reason="no speech")
+        if any(getattr(seg, "avg_logprob", 0.0) < MIN_AVG_LOGPROB for seg in segments):
+            return CommandMatch(text, decode_sec=decode_sec, reason="low confidence")
+        command, score = self.match(text)
+        return CommandMatch(text, command, score, decode_sec, "" if command else f"best score {score:.2f}")
@@ -0,0 +1,282 @@
+"""Settings file for JWhisper with validation and live reload.
+
+The hotkey service keeps its built-in defaults as module constants. A JSON
+file next to it can override any setting listed in SETTINGS, using the same
+names:
+
+    {"WHISPER_MODEL_NAME": "base", "MIN_SPEECH_SEC": 0.3, "BEAM_SIZE": 1}
+
+The whole file is validated before anything is applied, so a typo never
+leaves the service half-configured. ConfigWatcher polls the file and reports
+every valid version. Each setting says how a change takes effect: LIVE ones
+are read again for the next utterance, MODEL ones need a model reload (done
+in the background by the service), RESTART ones only apply after a restart.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger('JWhisperHotkey')
+
+LIVE = "live"
+MODEL = "model"
+RESTART = "restart"
+
+DEFAULT_POLL_SEC = 1.0
+
+
+class ConfigError(ValueError):
+    """The settings file is unreadable or has invalid values"""
+
+
+# -------------------- VALIDATORS --------------------
+# Each returns the normalized value or raises ValueError with a short reason
+
+def number(minimum: Optional[float] = None, maximum: Optional[float] = None, integer: bool = False,
+           optional: bool = False) -> Callable[[Any], Any]:
+    def check(value):
+        if value is None and optional:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("must be a number" + (" or null" if optional else ""))
+        if integer and value != int(value):
+            raise ValueError("must be a whole number")
+        if minimum is not None and value < minimum:
+            raise ValueError(f"must be at least {minimum}")
+        if maximum is not None and value > maximum:
+            raise ValueError(f"must be at most {maximum}")
+        return int(value) if integer else float(value)
+    return check
+
+
+def boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError("must be true or false")
+    return value
+
+
+def text(choices=None, optional: bool = False) -> Callable[[Any], Any]:
+    def check(value):
+        if value is None and optional:
+            return None
+        if not isinstance(value, str) or not value:
+            raise ValueError("must be a non-empty string" + (" or null" if optional else ""))
+        if choices is not None and value not in choices:
+            raise ValueError(f"must be one of {', '.join(choices)}")
+        return value
+    return check
+
+
+def rows(*columns: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """A list of fixed-length rows, e.g. DECODE_PROFILES; rows become tuples"""
+    def check(value):
+        if not isinstance(value, list):
+            raise ValueError(f"must be a list of [{len(columns)} values] rows")
+        result = []
+        for i, row in enumerate(value):
+            if not isinstance(row, list) or len(row) != len(columns):
+                raise ValueError(f"row {i + 1} must have {len(columns)} values")
+            try:
+                result.append(tuple(column(item) for column, item in zip(columns, row)))
+            except ValueError as e:
+                raise ValueError(f"row {i + 1}: {e}")
+        return result
+    return check
+
+
+def integers(value):
+    if not isinstance(value, list) or not all(isinstance(v, int) and not isinstance(v, bool) and v >= 0 for v in value):
+        raise ValueError("must be a list of non-negative whole numbers")
+    return list(value)
+
+
+class Setting:
+    def __init__(self, check: Callable[[Any], Any], reload: str = LIVE):
+        self.check = check
+        self.reload = reload
+
+
+SETTINGS: Dict[str, Setting] = {
+    # Service
+    "PUSH_TO_TALK_KEY": Setting(text(), RESTART),
+    "PLATFORM": Setting(text(("auto", "windows", "null")), RESTART),
+    # Capture
+    "CAPTURE_SAMPLE_RATE": Setting(number(8000, 384000, integer=True, optional=True), RESTART),
+    "CHANNELS": Setting(number(1, 64, integer=True, optional=True), RESTART),
+    "RING_BUFFER_SEC": Setting(number(1), RESTART),
+    "PREROLL_MS": Setting(number(0, 5000, integer=True), RESTART),
+    "MAX_RECORDING_SEC": Setting(number(1)),
+    "CHUNK_SEC": Setting(number(5, 30)),
+    "CHUNK_SEARCH_SEC": Setting(number(0, 10)),
+    # Model
+    "WHISPER_MODEL_NAME": Setting(text(), MODEL),
+    "WHISPER_DEVICE": Setting(text(("cpu", "cuda", "auto")), MODEL),
+    "WHISPER_COMPUTE_TYPE": Setting(text(), MODEL),
+    "WHISPER_CPU_THREADS": Setting(number(0, integer=True, optional=True), MODEL),
+    "WHISPER_NUM_WORKERS": Setting(number(1, integer=True), MODEL),
+    "MODEL_REPLICAS": Setting(number(1, integer=True), MODEL),
+    "CPU_RESERVED_CORES": Setting(number(0, integer=True), MODEL),
+    "MODEL_POOL_MAX_MB": Setting(number(0), MODEL),
+    "INFERENCE_CPU_CORES": Setting(integers, RESTART),
+    "TUNING_FILE": Setting(text(optional=True), RESTART),
+    "WARMUP_ENABLED": Setting(boolean),
+    "WARMUP_AUDIO_SEC": Setting(number(0.1, 30)),
+    "PARALLEL_STARTUP": Setting(boolean, RESTART),
+    "INFERENCE_SERVER": Setting(boolean, RESTART),
+    "INFERENCE_SERVER_PORT": Setting(number(1024, 65535, integer=True), RESTART),
+    # Decoding
+    "BEAM_SIZE": Setting(number(1, 20, integer=True)),
+    "BEST_OF": Setting(number(1, 20, integer=True)),
+    "TEMPERATURE": Setting(number(0, 1)),
+    "ADAPTIVE_DECODING": Setting(boolean),
+    "DECODE_PROFILES": Setting(rows(number(0, optional=True), number(1, 20, integer=True),
+                                    number(1, 20, integer=True), text(("default", "fast")))),
+    "BUSY_QUEUE_DEPTH": Setting(number(0, integer=True, optional=True)),
+    "FAST_MODEL_NAME": Setting(text(optional=True)),
+    "LANGUAGE": Setting(text(optional=True)),
+    "LANGUAGE_ID_MODEL": Setting(text(optional=True)),
+    "LANGUAGE_ID_MIN_PROBABILITY": Setting(number(0, 1)),
+    "MODEL_ROUTES": Setting(rows(number(0, optional=True), text(optional=True), text())),
+    # Gating and VAD
+    "MIN_SPEECH_SEC": Setting(number(0)),
+    "AUDIO_THRESHOLD": Setting(number(0, 1)),
+    "VAD_TRIM_ENABLED": Setting(boolean),
+    "VAD_FRAME_MS": Setting(number(10, 100, integer=True)),
+    "VAD_THRESHOLD_DB": Setting(number(0, 60)),
+    "VAD_PADDING_MS": Setting(number(0, 2000, integer=True)),
+    "VAD_MAX_PAUSE_MS": Setting(number(0, integer=True)),
+    # Streaming
+    "STREAMING_ENABLED": Setting(boolean),
+    "STREAM_INTERVAL_SEC": Setting(number(0.1)),
+    "STREAM_MIN_WINDOW_SEC": Setting(number(0.5)),
+    "STREAM_STABLE_MARGIN_SEC": Setting(number(0)),
+    "STREAM_MAX_WINDOW_SEC": Setting(number(5, 30)),
+    # Worker
+    "WORKER_POLICY": Setting(text(("queue", "preempt", "merge"))),
+    "WORKER_MAX_PENDING": Setting(number(1, integer=True)),
+    "BATCH_MAX_SIZE": Setting(number(1, 32, integer=True)),
+    "BATCH_WINDOW_SEC": Setting(number(0, 5)),
+    # Insertion
+    "INSERT_BACKEND": Setting(text(("clipboard", "type"))),
+    "INSERT_ROUTES": Setting(rows(text(), text(("clipboard", "type")))),
+    "CLIPBOARD_CONFIRM_TIMEOUT_SEC": Setting(number(0, 5)),
+    "CLIPBOARD_RESTORE": Setting(boolean),
+    "CLIPBOARD_RESTORE_DELAY_SEC": Setting(number(0, 5)),
+    "INCREMENTAL_INSERT": Setting(boolean),
+    # Result cache
+    "RESULT_CACHE_ENABLED": Setting(boolean, RESTART),
+    "RESULT_CACHE_FILE": Setting(text(optional=True), RESTART),
+    "RESULT_CACHE_MAX_ENTRIES": Setting(number(1, integer=True), RESTART),
+    "RESULT_CACHE_THRESHOLD": Setting(number(0, 1)),
+    "RESULT_CACHE_MAX_CLIP_SEC": Setting(number(0)),
+    # Commands
+    "COMMAND_KEY": Setting(text(optional=True), RESTART),
+    "COMMAND_AUTO_DETECT": Setting(boolean),
+    "COMMAND_MAX_SEC": Setting(number(0.5, 10)),
+    "COMMAND_MODEL": Setting(text()),
+    "COMMAND_MIN_SCORE": Setting(number(0, 1)),
+    "COMMANDS": Setting(rows(text(), text(("key", "text")), text())),
+    # Metrics
+    "METRICS_FILE": Setting(text(optional=True), RESTART),
+    "METRICS_FLUSH_SEC": Setting(number(1), RESTART),
+    "METRICS_PORT": Setting(number(1024, 65535, integer=True, optional=True), RESTART),
+}
+
+
+# -------------------- LOADING --------------------
+def validate(data: Any) -> Dict[str, Any]:
+    """Normalized settings from a parsed file; raises ConfigError listing every problem"""
+    if not isinstance(data, dict):
+        raise ConfigError("the file must contain a JSON object")
+    values, problems = {}, []
+    for name, value in data.items():
+        if name.startswith("_"):
+            continue  # "_comment" and similar keys are allowed
+        setting = SETTINGS.get(name)
+        if setting is None:
+            problems.append(f"{name}: unknown setting")
+            continue
+        try:
+            values[name] = setting.check(value)
+        except ValueError as e:
+            problems.append(f"{name}: {e}")
+    if problems:
+        raise ConfigError("; ".join(problems))
+    return values
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Validated settings from path; an absent file means no overrides"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"can't read {os.path.basename(path)}: {e}")
+    return validate(data)
+
+
+class ConfigWatcher:
+    """Polls the settings file and calls on_change with every new valid version"""
+
+    def __init__(
+        self,
+        path: str,
+        on_change: Callable[[Dict[str, Any]], None],
+        on_error: Optional[Callable[[ConfigError], None]] = None,
+        poll_sec: float = DEFAULT_POLL_SEC,
+    ):
+        """
+        Args:
+            path: Settings file; it may not exist yet
+            on_change: Receives the validated overrides after each change (empty once the file is deleted)
+            on_error: Receives the error when a changed file is invalid; the previous settings stay
+            poll_sec: How often the file's modification time is checked
+        """
+        self.path = path
+        self._on_change = on_change
+        self._on_error = on_error
+        self.poll_sec = poll_sec
+        self._stamp = self._read_stamp()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check; True when new settings were applied"""
+        stamp = self._read_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            values = load_config(self.path)
+        except ConfigError as e:
+            logger.error(f"Settings file not applied: {e}")
+            if self._on_error:
+                self._on_error(e)
+            return False
+        self._on_change(values)
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="JWhisperConfig", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_sec):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Applying settings failed: {e}")
@@ -0,0 +1,308 @@
+"""Recognition core shared by the hotkey service and the offline tools.
+
+Everything here works on plain float32 arrays and a WhisperModel, with no
+dependency on Windows, the tray or the keyboard, so the same gating,
+normalization and decoding can be driven from a benchmark on any machine.
+
+faster_whisper is imported only when a model is actually created, so a
+client that decodes through the inference server never pays for it.
+"""
+import bisect
+import logging
+import time
+import weakref
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
+
+from jwhisper_audio import AudioConditioner, AudioStats, trim_silence
+
+logger = logging.getLogger('JWhisperHotkey')
+
+SAMPLE_RATE = 16000  # Whisper always works on 16 kHz mono
+
+DECODE_OPTIONS = dict(
+    language=None,  # Set per clip with with_language()
+    vad_filter=True,
+    beam_size=5,
+    best_of=5,
+    temperature=0.0,
+)
+
+# Prompt that nudges Whisper towards the right script and punctuation for a language
+INITIAL_PROMPTS = {
+    "ru": "Это русская речь.",
+}
+
+# Adaptive decoding: (longest clip in seconds or None for any length, beam_size, best_of, model tier)
+DEFAULT_DECODE_PROFILES = [
+    (3.0, 1, 1, "default"),    # Short commands - greedy
+    (15.0, 3, 3, "default"),
+    (None, 5, 5, "default"),
+]
+MODEL_TIERS = ("default", "fast")
+
+# Batched decoding packs clips into Whisper's 30s windows, one clip per window
+BATCH_MAX_CLIP_SEC = 30.0
+
+# Energy VAD run before Whisper (see jwhisper_audio.trim_silence)
+DEFAULT_VAD_OPTIONS = dict(frame_ms=30, threshold_db=10.0, padding_ms=200, max_pause_ms=1000)
+
+# Level conditioning before decoding: DC removal, gain towards -20 dBFS RMS, soft limiting
+conditioner = AudioConditioner()
+
+# Why a clip was not turned into text
+REJECT_EMPTY = "empty"
+REJECT_TOO_SHORT = "too_short"
+REJECT_TOO_QUIET = "too_quiet"
+REJECT_NO_SPEECH = "no_speech"
+REJECT_NO_TEXT = "no_text"
+
+
+class ClipResult:
+    """Outcome of running one clip through the pipeline"""
+
+    def __init__(self, duration: float = 0.0, level: float = 0.0, reason: Optional[str] = None):
+        self.duration = duration
+        self.level = level
+        self.reason = reason  # None when the clip produced text
+        self.text = ""
+        self.language = "unknown"
+        self.language_probability = 0.0
+        self.vad_saved = 0.0  # Seconds of silence trimmed before decoding
+        self.stats: Optional[AudioStats] = None  # Levels of the gated clip
+        self.gain = 1.0  # Applied by conditioning
+        self.timings: Dict[str, float] = {}  # Stage name -> seconds
+
+    @property
+    def rtf(self) -> Optional[float]:
+        """Real-time factor of the decode stage (decode seconds per audio second)"""
+        if "decode" not in self.timings or not self.duration:
+            return None
+        return self.timings["decode"] / self.duration
+
+
+class DecodeChoice:
+    """Decoding settings picked for one clip"""
+
+    def __init__(self, beam_size: int, best_of: int, tier: str = "default", reason: str = ""):
+        self.beam_size = beam_size
+        self.best_of = best_of
+        self.tier = tier
+        self.reason = reason
+
+    def options(self, base: Optional[dict] = None) -> dict:
+        """Decode options with this choice's beam settings applied"""
+        return dict(DECODE_OPTIONS if base is None else base, beam_size=self.beam_size, best_of=self.best_of)
+
+    def __str__(self):
+        return f"beam={self.beam_size} best_of={self.best_of} tier={self.tier} ({self.reason})"
+
+
+# -------------------- MODEL --------------------
+def create_model(name: str, device: str, compute_type: str, **kwargs) -> "WhisperModel":
+    """Build a WhisperModel, preferring the local download cache over a hub round-trip"""
+    from faster_whisper import WhisperModel
+    try:
+        return WhisperModel(name, device=device, compute_type=compute_type, local_files_only=True, **kwargs)
+    except Exception:
+        logger.info(f"Model {name} not in local cache - downloading")
+        return WhisperModel(name, device=device, compute_type=compute_type, **kwargs)
+
+
+def warm_up_model(model: "WhisperModel", seconds: float = 1.0, decode_options: Optional[dict] = None):
+    """Run one short decode so the first real clip doesn't pay for lazy initialization"""
+    options = dict(DECODE_OPTIONS if decode_options is None else decode_options)
+    # Low-level noise instead of silence, with VAD off - the decoder has to actually run
+    options.update(vad_filter=False, without_timestamps=True)
+    options.pop("initial_prompt", None)
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.01).astype(np.float32)
+    segments, _ = model.transcribe(audio, **options)
+    for _ in segments:
+        pass
+
+
+def with_language(decode_options: dict, language: Optional[str]) -> dict:
+    """Decode options for a known language (None lets Whisper detect it)"""
+    options = dict(decode_options, language=language)
+    if language in INITIAL_PROMPTS:
+        options["initial_prompt"] = INITIAL_PROMPTS[language]
+    else:
+        options.pop("initial_prompt", None)
+    return options
+
+
+# -------------------- DECODING POLICY --------------------
+def choose_decode(duration: float, queue_depth: int = 0, profiles=None, busy_queue_depth: Optional[int] = None) -> DecodeChoice:
+    """Pick beam size, best_of and model tier for a clip of the given length
+
+    With busy_queue_depth or more recordings waiting, every clip is decoded
+    greedily on the fast tier so the queue drains.
+    """
+    if busy_queue_depth and queue_depth >= busy_queue_depth:
+        return DecodeChoice(1, 1, "fast", f"{queue_depth} queued")
+    for max_sec, beam_size, best_of, tier in (DEFAULT_DECODE_PROFILES if profiles is None else profiles):
+        if max_sec is None or duration <= max_sec:
+            reason = f"{duration:.1f}s <= {max_sec}s" if max_sec is not None else f"{duration:.1f}s"
+            return DecodeChoice(beam_size, best_of, tier, reason)
+    return DecodeChoice(DECODE_OPTIONS["beam_size"], DECODE_OPTIONS["best_of"], "default", "no profile matched")
+
+
+# -------------------- PIPELINE --------------------
+def gate_clip(audio: np.ndarray, min_speech_sec: float, audio_threshold: float) -> ClipResult:
+    """Check duration and level; result.reason is set if the clip should not be decoded"""
+    duration = len(audio) / SAMPLE_RATE
+    if len(audio) == 0:
+        return ClipResult(0.0, 0.0, REJECT_EMPTY)
+    if duration < min_speech_sec:
+        return ClipResult(duration, 0.0, REJECT_TOO_SHORT)
+    stats = conditioner.measure(audio)
+    result = ClipResult(duration, stats.mean_abs, REJECT_TOO_QUIET if stats.mean_abs < audio_threshold else None)
+    result.stats = stats
+    return result
+
+
+def normalize_audio(audio: np.ndarray, stats: Optional[AudioStats] = None, inplace: bool = False) -> np.ndarray:
+    """Remove DC offset, boost quiet clips to a usable level and soft-limit peaks (see AudioConditioner)"""
+    return conditioner.condition(audio, stats, inplace)[0]
+
+
+def transcribe_audio(model: "WhisperModel", audio: np.ndarray, decode_options: Optional[dict] = None, cancelled=None):
+    """Run Whisper on a clip and return (segments, info), stopping early once cancelled is set"""
+    options = DECODE_OPTIONS if decode_options is None else decode_options
+    segments, info = model.transcribe(audio, **options)
+    # Segments are decoded lazily, so a cancelled clip stops between segments
+    decoded = []
+    for seg in segments:
+        decoded.append(seg)
+        if cancelled is not None and cancelled.is_set():
+            break
+    return decoded, info
+
+
+_batched_pipelines = weakref.WeakKeyDictionary()
+
+
+def transcribe_batch(model: "WhisperModel", clips: List[np.ndarray], decode_options: Optional[dict] = None) -> List[Tuple[list, object]]:
+    """Decode several clips in one batched encoder/decoder pass, returning (segments, info) per clip in order
+
+    The clips are laid end to end and handed to BatchedInferencePipeline
+    with one clip_timestamps entry each, so every clip becomes one row of the
+    batch. Each clip must be at most BATCH_MAX_CLIP_SEC long. The language is
+    detected once for the whole batch when decode_options leaves it unset.
+    """
+    if len(clips) == 1:
+        return [transcribe_audio(model, clips[0], decode_options)]
+    if hasattr(model, "transcribe_batch"):
+        # Models served by the inference server batch on the server side
+        return model.transcribe_batch(clips, decode_options)
+    options = dict(DECODE_OPTIONS if decode_options is None else decode_options)
+    options.pop("vad_filter", None)  # clip_timestamps replaces the pipeline's own VAD
+
+    starts = []
+    clip_timestamps = []
+    position = 0
+    for clip in clips:
+        starts.append(position / SAMPLE_RATE)
+        clip_timestamps.append({"start": position / SAMPLE_RATE, "end": (position + len(clip)) / SAMPLE_RATE})
+        position += len(clip)
+
+    pipeline = _batched_pipelines.get(model)
+    if pipeline is None:
+        from faster_whisper import BatchedInferencePipeline
+        pipeline = _batched_pipelines[model] = BatchedInferencePipeline(model)
+    segments, info = pipeline.transcribe(np.concatenate(clips), clip_timestamps=clip_timestamps,
+                                         batch_size=len(clips), **options)
+
+    per_clip: List[list] = [[] for _ in clips]
+    for seg in segments:
+        # Segment times are offsets into the concatenated audio
+        index = max(bisect.bisect_right(starts, seg.start + 1e-3) - 1, 0)
+        per_clip[index].append(seg)
+    return [(clip_segments, info) for clip_segments in per_clip]
+
+
+def join_segments(segments) -> str:
+    return " ".join(seg.text.strip() for seg in segments if seg.text.strip()).strip()
+
+
+def prepare_clip(
+    audio: np.ndarray,
+    min_speech_sec: float,
+    audio_threshold: float,
+    vad_options: Optional[dict] = None,
+    inplace: bool = False,
+) -> Tuple[ClipResult, np.ndarray]:
+    """Gate, trim and normalize one clip, returning (result, audio ready to decode)
+
+    Args:
+        vad_options: Keyword arguments for trim_silence; None skips trimming
+        inplace: The caller owns audio, so normalization may overwrite it instead of copying
+            (never for views of the capture ring buffer)
+    """
+    stage_start = time.perf_counter()
+    result = gate_clip(audio, min_speech_sec, audio_threshold)
+    result.timings["gate"] = time.perf_counter() - stage_start
+    if result.reason:
+        return result, audio
+
+    stats = result.stats
+    if vad_options is not None:
+        stage_start = time.perf_counter()
+        trimmed, result.vad_saved = trim_silence(audio, SAMPLE_RATE, **vad_options)
+        result.timings["vad"] = time.perf_counter() - stage_start
+        if len(trimmed) == 0:
+            result.reason = REJECT_NO_SPEECH
+            return result, trimmed
+        if trimmed is not audio:
+            # Shortened pauses come back as a fresh copy that is ours to overwrite
+            inplace = inplace or trimmed.base is None
+            stats = None
+        audio = trimmed
+
+    stage_start = time.perf_counter()
+    if stats is None:
+        stats = conditioner.measure(audio)
+    audio, result.gain = conditioner.condition(audio, stats, inplace)
+    result.timings["normalize"] = time.perf_counter() - stage_start
+    return result, audio
+
+
+def apply_decode(result: ClipResult, segments, info, decode_sec: float) -> ClipResult:
+    """Fill in a prepared clip's text, language and decode time"""
+    result.text = join_segments(segments)
+    result.timings["decode"] = decode_sec
+    result.language = getattr(info, 'language', 'unknown')
+    result.language_probability = getattr(info, 'language_probability', 0.0)
+    if not result.text:
+        result.reason = REJECT_NO_TEXT
+    return result
+
+
+def process_clip(
+    model: "WhisperModel",
+    audio: np.ndarray,
+    min_speech_sec: float,
+    audio_threshold: float,
+    decode_options: Optional[dict] = None,
+    cancelled=None,
+    vad_options: Optional[dict] = None,
+    inplace: bool = False,
+) -> ClipResult:
+    """Gate, trim, normalize and decode one clip, timing each stage
+
+    Args:
+        vad_options: Keyword arguments for trim_silence; None skips trimming
+        inplace: See prepare_clip
+    """
+    result, audio = prepare_clip(audio, min_speech_sec, audio_threshold, vad_options, inplace)
+    if result.reason:
+        return result
+
+    stage_start = time.perf_counter()
+    segments, info = transcribe_audio(model, audio, decode_options, cancelled)
+    return apply_decode(result, segments, info, time.perf_counter() - stage_start)
@@ -0,0 +1,307 @@
+"""Text insertion backends for JWhisper.
+
+A backend puts recognized text into the focused window and can erase what it
+typed with backspaces. The clipboard backend polls until the clipboard really
+holds the text instead of sleeping a fixed time, and puts the previous
+clipboard back on a background thread once the target had time to read it.
+TextInserter picks a backend per target window and falls back to the next
+one when a backend fails.
+
+IncrementalInserter keeps a dictation in the window up to date while it is
+still being decoded, touching only the characters that changed.
+
+Backends get the platform calls (clipboard, key presses, foreground window)
+injected, so the module imports anywhere and FakeBackend can stand in for a
+real window.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from jwhisper_metrics import metrics
+
+logger = logging.getLogger('JWhisperHotkey')
+
+CONFIRM_POLL_SEC = 0.005
+
+# (window title or program name substring, backend name) - first match wins
+InsertRoute = Tuple[str, str]
+
+
+class InsertionError(Exception):
+    """A backend could not insert the text"""
+
+
+class InsertionBackend:
+    """Puts text into the focused window"""
+
+    name = "base"
+
+    def __init__(self, send_backspace: Optional[Callable[[int], None]] = None):
+        self._backspace = send_backspace
+
+    def insert(self, text: str, restore: bool = True):
+        """Insert text; restore=False leaves putting back what the insert displaced to restore_clipboard"""
+        raise NotImplementedError
+
+    def save_clipboard(self) -> Optional[str]:
+        """Clipboard contents for a later restore_clipboard; None for backends that don't use the clipboard"""
+        return None
+
+    def restore_clipboard(self, old_clipboard: Optional[str], text: Optional[str]):
+        """Put old_clipboard back once the target had time to read text"""
+
+    def erase(self, count: int):
+        """Delete the count characters before the cursor"""
+        if self._backspace is None:
+            raise InsertionError(f"backend '{self.name}' can't erase")
+        try:
+            self._backspace(count)
+        except Exception as e:
+            raise InsertionError(f"backspace failed: {e}")
+
+
+class ClipboardPasteBackend(InsertionBackend):
+    """Copy to the clipboard, confirm it took, paste, then restore the old contents"""
+
+    name = "clipboard"
+
+    def __init__(
+        self,
+        read_clipboard: Callable[[], str],
+        write_clipboard: Callable[[str], None],
+        send_paste: Callable[[], None],
+        confirm_timeout: float = 0.5,
+        restore: bool = True,
+        restore_delay: float = 0.3,
+        send_backspace: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Args:
+            read_clipboard / write_clipboard: Clipboard access (pyperclip.paste / pyperclip.copy)
+            send_paste: Presses the paste shortcut in the focused window
+            confirm_timeout: Longest wait for the clipboard to report the new text
+            restore: Put the previous clipboard back after pasting
+            restore_delay: Time the target gets to read the clipboard before it is restored
+            send_backspace: Presses backspace the given number of times
+        """
+        super().__init__(send_backspace)
+        self._read = read_clipboard
+        self._write = write_clipboard
+        self._paste = send_paste
+        self.confirm_timeout = confirm_timeout
+        self.restore = restore
+        self.restore_delay = restore_delay
+
+    def insert(self, text: str, restore: bool = True):
+        stage_start = time.perf_counter()
+        old_clipboard = self.save_clipboard() if restore else None
+        try:
+            self._write(text)
+        except Exception as e:
+            raise InsertionError(f"clipboard copy failed: {e}")
+        if not self._confirm(text):
+            raise InsertionError(f"clipboard not updated within {self.confirm_timeout}s")
+        metrics.observe("clipboard_sec", time.perf_counter() - stage_start)
+
+        stage_start = time.perf_counter()
+        try:
+            self._paste()
+        except Exception as e:
+            raise InsertionError(f"paste failed: {e}")
+        metrics.observe("paste_sec", time.perf_counter() - stage_start)
+
+        self.restore_clipboard(old_clipboard, text)
+
+    def save_clipboard(self) -> Optional[str]:
+        if not self.restore:
+            return None
+        try:
+            return self._read()
+        except Exception:
+            return None
+
+    def restore_clipboard(self, old_clipboard: Optional[str], text: Optional[str]):
+        if self.restore and old_clipboard and text and old_clipboard != text:
+            threading.Thread(target=self._restore, args=(old_clipboard, text),
+                             name="JWhisperClipboardRestore", daemon=True).start()
+
+    def _confirm(self, text: str) -> bool:
+        """Poll until the clipboard holds text - usually the first read"""
+        deadline = time.perf_counter() + self.confirm_timeout
+        while True:
+            try:
+                if self._read() == text:
+                    return True
+            except Exception:
+                pass  # Clipboard briefly locked by another program
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(CONFIRM_POLL_SEC)
+
+    def _restore(self, old_clipboard: str, text: str):
+        time.sleep(self.restore_delay)
+        try:
+            # Leave it alone if the user copied something in the meantime
+            if self._read() == text:
+                self._write(old_clipboard)
+        except Exception as e:
+            logger.warning(f"Failed to restore clipboard: {e}")
+
+
+class TypingBackend(InsertionBackend):
+    """Type the text as key presses - slower, but works where paste doesn't"""
+
+    name = "type"
+
+    def __init__(self, type_text: Callable[[str], None], send_backspace: Optional[Callable[[int], None]] = None):
+        super().__init__(send_backspace)
+        self._type = type_text
+
+    def insert(self, text: str, restore: bool = True):
+        try:
+            self._type(text)
+        except Exception as e:
+            raise InsertionError(f"typing failed: {e}")
+
+
+class FakeBackend(InsertionBackend):
+    """Records inserted text instead of touching a window (benchmarks and tests)"""
+
+    name = "fake"
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        super().__init__()
+        self.delay = delay
+        self.fail = fail
+        self.inserted: List[str] = []
+        self.erased = 0
+        self.text = ""  # What the target window would show
+
+    def insert(self, text: str, restore: bool = True):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise InsertionError("fake backend failure")
+        self.inserted.append(text)
+        self.text += text
+
+    def erase(self, count: int):
+        if self.fail:
+            raise InsertionError("fake backend failure")
+        self.erased += count
+        self.text = self.text[:len(self.text) - count]
+
+
+class TextInserter:
+    """Chooses a backend for the focused window and falls back when it fails"""
+
+    def __init__(
+        self,
+        backends: Sequence[InsertionBackend],
+        default: str,
+        routes: Sequence[InsertRoute] = (),
+        foreground: Optional[Callable[[], str]] = None,
+    ):
+        """
+        Args:
+            backends: Available backends, in fallback order
+            default: Backend used when no route matches
+            routes: (substring of the window title or program name, backend name) pairs
+            foreground: Describes the focused window, e.g. "notepad.exe Untitled - Notepad"
+        """
+        self.backends: Dict[str, InsertionBackend] = {backend.name: backend for backend in backends}
+        if default not in self.backends:
+            raise ValueError(f"Unknown insertion backend: {default}")
+        for _, name in routes:
+            if name not in self.backends:
+                raise ValueError(f"Unknown insertion backend in route: {name}")
+        self.default = default
+        self.routes = [(pattern.lower(), name) for pattern, name in routes]
+        self._foreground = foreground
+
+    def choose(self) -> str:
+        """Backend name for the window that currently has focus"""
+        if not self.routes or self._foreground is None:
+            return self.default
+        try:
+            target = self._foreground().lower()
+        except Exception:
+            return self.default
+        for pattern, name in self.routes:
+            if pattern in target:
+                return name
+        return self.default
+
+    def insert(self, text: str) -> Optional[str]:
+        """Insert text; returns the backend that succeeded, or None if all failed"""
+        first = self.choose()
+        order = [first] + [name for name in self.backends if name != first]
+        for name in order:
+            stage_start = time.perf_counter()
+            try:
+                self.backends[name].insert(text)
+            except InsertionError as e:
+                logger.warning(f"Insertion backend '{name}' failed: {e}")
+                metrics.increment(f"insert_failed.{name}")
+                continue
+            seconds = time.perf_counter() - stage_start
+            metrics.observe(f"insert_{name}_sec", seconds)
+            logger.info(f"✓ Text inserted via {name} in {seconds * 1000:.0f} ms")
+            return name
+        return None
+
+
+class IncrementalInserter:
+    """Keeps one dictation in the target window in step with the decoder
+
+    Remembers exactly what it has typed, so a revised text is applied as
+    backspaces over the part that changed plus the new suffix instead of a
+    full re-paste. Once a backend fails the dictation stops updating and
+    ``failed`` is set. The clipboard is saved once when the dictation starts
+    and restored once by finish(), not after every pasted fragment.
+    """
+
+    def __init__(self, backend: InsertionBackend):
+        self.backend = backend
+        self.typed = ""
+        self.erased = 0
+        self.failed = False
+        self._lock = threading.Lock()  # Streaming and worker threads both update
+        self._clipboard = backend.save_clipboard()
+        self._last_insert = None  # Last fragment inserted; the clipboard holds it after a paste
+        self._finished = False
+
+    def update(self, text: str) -> bool:
+        """Make the typed text equal text; returns False once insertion has failed"""
+        with self._lock:
+            if self.failed:
+                return False
+            keep = len(os.path.commonprefix([self.typed, text]))
+            erase = len(self.typed) - keep
+            try:
+                if erase:
+                    self.backend.erase(erase)
+                    self.typed = self.typed[:keep]
+                    self.erased += erase
+                if len(text) > keep:
+                    self._last_insert = text[keep:]
+                    self.backend.insert(self._last_insert, restore=False)
+                    self.typed = text
+            except InsertionError as e:
+                logger.warning(f"Incremental insertion via '{self.backend.name}' stopped: {e}")
+                self.failed = True
+                return False
+            if erase:
+                logger.info(f"Incremental insertion corrected {erase} character(s)")
+            return True
+
+    def finish(self):
+        """Restore the clipboard the dictation started with; only the first call does anything"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            self.backend.restore_clipboard(self._clipboard, self._last_insert)
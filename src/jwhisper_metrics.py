@@ -0,0 +1,181 @@
+"""Pipeline metrics for JWhisper.
+
+Every stage of a dictation records into a histogram, and rejected clips bump
+counters. The registry can be flushed to a JSON file periodically and/or
+served as JSON from a local HTTP endpoint, and Show Status reads percentiles
+from the same data.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger('JWhisperHotkey')
+
+# Upper bucket bounds, roughly log-spaced from 1 ms to 2 minutes (also fine for RTF)
+DEFAULT_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RECENT_WINDOW = 1000  # Newest observations kept per histogram for exact percentiles
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent values for percentiles"""
+
+    def __init__(self, bounds: Iterable[float] = DEFAULT_BOUNDS, window: int = RECENT_WINDOW):
+        self.bounds = list(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Percentile over the recent window, None before the first observation"""
+        if not self.recent:
+            return None
+        return float(np.percentile(np.fromiter(self.recent, dtype=np.float64), pct))
+
+    def to_dict(self) -> dict:
+        data = {"count": self.count, "sum": round(self.sum, 6), "min": self.min, "max": self.max}
+        for pct in (50, 90, 95, 99):
+            value = self.percentile(pct)
+            data[f"p{pct}"] = None if value is None else round(value, 6)
+        data["buckets"] = {str(bound): n for bound, n in zip(self.bounds + ["+Inf"], self.buckets)}
+        return data
+
+
+class Metrics:
+    """Thread-safe registry of named histograms and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self.started_at = time.time()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # -------------------- RECORDING --------------------
+    def observe(self, name: str, value: float):
+        """Add one value to a histogram (seconds for durations)"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str):
+        """Observe how long the block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    # -------------------- READING --------------------
+    def percentiles(self, name: str, pcts: Iterable[float] = (50, 95)) -> List[Optional[float]]:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return [histogram.percentile(pct) if histogram else None for pct in pcts]
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def counters(self, prefix: str = "") -> Dict[str, int]:
+        with self._lock:
+            return {name: n for name, n in self._counters.items() if name.startswith(prefix)}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "uptime_sec": round(time.time() - self.started_at, 1),
+                "counters": dict(self._counters),
+                "histograms": {name: h.to_dict() for name, h in self._histograms.items()},
+            }
+
+    # -------------------- EXPORT --------------------
+    def write_json(self, path: str):
+        """Write a snapshot atomically so readers never see a half-written file"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start(self, path: Optional[str] = None, flush_sec: float = 10.0, port: Optional[int] = None):
+        """Flush to path every flush_sec and/or serve JSON on http://127.0.0.1:port/metrics"""
+        if path:
+            self._flush_thread = threading.Thread(target=self._flush_loop, args=(path, flush_sec),
+                                                  name="JWhisperMetrics", daemon=True)
+            self._flush_thread.start()
+            logger.info(f"Metrics written to {path} every {flush_sec}s")
+        if port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler_for(self))
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="JWhisperMetricsHTTP", daemon=True).start()
+            logger.info(f"Metrics served on http://127.0.0.1:{port}/metrics")
+
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._flush_thread:
+            self._flush_thread.join(2.0)
+            self._flush_thread = None
+
+    def _flush_loop(self, path: str, flush_sec: float):
+        while True:
+            stopping = self._stop.wait(flush_sec)
+            try:
+                self.write_json(path)
+            except Exception as e:
+                logger.warning(f"Failed to write metrics: {e}")
+            if stopping:
+                return
+
+
+def _handler_for(metrics: Metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = json.dumps(metrics.snapshot()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep polling out of the log
+
+    return MetricsHandler
+
+
+metrics = Metrics()
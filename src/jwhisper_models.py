@@ -0,0 +1,271 @@
+"""Resident Whisper models for JWhisper.
+
+Several WhisperModel instances can stay loaded at once - for example a tiny
+one for language identification and short clips next to a larger one for long
+dictation. Models are loaded on first use and, when the estimated memory of
+everything loaded exceeds the cap, idle ones are unloaded least recently used
+first.
+
+Each model can be loaded as several replicas so concurrent decodes don't
+queue for one instance, and the CPU thread count per decode is derived from
+the machine instead of the library default. jwhisper_bench.py --tune sweeps
+these settings and writes the fastest combination to a tuning file.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from jwhisper_engine import SAMPLE_RATE, create_model
+
+logger = logging.getLogger('JWhisperHotkey')
+
+# Rough resident size in MB of the float16 CTranslate2 conversions
+MODEL_SIZE_MB = {
+    "tiny": 75, "tiny.en": 75,
+    "base": 145, "base.en": 145,
+    "small": 485, "small.en": 485, "distil-small.en": 340,
+    "medium": 1530, "medium.en": 1530, "distil-medium.en": 790,
+    "large-v1": 3090, "large-v2": 3090, "large-v3": 3090, "large": 3090,
+    "distil-large-v2": 1510, "distil-large-v3": 1510,
+    "large-v3-turbo": 1620, "turbo": 1620,
+}
+COMPUTE_TYPE_FACTOR = {"int8": 0.5, "int8_float16": 0.5, "int8_float32": 0.5, "int8_bfloat16": 0.5, "float32": 2.0}
+UNKNOWN_MODEL_MB = 500
+
+LIBRARY_DEFAULT_THREADS = 4  # CTranslate2's intra-op threads when cpu_threads is 0
+TUNING_KEYS = ("cpu_threads", "num_workers", "replicas")
+
+# (clip up to N seconds or None for any length, language or None for any, model name)
+Route = Tuple[Optional[float], Optional[str], str]
+
+
+def estimate_model_mb(name: str, compute_type: str) -> float:
+    """Approximate memory a model takes once loaded"""
+    base = MODEL_SIZE_MB.get(name.rsplit("/", 1)[-1].replace("faster-whisper-", ""), UNKNOWN_MODEL_MB)
+    return base * COMPUTE_TYPE_FACTOR.get(compute_type, 1.0)
+
+
+def route_model(routes: Iterable[Route], duration: float, language: Optional[str], default: str) -> str:
+    """First route matching the clip length and language wins"""
+    for max_sec, route_language, name in routes:
+        if max_sec is not None and duration > max_sec:
+            continue
+        if route_language is not None and route_language != language:
+            continue
+        return name
+    return default
+
+
+# -------------------- CPU --------------------
+def plan_cpu_threads(
+    cpu_threads: Optional[int],
+    num_workers: int = 1,
+    replicas: int = 1,
+    reserved_cores: int = 0,
+    cores: Optional[int] = None,
+) -> int:
+    """Intra-op threads for each decode
+
+    An explicit cpu_threads wins (0 keeps the library default). With None the
+    cores not reserved for audio and UI are split across every decode that can
+    run at once, never going below what the library would use on its own.
+    """
+    if cpu_threads is not None:
+        return cpu_threads
+    cores = cores or os.cpu_count() or 1
+    available = max(cores - reserved_cores, min(cores, LIBRARY_DEFAULT_THREADS))
+    return max(1, available // (max(1, num_workers) * max(1, replicas)))
+
+
+def pin_to_cores(cores: Iterable[int]) -> bool:
+    """Restrict this process to the given CPU cores; False where that isn't supported"""
+    cores = sorted(set(cores))
+    if not cores:
+        return False
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+            return True
+        if sys.platform == "win32":
+            import win32api
+            import win32process
+            win32process.SetProcessAffinityMask(win32api.GetCurrentProcess(), sum(1 << core for core in cores))
+            return True
+    except Exception as e:
+        logger.warning(f"Failed to pin process to cores {cores}: {e}")
+    return False
+
+
+def load_tuning(path: str) -> Optional[dict]:
+    """Settings written by jwhisper_bench.py --tune, or None if there are none"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return dict(data, **{key: int(data[key]) for key in TUNING_KEYS})
+    except Exception as e:
+        logger.warning(f"Ignoring tuning file {path}: {e}")
+        return None
+
+
+class _Entry:
+    def __init__(self, models: list, size_mb: float):
+        self.models = models  # Replicas of one model
+        self.users = [0] * len(models)
+        self.size_mb = size_mb
+        self.last_used = time.time()
+
+    @property
+    def in_use(self) -> int:
+        return sum(self.users)
+
+    def take(self) -> int:
+        """Index of the least busy replica, now counted as in use"""
+        index = self.users.index(min(self.users))
+        self.users[index] += 1
+        return index
+
+
+class ModelPool:
+    """Loads Whisper models on demand and keeps them under a memory cap"""
+
+    def __init__(
+        self,
+        device: str,
+        compute_type: str,
+        max_memory_mb: float = 0,
+        pinned: Iterable[str] = (),
+        loader: Callable = create_model,
+        replicas: int = 1,
+        **model_kwargs,
+    ):
+        """
+        Args:
+            device: Device every model is loaded on
+            compute_type: Compute type every model is loaded with
+            max_memory_mb: Estimated memory cap; 0 means never unload
+            pinned: Models that are never unloaded
+            loader: Builds a model from (name, device, compute_type, **model_kwargs)
+            replicas: Copies loaded of each model; concurrent users get different copies
+            model_kwargs: Passed to the loader, e.g. cpu_threads and num_workers
+        """
+        self.device = device
+        self.compute_type = compute_type
+        self.max_memory_mb = max_memory_mb
+        self.pinned = set(pinned)
+        self._loader = loader
+        self.replicas = max(1, replicas)
+        self._model_kwargs = model_kwargs
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, threading.Event] = {}
+
+    # -------------------- ACCESS --------------------
+    @contextmanager
+    def use(self, name: str):
+        """Borrow a model; it can't be unloaded until the block exits"""
+        entry, index = self._acquire(name)
+        try:
+            yield entry.models[index]
+        finally:
+            with self._lock:
+                entry.users[index] -= 1
+                entry.last_used = time.time()
+
+    def get(self, name: str):
+        """Return a model, loading it if needed, without holding it in use"""
+        with self.use(name) as model:
+            return model
+
+    def preload(self, names: Iterable[str]):
+        """Load models up front as long as they fit under the memory cap"""
+        for name in names:
+            if not name or self.is_loaded(name):
+                continue
+            if self.max_memory_mb and self.memory_mb + self.estimate(name) > self.max_memory_mb:
+                logger.info(f"Not preloading {name} - it would exceed the {self.max_memory_mb} MB model cap")
+                continue
+            self.get(name)
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._models
+
+    def estimate(self, name: str) -> float:
+        return estimate_model_mb(name, self.compute_type) * self.replicas
+
+    @property
+    def memory_mb(self) -> float:
+        """Estimated memory of all loaded models"""
+        with self._lock:
+            return sum(entry.size_mb for entry in self._models.values())
+
+    def loaded(self) -> List[Tuple[str, float, float]]:
+        """(name, estimated MB, seconds idle) of each loaded model, most recently used last"""
+        now = time.time()
+        with self._lock:
+            return [(name, e.size_mb, 0.0 if e.in_use else now - e.last_used) for name, e in self._models.items()]
+
+    # -------------------- LOADING / EVICTION --------------------
+    def _acquire(self, name: str) -> Tuple[_Entry, int]:
+        while True:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry is not None:
+                    self._models.move_to_end(name)
+                    return entry, entry.take()
+                loading = self._loading.get(name)
+                if loading is None:
+                    loading = self._loading[name] = threading.Event()
+                    break
+            # Another thread is loading this model - wait and look again
+            loading.wait()
+
+        try:
+            size_mb = self.estimate(name)
+            self._make_room(size_mb)
+            load_start = time.time()
+            models = [self._loader(name, self.device, self.compute_type, **self._model_kwargs)
+                      for _ in range(self.replicas)]
+            copies = f" x{self.replicas}" if self.replicas > 1 else ""
+            logger.info(f"Model pool loaded {name}{copies} (~{size_mb:.0f} MB) in {time.time() - load_start:.2f}s")
+            with self._lock:
+                entry = self._models[name] = _Entry(models, size_mb)
+                return entry, entry.take()
+        finally:
+            with self._lock:
+                del self._loading[name]
+            loading.set()
+
+    def _make_room(self, needed_mb: float):
+        """Unload idle models, least recently used first, until needed_mb fits"""
+        if not self.max_memory_mb:
+            return
+        with self._lock:
+            for name in list(self._models):
+                if sum(e.size_mb for e in self._models.values()) + needed_mb <= self.max_memory_mb:
+                    return
+                entry = self._models[name]
+                if entry.in_use or name in self.pinned:
+                    continue
+                del self._models[name]
+                logger.info(f"Model pool unloaded idle model {name} (~{entry.size_mb:.0f} MB)")
+            total = sum(e.size_mb for e in self._models.values()) + needed_mb
+        if total > self.max_memory_mb:
+            logger.warning(f"Model pool over its {self.max_memory_mb} MB cap (~{total:.0f} MB) - every model is busy or pinned")
+
+    # -------------------- LANGUAGE ID --------------------
+    def detect_language(self, name: str, audio: np.ndarray) -> Tuple[str, float]:
+        """Identify the spoken language from the first 30 s of a clip"""
+        with self.use(name) as model:
+            language, probability, _ = model.detect_language(audio[:30 * SAMPLE_RATE])
+        return language, probability
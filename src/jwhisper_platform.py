@@ -0,0 +1,308 @@
+"""Operating-system backends for the JWhisper hotkey service.
+
+Everything the service does outside of audio and decoding goes through a
+platform backend: sounds, notifications, the tray icon, autostart, the clipboard,
+key presses for insertion, and process and memory queries. Each backend
+imports its desktop libraries when it is created, and the tray libraries
+only when the tray starts, so importing the service costs nothing extra.
+
+NullPlatform needs no desktop. Its clipboard and "window" live in memory,
+so the capture, gating, decoding and insertion core can be imported, run
+and profiled headless, e.g. on a Linux server.
+"""
+import logging
+import os
+import subprocess
+import sys
+import threading
+from typing import Callable, Optional, Sequence, Tuple
+
+logger = logging.getLogger('JWhisperHotkey')
+
+AUTO = "auto"
+PLATFORMS = (AUTO, "windows", "null")
+
+
+class TrayItem:
+    """One entry of the tray menu; None in the item list is a separator"""
+
+    def __init__(self, label: str, action: Callable[[], None], checked: Optional[Callable[[], bool]] = None):
+        self.label = label
+        self.action = action
+        self.checked = checked
+
+
+class NullPlatform:
+    """Headless backend: no sounds or tray, clipboard and target window kept in memory"""
+
+    name = "null"
+
+    def __init__(self):
+        self.clipboard = ""
+        self.window_text = ""  # What the focused window would contain after insertions
+        self.window_title = "null"
+        self.keys = []  # Key combinations sent, e.g. ["ctrl+z"]
+        self._lock = threading.Lock()
+
+    # -------------------- FEEDBACK --------------------
+    def beep(self, frequency: int, duration_ms: int):
+        pass
+
+    def notify(self, title: str, message: str):
+        logger.info(f"Notification: {title} - {message}")
+
+    def show_message(self, title: str, text: str):
+        """Blocking information dialog (Show Status)"""
+        print(f"{title}\n{text}")
+
+    def open_file(self, path: str):
+        logger.warning(f"{self.name} platform can't open files - see {path}")
+
+    def launch(self, path: str):
+        """Start a program detached from this process"""
+        logger.warning(f"{self.name} platform can't launch programs - not starting {path}")
+
+    # -------------------- TRAY / AUTOSTART --------------------
+    def start_tray(self, name: str, tooltip: str, items: Sequence[Optional[TrayItem]]):
+        pass
+
+    def stop_tray(self):
+        pass
+
+    def autostart_enabled(self, app_name: str) -> bool:
+        return False
+
+    def set_autostart(self, app_name: str, command: Optional[str]):
+        """Start command at login; None removes the entry"""
+        logger.warning(f"{self.name} platform has no autostart - entry for {app_name} left unchanged")
+
+    # -------------------- PROCESSES --------------------
+    def process_name(self, pid: int) -> Optional[str]:
+        """Executable name of a running process, "" if it runs but the name is unknown, None if it doesn't run"""
+        try:
+            with open(f"/proc/{pid}/comm", "r") as f:
+                return f.read().strip()
+        except OSError:
+            pass
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return None
+        except (PermissionError, OSError):
+            pass
+        return ""
+
+    def memory_info(self) -> Optional[Tuple[float, float]]:
+        """(current, peak) resident memory of this process in MB"""
+        try:
+            values = {}
+            with open("/proc/self/status", "r") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in ("VmRSS", "VmHWM"):
+                        values[key] = int(value.split()[0]) / 1024
+            return values["VmRSS"], values["VmHWM"]
+        except (OSError, KeyError, ValueError):
+            return None
+
+    # -------------------- INSERTION --------------------
+    def read_clipboard(self) -> str:
+        return self.clipboard
+
+    def write_clipboard(self, text: str):
+        self.clipboard = text
+
+    def send_paste(self):
+        self.type_text(self.clipboard)
+
+    def send_backspace(self, count: int):
+        with self._lock:
+            self.window_text = self.window_text[:max(0, len(self.window_text) - count)]
+
+    def type_text(self, text: str):
+        with self._lock:
+            self.window_text += text
+
+    def send_keys(self, combo: str):
+        """Press a key combination such as "ctrl+shift+z" or "enter" (pynput key names)"""
+        with self._lock:
+            self.keys.append(combo)
+
+    def foreground_window(self) -> str:
+        """Program name and title of the focused window, for INSERT_ROUTES"""
+        return self.window_title
+
+
+class WindowsPlatform(NullPlatform):
+    """Windows desktop: winsound, pywin32, pyperclip and pynput; pystray once the tray starts"""
+
+    name = "windows"
+
+    RUN_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
+
+    def __init__(self):
+        super().__init__()
+        import winsound
+        import winreg
+        import win32api
+        import win32con
+        import win32gui
+        import win32process
+        import pyperclip
+        from pynput.keyboard import Controller, Key
+        self._winsound = winsound
+        self._winreg = winreg
+        self._win32api = win32api
+        self._win32con = win32con
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._pyperclip = pyperclip
+        self._key = Key
+        self._keyboard = Controller()
+        self._tray = None
+
+    # -------------------- FEEDBACK --------------------
+    def beep(self, frequency: int, duration_ms: int):
+        try:
+            self._winsound.Beep(frequency, duration_ms)
+        except Exception:
+            pass
+
+    def notify(self, title: str, message: str):
+        if self._tray:
+            self._tray.notify(message, title)
+        else:
+            self._win32api.MessageBox(0, message, title, self._win32con.MB_OK | self._win32con.MB_ICONINFORMATION)
+
+    def show_message(self, title: str, text: str):
+        self._win32api.MessageBox(0, text, title, self._win32con.MB_OK | self._win32con.MB_ICONINFORMATION)
+
+    def open_file(self, path: str):
+        subprocess.run(['notepad.exe', path], check=False)
+
+    def launch(self, path: str):
+        subprocess.Popen([path], shell=True)
+
+    # -------------------- TRAY / AUTOSTART --------------------
+    def start_tray(self, name: str, tooltip: str, items: Sequence[Optional[TrayItem]]):
+        import pystray
+        menu_items = []
+        for item in items:
+            if item is None:
+                menu_items.append(pystray.Menu.SEPARATOR)
+            elif item.checked is not None:
+                menu_items.append(pystray.MenuItem(item.label, item.action, checked=lambda _, c=item.checked: c()))
+            else:
+                menu_items.append(pystray.MenuItem(item.label, item.action))
+        self._tray = pystray.Icon(name, _icon_image(), tooltip, pystray.Menu(*menu_items))
+        threading.Thread(target=self._tray.run, daemon=True).start()
+
+    def stop_tray(self):
+        if self._tray:
+            self._tray.stop()
+
+    def autostart_enabled(self, app_name: str) -> bool:
+        try:
+            key = self._winreg.OpenKey(self._winreg.HKEY_CURRENT_USER, self.RUN_KEY, 0, self._winreg.KEY_READ)
+            try:
+                self._winreg.QueryValueEx(key, app_name)
+                return True
+            finally:
+                self._winreg.CloseKey(key)
+        except OSError:
+            return False
+
+    def set_autostart(self, app_name: str, command: Optional[str]):
+        key = self._winreg.OpenKey(self._winreg.HKEY_CURRENT_USER, self.RUN_KEY, 0, self._winreg.KEY_ALL_ACCESS)
+        try:
+            if command is None:
+                self._winreg.DeleteValue(key, app_name)
+            else:
+                self._winreg.SetValueEx(key, app_name, 0, self._winreg.REG_SZ, command)
+        finally:
+            self._winreg.CloseKey(key)
+
+    # -------------------- PROCESSES --------------------
+    def process_name(self, pid: int) -> Optional[str]:
+        try:
+            handle = self._win32api.OpenProcess(
+                self._win32con.PROCESS_QUERY_INFORMATION | self._win32con.PROCESS_VM_READ, False, pid)
+        except Exception:
+            return None  # No such process (or not ours to inspect)
+        try:
+            if self._win32process.GetExitCodeProcess(handle) != 259:  # STILL_ACTIVE
+                return None
+            try:
+                return os.path.basename(self._win32process.GetModuleFileNameEx(handle, 0))
+            except Exception:
+                return ""
+        finally:
+            self._win32api.CloseHandle(handle)
+
+    def memory_info(self) -> Optional[Tuple[float, float]]:
+        try:
+            memory = self._win32process.GetProcessMemoryInfo(self._win32api.GetCurrentProcess())
+            return memory['WorkingSetSize'] / (1024 * 1024), memory['PeakWorkingSetSize'] / (1024 * 1024)
+        except Exception:
+            return None
+
+    # -------------------- INSERTION --------------------
+    def read_clipboard(self) -> str:
+        return self._pyperclip.paste()
+
+    def write_clipboard(self, text: str):
+        self._pyperclip.copy(text)
+
+    def send_paste(self):
+        with self._keyboard.pressed(self._key.ctrl):
+            self._keyboard.press('v')
+            self._keyboard.release('v')
+
+    def send_backspace(self, count: int):
+        for _ in range(count):
+            self._keyboard.press(self._key.backspace)
+            self._keyboard.release(self._key.backspace)
+
+    def type_text(self, text: str):
+        self._keyboard.type(text)
+
+    def send_keys(self, combo: str):
+        keys = [getattr(self._key, name, None) or name for name in combo.lower().split("+")]
+        for key in keys[:-1]:
+            self._keyboard.press(key)
+        try:
+            self._keyboard.press(keys[-1])
+            self._keyboard.release(keys[-1])
+        finally:
+            for key in reversed(keys[:-1]):
+                self._keyboard.release(key)
+
+    def foreground_window(self) -> str:
+        hwnd = self._win32gui.GetForegroundWindow()
+        title = self._win32gui.GetWindowText(hwnd)
+        try:
+            _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+            program = self.process_name(pid) or ""
+        except Exception:
+            program = ""
+        return f"{program} {title}"
+
+
+def _icon_image():
+    """Microphone icon for the system tray"""
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (64, 64), color='white')
+    draw = ImageDraw.Draw(image)
+    draw.ellipse([20, 10, 44, 40], fill='black')    # Microphone body
+    draw.rectangle([30, 40, 34, 50], fill='black')  # Stand
+    draw.rectangle([20, 50, 44, 54], fill='black')  # Base
+    return image
+
+
+def load_platform(name: str = AUTO) -> NullPlatform:
+    """Create the backend for name; "auto" picks Windows on Windows and the null backend elsewhere"""
+    if name not in PLATFORMS:
+        raise ValueError(f"Unknown platform: {name}")
+    if name == AUTO:
+        name = "windows" if sys.platform == "win32" else "null"
+    return WindowsPlatform() if name == "windows" else NullPlatform()
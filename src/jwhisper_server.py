@@ -0,0 +1,467 @@
+"""Out-of-process inference server for JWhisper.
+
+The server owns the Whisper models and keeps them loaded and warm. The
+hotkey client, and any number of other clients, talk to it over a local
+authenticated socket. Audio goes through a shared-memory block owned by each
+client connection, so only a few bytes of request travel over the socket.
+
+Restarting the hotkey client no longer reloads the model, and several
+sessions share one copy of it.
+
+Usage:
+    python src/jwhisper_server.py --device cpu --compute-type int8 --preload small
+    python src/jwhisper_server.py --stop
+"""
+import argparse
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from jwhisper_engine import SAMPLE_RATE, transcribe_audio, transcribe_batch, warm_up_model
+
+logger = logging.getLogger('JWhisperHotkey')
+
+DEFAULT_PORT = 50731
+KEY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jwhisper_server.key")
+MIN_SHM_SAMPLES = 30 * SAMPLE_RATE  # Shared block for 30 s of audio, grown when a request needs more
+CONNECT_TIMEOUT_SEC = 30.0
+KEY_WRITE_TIMEOUT_SEC = 2.0  # How long to wait for another process to finish writing a new key file
+
+
+class ServerError(Exception):
+    """The inference server could not be reached or reported a failure"""
+
+
+def server_key() -> bytes:
+    """Shared secret for the socket, created on first use and readable by this user only"""
+    try:
+        fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Made earlier, or just now by the server or another client starting at the same time
+        deadline = time.time() + KEY_WRITE_TIMEOUT_SEC
+        while True:
+            with open(KEY_FILE, "rb") as f:
+                key = f.read()
+            if key or time.time() >= deadline:
+                return key
+            time.sleep(0.01)  # Created but not written yet
+    key = secrets.token_bytes(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open a client's shared block without taking over its cleanup"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name=name)
+
+
+# -------------------- SERVER --------------------
+class InferenceServer:
+    """Serves transcription requests from any number of local clients"""
+
+    def __init__(self, pool, port: int = DEFAULT_PORT, warmup: bool = True):
+        """
+        Args:
+            pool: ModelPool holding the models
+            port: TCP port on 127.0.0.1
+            warmup: Run a synthetic decode after each model load
+        """
+        self.pool = pool
+        self.port = port
+        self.warmup = warmup
+        self.started_at = time.time()
+        self.clients = 0
+        self.requests = 0
+        self._warm = set()
+        self._warm_lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+        self._running = False
+
+    def serve_forever(self):
+        self._listener = Listener(("127.0.0.1", self.port), authkey=server_key())
+        self._running = True
+        logger.info(f"Inference server listening on 127.0.0.1:{self.port}")
+        while self._running:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._running:
+                    logger.warning(f"Rejected connection: {e}")
+                continue
+            threading.Thread(target=self._serve_client, args=(conn,), name="JWhisperServerClient", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self._listener:
+            self._listener.close()
+
+    def _serve_client(self, conn):
+        self.clients += 1
+        attached: Dict[str, shared_memory.SharedMemory] = {}
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                self.requests += 1
+                try:
+                    reply = self._handle(request, attached)
+                    reply["ok"] = True
+                except Exception as e:
+                    logger.error(f"Request {request.get('op')} failed: {e}")
+                    reply = {"ok": False, "error": str(e)}
+                conn.send(reply)
+                if request.get("op") == "shutdown":
+                    self.stop()
+                    os._exit(0)
+        finally:
+            self.clients -= 1
+            for shm in attached.values():
+                shm.close()
+            conn.close()
+
+    def _audio(self, request, attached) -> np.ndarray:
+        """Zero-copy view of the request's audio in the client's shared block"""
+        name = request["shm"]
+        shm = attached.get(name)
+        if shm is None:
+            for old in attached.values():
+                old.close()  # The client replaced its block with a bigger one
+            attached.clear()
+            shm = attached[name] = _attach(name)
+        return np.ndarray((request["samples"],), dtype=np.float32, buffer=shm.buf)
+
+    @contextmanager
+    def _model(self, name: str):
+        with self.pool.use(name) as model:
+            with self._warm_lock:
+                cold = self.warmup and name not in self._warm
+                self._warm.add(name)
+            if cold:
+                warm_up_model(model)
+            yield model
+
+    def _handle(self, request: dict, attached) -> dict:
+        op = request.get("op")
+        if op == "hello":
+            return {"server_pid": os.getpid(), "loaded": [name for name, _, _ in self.pool.loaded()]}
+        if op == "status":
+            return {"server_pid": os.getpid(), "uptime_sec": time.time() - self.started_at, "clients": self.clients,
+                    "requests": self.requests, "loaded": self.pool.loaded(), "memory_mb": self.pool.memory_mb}
+        if op == "load":
+            with self._model(request["model"]):
+                pass
+            return {}
+        if op == "preload":
+            self.pool.preload(request["models"])
+            return {"loaded": [name for name, _, _ in self.pool.loaded()]}
+        if op == "transcribe":
+            with self._model(request["model"]) as model:
+                segments, info = transcribe_audio(model, self._audio(request, attached), request["options"])
+            return {"segments": [_segment_tuple(seg) for seg in segments], "info": _info_dict(info)}
+        if op == "transcribe_batch":
+            audio = self._audio(request, attached)
+            clips, position = [], 0
+            for length in request["lengths"]:
+                clips.append(audio[position:position + length])
+                position += length
+            with self._model(request["model"]) as model:
+                decoded = transcribe_batch(model, clips, request["options"])
+            return {"results": [([_segment_tuple(seg) for seg in segments], _info_dict(info)) for segments, info in decoded]}
+        if op == "detect_language":
+            language, probability = self.pool.detect_language(request["model"], self._audio(request, attached))
+            return {"language": language, "probability": probability}
+        if op == "shutdown":
+            logger.info("Inference server shutting down on request")
+            return {}
+        raise ValueError(f"Unknown request: {op}")
+
+
+def _segment_tuple(seg) -> Tuple[float, float, str]:
+    return (float(seg.start), float(seg.end), seg.text)
+
+
+def _info_dict(info) -> dict:
+    return {
+        "language": getattr(info, "language", "unknown"),
+        "language_probability": float(getattr(info, "language_probability", 0.0)),
+        "duration": float(getattr(info, "duration", 0.0)),
+    }
+
+
+# -------------------- CLIENT --------------------
+class RemoteSegment:
+    def __init__(self, start: float, end: float, text: str):
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+class RemoteInfo:
+    def __init__(self, language: str, language_probability: float, duration: float):
+        self.language = language
+        self.language_probability = language_probability
+        self.duration = duration
+
+
+def _decoded(segments, info) -> Tuple[List[RemoteSegment], RemoteInfo]:
+    return [RemoteSegment(*seg) for seg in segments], RemoteInfo(**info)
+
+
+class _Connection:
+    """One socket to the server plus the shared block its audio goes through"""
+
+    def __init__(self, port: int):
+        self.conn = Client(("127.0.0.1", port), authkey=server_key())
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def put_audio(self, audio: np.ndarray) -> dict:
+        """Copy audio into the shared block and return the request fields that point at it"""
+        samples = len(audio)
+        if self.shm is None or self.shm.size < samples * 4:
+            self._release_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(samples, MIN_SHM_SAMPLES) * 4)
+        np.ndarray((samples,), dtype=np.float32, buffer=self.shm.buf)[:] = audio
+        return {"shm": self.shm.name, "samples": samples}
+
+    def request(self, request: dict) -> dict:
+        self.conn.send(request)
+        reply = self.conn.recv()
+        if not reply.get("ok"):
+            raise ServerError(reply.get("error", "unknown server error"))
+        return reply
+
+    def _release_shm(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        try:
+            self.conn.close()
+        finally:
+            self._release_shm()
+
+
+class InferenceClient:
+    """Thread-safe client; each concurrent caller gets its own connection and shared block"""
+
+    def __init__(self, port: int = DEFAULT_PORT):
+        self.port = port
+        self._lock = threading.Lock()
+        self._idle: List[_Connection] = []
+        self._all: List[_Connection] = []
+
+    @contextmanager
+    def _connection(self):
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            try:
+                connection = _Connection(self.port)
+            except (ConnectionError, OSError) as e:
+                raise ServerError(f"Inference server not reachable on port {self.port}: {e}")
+            with self._lock:
+                self._all.append(connection)
+        try:
+            yield connection
+        except (EOFError, OSError) as e:
+            # Broken socket - drop this connection, the next call opens a new one
+            with self._lock:
+                self._all.remove(connection)
+            connection.close()
+            raise ServerError(f"Lost connection to the inference server: {e}")
+        with self._lock:
+            self._idle.append(connection)
+
+    def request(self, request: dict, audio: Optional[np.ndarray] = None) -> dict:
+        with self._connection() as connection:
+            if audio is not None:
+                request = dict(request, **connection.put_audio(audio))
+            return connection.request(request)
+
+    def ping(self) -> bool:
+        try:
+            self.request({"op": "hello"})
+            return True
+        except ServerError:
+            return False
+
+    def close(self):
+        with self._lock:
+            connections, self._all, self._idle = self._all, [], []
+        for connection in connections:
+            connection.close()
+
+
+class RemoteModel:
+    """Stands in for a WhisperModel that lives in the server"""
+
+    def __init__(self, client: InferenceClient, name: str):
+        self.client = client
+        self.name = name
+
+    def transcribe(self, audio: np.ndarray, **options):
+        reply = self.client.request({"op": "transcribe", "model": self.name, "options": options},
+                                    np.ascontiguousarray(audio, dtype=np.float32))
+        return _decoded(reply["segments"], reply["info"])
+
+    def transcribe_batch(self, clips: List[np.ndarray], decode_options: Optional[dict] = None):
+        reply = self.client.request(
+            {"op": "transcribe_batch", "model": self.name, "options": decode_options, "lengths": [len(c) for c in clips]},
+            np.concatenate(clips).astype(np.float32, copy=False))
+        return [_decoded(segments, info) for segments, info in reply["results"]]
+
+    def detect_language(self, audio: np.ndarray):
+        reply = self.client.request({"op": "detect_language", "model": self.name},
+                                    np.ascontiguousarray(audio, dtype=np.float32))
+        return reply["language"], reply["probability"], []
+
+
+class RemoteModelPool:
+    """ModelPool interface backed by the inference server"""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    @contextmanager
+    def use(self, name: str):
+        yield RemoteModel(self.client, name)
+
+    def get(self, name: str) -> RemoteModel:
+        """Make sure the server has the model loaded"""
+        self.client.request({"op": "load", "model": name})
+        return RemoteModel(self.client, name)
+
+    def preload(self, names):
+        self.client.request({"op": "preload", "models": [name for name in names if name]})
+
+    def is_loaded(self, name: str) -> bool:
+        return any(loaded == name for loaded, _, _ in self.loaded())
+
+    def loaded(self):
+        try:
+            return [tuple(entry) for entry in self.client.request({"op": "status"})["loaded"]]
+        except ServerError:
+            return []
+
+    @property
+    def memory_mb(self) -> float:
+        try:
+            return self.client.request({"op": "status"})["memory_mb"]
+        except ServerError:
+            return 0.0
+
+    def detect_language(self, name: str, audio: np.ndarray):
+        language, probability, _ = RemoteModel(self.client, name).detect_language(audio[:30 * SAMPLE_RATE])
+        return language, probability
+
+    def close(self):
+        """Drop this client's connections; the server and its models stay up"""
+        self.client.close()
+
+
+def start_server(port: int, device: str, compute_type: str, max_memory_mb: float = 0, preload=(),
+                 cpu_threads: Optional[int] = None, num_workers: int = 1, replicas: int = 1, cpu_cores=(),
+                 timeout: float = CONNECT_TIMEOUT_SEC) -> InferenceClient:
+    """Connect to a running server, or launch one in the background and wait until it accepts connections"""
+    client = InferenceClient(port)
+    if client.ping():
+        return client
+    command = [sys.executable, os.path.abspath(__file__), "--port", str(port), "--device", device,
+               "--compute-type", compute_type, "--max-memory-mb", str(max_memory_mb),
+               "--num-workers", str(num_workers), "--replicas", str(replicas)]
+    if cpu_threads is not None:
+        command += ["--cpu-threads", str(cpu_threads)]
+    if cpu_cores:
+        command += ["--cpu-cores"] + [str(core) for core in cpu_cores]
+    if preload:
+        command += ["--preload"] + list(preload)
+    if sys.platform == "win32":
+        # pythonw keeps the server windowless; it must outlive the client that launched it
+        pythonw = os.path.join(os.path.dirname(sys.executable), "pythonw.exe")
+        if os.path.exists(pythonw):
+            command[0] = pythonw
+        flags = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        subprocess.Popen(command, creationflags=flags, close_fds=True)
+    else:
+        subprocess.Popen(command, start_new_session=True, close_fds=True,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    logger.info(f"Launched inference server: {' '.join(command)}")
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        time.sleep(0.2)
+        if client.ping():
+            return client
+    raise ServerError(f"Inference server did not start within {timeout:.0f}s")
+
+
+# -------------------- MAIN --------------------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Keep Whisper models loaded for JWhisper clients")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--max-memory-mb", type=float, default=0, help="Model pool cap; 0 never unloads")
+    parser.add_argument("--preload", nargs="*", default=[], help="Models to load right away")
+    parser.add_argument("--cpu-threads", type=int, help="Threads per decode (default: the server's cores split across decodes)")
+    parser.add_argument("--num-workers", type=int, default=1, help="Decodes each model instance runs at once")
+    parser.add_argument("--replicas", type=int, default=1, help="Copies of each model")
+    parser.add_argument("--cpu-cores", type=int, nargs="*", default=[], help="Pin the server to these cores")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false")
+    parser.add_argument("--stop", action="store_true", help="Shut down a running server and exit")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.stop:
+        try:
+            InferenceClient(args.port).request({"op": "shutdown"})
+        except (ServerError, EOFError, OSError):
+            pass
+        return
+
+    from logging.handlers import RotatingFileHandler
+    handler = RotatingFileHandler(os.path.join(os.path.dirname(os.path.abspath(__file__)), "jwhisper_server.log"),
+                                  maxBytes=5 * 1024 * 1024, backupCount=3)
+    handler.setFormatter(logging.Formatter('%(asctime)s | %(levelname)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    from jwhisper_models import ModelPool, pin_to_cores, plan_cpu_threads
+    if args.cpu_cores and pin_to_cores(args.cpu_cores):
+        logger.info(f"Inference server pinned to cores {args.cpu_cores}")
+    cores = len(args.cpu_cores) or None
+    cpu_threads = plan_cpu_threads(args.cpu_threads, args.num_workers, args.replicas, cores=cores)
+    pool = ModelPool(args.device, args.compute_type, args.max_memory_mb, pinned=args.preload[:1],
+                     replicas=args.replicas, cpu_threads=cpu_threads, num_workers=args.num_workers)
+    logger.info(f"CPU threads per decode: {cpu_threads}, workers: {args.num_workers}, replicas: {args.replicas}")
+    server = InferenceServer(pool, args.port, args.warmup)
+    if args.preload:
+        # Accept connections while the models load; requests for them wait on the pool
+        threading.Thread(target=lambda: [server._handle({"op": "load", "model": name}, {}) for name in args.preload],
+                         name="JWhisperServerPreload", daemon=True).start()
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Rolling-window transcription while the push-to-talk key is held.
+
+A background thread periodically decodes the part of the recording that has
+not been committed yet. Segments that come out the same in two consecutive
+passes and end well before the live edge are committed, so when the key is
+released only the short uncommitted tail still has to be decoded.
+"""
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('JWhisperHotkey')
+
+# (start_sec, end_sec, text) relative to the audio handed to the decoder
+Segment = Tuple[float, float, str]
+
+
+class StreamingTranscriber:
+    """Decodes rolling windows of a live recording on a background thread"""
+
+    def __init__(
+        self,
+        read_audio: Callable[[int], np.ndarray],
+        transcribe: Callable[[np.ndarray], List[Segment]],
+        sample_rate: int,
+        interval_sec: float = 1.0,
+        min_window_sec: float = 2.0,
+        stable_margin_sec: float = 1.0,
+        max_window_sec: float = 25.0,
+        trim: Optional[Callable[[np.ndarray], Tuple[np.ndarray, float]]] = None,
+        on_commit: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            read_audio: Returns the recorded audio from a sample offset up to the live edge
+            transcribe: Decodes a clip and returns its segments
+            sample_rate: Sample rate of the recorded audio
+            interval_sec: Pause between rolling passes
+            min_window_sec: Uncommitted audio shorter than this is not decoded while recording
+            stable_margin_sec: Segments ending closer than this to the live edge are never committed
+            max_window_sec: Past this window size segments are committed without waiting for agreement
+            trim: Removes silence from the tail before it is decoded, returning (audio, seconds removed)
+            on_commit: Called on the streaming thread with all committed text whenever more is committed
+        """
+        self._read_audio = read_audio
+        self._transcribe = transcribe
+        self._trim = trim
+        self._on_commit = on_commit
+        self.sample_rate = sample_rate
+        self.interval_sec = interval_sec
+        self._min_window = int(min_window_sec * sample_rate)
+        self._stable_margin = int(stable_margin_sec * sample_rate)
+        self._max_window = int(max_window_sec * sample_rate)
+        self._tolerance = int(0.3 * sample_rate)
+
+        self._decode_lock = threading.Lock()  # rolling passes and the final tail never overlap
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reset()
+
+    def _reset(self):
+        self.committed_text: List[str] = []
+        self.committed_samples = 0
+        self.passes = 0
+        self._previous: List[Tuple[int, int, str]] = []
+
+    # -------------------- LIFECYCLE --------------------
+    def start(self):
+        """Begin rolling passes for a new recording"""
+        self.cancel()
+        self._reset()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="JWhisperStreaming", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop rolling passes and drop whatever was committed"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    @property
+    def active(self) -> bool:
+        """True while rolling passes are running for the current recording"""
+        return self._thread is not None
+
+    def finish(self, audio: Optional[np.ndarray] = None) -> str:
+        """Stop rolling passes, decode the uncommitted tail and return the full text
+
+        Args:
+            audio: The complete recording; read through read_audio when omitted
+        """
+        self.cancel()
+        with self._decode_lock:
+            if audio is None:
+                tail = self._read_audio(self.committed_samples)
+            else:
+                tail = audio[self.committed_samples:]
+            tail_text = ""
+            trimmed_sec = 0.0
+            if self._trim is not None and len(tail) > 0:
+                tail, trimmed_sec = self._trim(tail)
+            if len(tail) > 0:
+                tail_start = time.time()
+                segments = self._transcribe(tail)
+                tail_text = " ".join(text.strip() for _, _, text in segments if text.strip())
+                logger.info(
+                    f"Streaming tail decoded - Committed: {self.committed_samples / self.sample_rate:.2f}s "
+                    f"in {self.passes} passes, Tail: {len(tail) / self.sample_rate:.2f}s "
+                    f"in {time.time() - tail_start:.2f}s, VAD saved: {trimmed_sec:.2f}s"
+                )
+            parts = self.committed_text + ([tail_text] if tail_text else [])
+        return " ".join(parts).strip()
+
+    # -------------------- ROLLING PASSES --------------------
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            try:
+                self._rolling_pass()
+            except Exception as e:
+                logger.warning(f"Streaming pass failed: {e}")
+
+    def _rolling_pass(self):
+        with self._decode_lock:
+            if self._stop.is_set():
+                return
+            offset = self.committed_samples
+            audio = self._read_audio(offset)
+            if len(audio) < self._min_window:
+                return
+            segments = self._transcribe(audio)
+            self.passes += 1
+            committed = len(self.committed_text)
+            self._commit_stable(offset, len(audio), segments)
+            if self._on_commit is not None and len(self.committed_text) > committed:
+                self._on_commit(" ".join(self.committed_text))
+
+    def _commit_stable(self, offset: int, length: int, segments: List[Segment]):
+        """Commit the longest prefix of segments that have stopped changing"""
+        live_edge = offset + length
+        force = length > self._max_window
+        current = [
+            (offset + int(start * self.sample_rate), offset + int(end * self.sample_rate), text.strip())
+            for start, end, text in segments
+        ]
+
+        commit = 0
+        for i, (start, end, text) in enumerate(current):
+            if end > live_edge - self._stable_margin:
+                break
+            agreed = any(
+                prev_text == text and abs(prev_start - start) <= self._tolerance
+                for prev_start, _, prev_text in self._previous
+            )
+            # An oversized window commits everything but its last segment
+            if not agreed and not (force and i < len(current) - 1):
+                break
+            commit = i + 1
+
+        if commit:
+            self.committed_text.extend(text for _, _, text in current[:commit] if text)
+            self.committed_samples = current[commit - 1][1]
+            logger.debug(f"Streaming committed {commit} segment(s) up to {self.committed_samples / self.sample_rate:.2f}s")
+        elif force and not current:
+            # Nothing but silence in an oversized window - skip it
+            self.committed_samples = live_edge - self._stable_margin
+        self._previous = current[commit:]
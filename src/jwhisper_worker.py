@@ -0,0 +1,299 @@
+"""Persistent transcription worker for JWhisper.
+
+The keyboard listener must never wait for Whisper, so finished recordings are
+handed to a single worker thread through a bounded job queue. Each job is one
+utterance; with the "merge" policy a recording started while the previous job
+is still decoding is appended to that job and both are inserted together.
+
+A long recording can be submitted chunk by chunk with final=False; the chunks
+become parts of one job that the worker starts decoding while the rest is
+still being recorded.
+
+When recordings pile up, the worker can take several queued jobs at once and
+hand them to a batch decoder, then deliver the texts in their original order.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+logger = logging.getLogger('JWhisperHotkey')
+
+# What happens when a new recording starts while a job is still decoding
+POLICY_QUEUE = "queue"      # Decode it after the current one
+POLICY_PREEMPT = "preempt"  # Drop the current and pending jobs, the new recording replaces them
+POLICY_MERGE = "merge"      # Append it to the current job and insert both as one text
+POLICIES = (POLICY_QUEUE, POLICY_PREEMPT, POLICY_MERGE)
+
+MERGE_WAIT_SEC = 120  # Give up waiting for a merged recording that never arrives
+
+
+class TranscriptionJob:
+    """One utterance (or several merged recordings) waiting to be decoded"""
+
+    _next_id = 1
+
+    def __init__(self, part: Any):
+        self.id = TranscriptionJob._next_id
+        TranscriptionJob._next_id += 1
+        self.parts: List[Any] = [part]
+        self.cancelled = threading.Event()
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.expecting_part = False  # A merged recording is still being recorded
+        self.sealed = False          # Decoding finished, no more parts accepted
+
+    @property
+    def queue_wait(self) -> float:
+        """Seconds the job spent in the queue before the worker picked it up"""
+        if self.started_at is None:
+            return time.time() - self.created_at
+        return self.started_at - self.created_at
+
+
+class TranscriptionWorker:
+    """Decodes queued recordings on a dedicated thread"""
+
+    def __init__(
+        self,
+        decode: Callable[[Any, TranscriptionJob], str],
+        deliver: Callable[[TranscriptionJob, str], None],
+        discard: Optional[Callable[[Any], None]] = None,
+        max_pending: int = 4,
+        policy: str = POLICY_QUEUE,
+        decode_batch: Optional[Callable[[List[Any], List[TranscriptionJob]], List[str]]] = None,
+        max_batch: int = 1,
+        batch_window_sec: float = 0.0,
+    ):
+        """
+        Args:
+            decode: Turns one recorded part into text; should give up early once job.cancelled is set
+            deliver: Receives the combined text of a finished job
+            discard: Releases a part that will never be decoded
+            max_pending: Jobs waiting behind the current one before new recordings are rejected
+            policy: One of POLICIES
+            decode_batch: Turns the parts of several single-part jobs into their texts, in order
+            max_batch: Most jobs decoded together; 1 disables batching
+            batch_window_sec: How long to wait for more jobs before decoding a batch that isn't full
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown worker policy: {policy}")
+        self._decode = decode
+        self._deliver = deliver
+        self._discard = discard
+        self.max_pending = max_pending
+        self.policy = policy
+        self._decode_batch = decode_batch
+        self.max_batch = max_batch
+        self.batch_window_sec = batch_window_sec
+
+        self._cond = threading.Condition()
+        self._pending: Deque[TranscriptionJob] = deque()
+        self._current: Optional[TranscriptionJob] = None
+        self._batch: List[TranscriptionJob] = []  # Jobs decoded together with _current
+        self._merge_target: Optional[TranscriptionJob] = None
+        self._open_job: Optional[TranscriptionJob] = None  # Receives the chunks of a recording still in progress
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------- LIFECYCLE --------------------
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="JWhisperWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Cancel everything and stop the worker thread"""
+        with self._cond:
+            self._running = False
+            self._cancel_all()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def pending(self) -> int:
+        """Jobs waiting for the worker, not counting the one being decoded"""
+        return len(self._pending)
+
+    @property
+    def busy(self) -> bool:
+        return self._current is not None or bool(self._pending) or bool(self._batch)
+
+    # -------------------- LISTENER SIDE (never blocks) --------------------
+    def recording_started(self):
+        """Apply the policy for a recording that starts while jobs are outstanding"""
+        with self._cond:
+            if not self._current and not self._pending:
+                return
+            if self.policy == POLICY_PREEMPT:
+                dropped = len(self._pending) + len(self._batch) + (1 if self._current else 0)
+                self._cancel_all()
+                logger.info(f"New recording preempted {dropped} job(s)")
+            elif self.policy == POLICY_MERGE:
+                target = self._pending[-1] if self._pending else self._current
+                if target and not target.sealed:
+                    target.expecting_part = True
+                    self._merge_target = target
+
+    def submit(self, part: Any, final: bool = True) -> bool:
+        """Queue a finished recording; returns False if it had to be rejected
+
+        With final=False the part is the first chunk of a recording that goes
+        on, and further submits are appended to the same job until one is final.
+        """
+        with self._cond:
+            job = self._open_job
+            if job is not None:
+                if final:
+                    self._open_job = None
+                    job.expecting_part = False
+                if not job.sealed and not job.cancelled.is_set():
+                    job.parts.append(part)
+                    self._cond.notify_all()
+                    return True
+                self._open_job = None
+
+            target, self._merge_target = self._merge_target, None
+            if target:
+                target.expecting_part = False
+                if not target.sealed and not target.cancelled.is_set():
+                    target.parts.append(part)
+                    logger.info(f"Recording merged into job #{target.id} ({len(target.parts)} parts)")
+                    self._cond.notify_all()
+                    return True
+
+            if len(self._pending) >= self.max_pending:
+                logger.warning(f"Transcription queue full ({self.max_pending} pending) - recording dropped")
+                self._discard_parts([part])
+                return False
+
+            job = TranscriptionJob(part)
+            if not final:
+                job.expecting_part = True
+                self._open_job = job
+            self._pending.append(job)
+            self._cond.notify_all()
+            if self._current or len(self._pending) > 1:
+                logger.info(f"Job #{job.id} queued behind {len(self._pending) - 1 + (1 if self._current else 0)} job(s)")
+            return True
+
+    # -------------------- WORKER THREAD --------------------
+    def _cancel_all(self):
+        for job in self._pending:
+            job.cancelled.set()
+            self._discard_parts(job.parts)
+        self._pending.clear()
+        if self._current:
+            self._current.cancelled.set()
+        for job in self._batch:
+            job.cancelled.set()
+        self._merge_target = None
+        self._open_job = None
+
+    def _discard_parts(self, parts):
+        if not self._discard:
+            return
+        for part in parts:
+            try:
+                self._discard(part)
+            except Exception as e:
+                logger.warning(f"Failed to discard recording: {e}")
+
+    def _next_part(self, job: TranscriptionJob, index: int):
+        """Return the next part to decode, or None once the job is complete"""
+        with self._cond:
+            deadline = time.time() + MERGE_WAIT_SEC
+            while index >= len(job.parts) and job.expecting_part and not job.cancelled.is_set():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    job.expecting_part = False
+                    break
+                self._cond.wait(remaining)
+            if job.cancelled.is_set() or index >= len(job.parts):
+                job.sealed = True
+                return None
+            return job.parts[index]
+
+    def _batchable(self, job: TranscriptionJob) -> bool:
+        return len(job.parts) == 1 and not job.expecting_part and not job.cancelled.is_set()
+
+    def _take_batch(self, job: TranscriptionJob) -> List[TranscriptionJob]:
+        """Jobs queued right behind job that can be decoded with it (called under the lock)"""
+        if not self._decode_batch or self.max_batch <= 1 or not self._batchable(job):
+            return []
+        deadline = time.time() + self.batch_window_sec
+        while self._running and len(self._pending) < self.max_batch - 1:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+        if not self._batchable(job):
+            return []  # A recording started meanwhile is being merged into it
+        batch = []
+        # Contiguous from the front of the queue, so texts are delivered in order
+        while self._pending and len(batch) < self.max_batch - 1 and self._batchable(self._pending[0]):
+            batch.append(self._pending.popleft())
+        return batch
+
+    def _run_batch(self, jobs: List[TranscriptionJob]):
+        try:
+            texts = self._decode_batch([job.parts[0] for job in jobs], jobs)
+            for job, text in zip(jobs, texts):
+                if job.cancelled.is_set():
+                    logger.info(f"Job #{job.id} cancelled")
+                elif text:
+                    self._deliver(job, text)
+        except Exception as e:
+            logger.error(f"Batched transcription of jobs {', '.join(f'#{job.id}' for job in jobs)} failed: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                job = self._pending.popleft()
+                job.started_at = time.time()
+                self._current = job
+                batch = self._take_batch(job)
+                for other in batch:
+                    other.started_at = job.started_at
+                    other.sealed = True
+                self._batch = batch
+                if batch:
+                    job.sealed = True
+
+            if batch:
+                logger.info(f"Decoding jobs {', '.join(f'#{j.id}' for j in [job] + batch)} as one batch")
+                try:
+                    self._run_batch([job] + batch)
+                finally:
+                    with self._cond:
+                        self._current = None
+                        self._batch = []
+                continue
+
+            texts = []
+            index = 0
+            try:
+                while True:
+                    part = self._next_part(job, index)
+                    if part is None:
+                        break
+                    index += 1
+                    text = self._decode(part, job)
+                    if text:
+                        texts.append(text)
+                if job.cancelled.is_set():
+                    self._discard_parts(job.parts[index:])
+                    logger.info(f"Job #{job.id} cancelled")
+                elif texts:
+                    self._deliver(job, " ".join(texts))
+            except Exception as e:
+                logger.error(f"Transcription job #{job.id} failed: {e}")
+            finally:
+                with self._cond:
+                    self._current = None
@@ -0,0 +1,172 @@
+"""Shared fixtures for the performance tests: the service wired to fakes, and the saved baseline.
+
+Run from the repository root:
+
+    python -m pytest tests
+    python -m pytest tests --update-baseline   # after an intended change, then commit perf_baseline.json
+"""
+import json
+import os
+import platform
+import queue
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from fakes import FakeSoundDevice, FakeWhisperModel, fake_loader  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-baseline", action="store_true",
+                     help="Write this run's measurements to perf_baseline.json instead of checking them")
+
+
+# -------------------- BASELINE --------------------
+class Baseline:
+    """Saved measurements that later runs must not exceed
+
+    Every metric is lower-is-better. A run fails when a measurement is above
+    value * (1 + tolerance) + slack. Timings get a wide tolerance because
+    machines differ; allocation counts are nearly deterministic and get a
+    narrow one.
+    """
+
+    def __init__(self, path: str, update: bool):
+        self.path = path
+        self.update = update
+        self.metrics = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.metrics = json.load(f).get("metrics", {})
+        self.measured = {}
+
+    def check(self, name: str, value: float, tolerance: float, slack: float = 0.0):
+        """Compare one measurement with its baseline (or record it with --update-baseline)"""
+        self.measured[name] = value
+        if self.update:
+            entry = self.metrics.get(name, {})
+            self.metrics[name] = {"value": round(value, 3), "tolerance": entry.get("tolerance", tolerance),
+                                  "slack": entry.get("slack", slack)}
+            return
+        entry = self.metrics.get(name)
+        if entry is None:
+            pytest.fail(f"No baseline for {name} - run the suite with --update-baseline and commit {os.path.basename(self.path)}")
+        limit = entry["value"] * (1 + entry["tolerance"]) + entry["slack"]
+        assert value <= limit, f"{name} regressed: {value:.3f} > {limit:.3f} (baseline {entry['value']})"
+
+    def save(self):
+        data = {
+            "_comment": "Written by `python -m pytest tests --update-baseline`; lower is better for every metric",
+            "machine": {"python": platform.python_version(), "system": platform.system(),
+                        "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()},
+            "metrics": dict(sorted(self.metrics.items())),
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    saved = Baseline(BASELINE_FILE, request.config.getoption("--update-baseline"))
+    request.config._perf_baseline = saved
+    yield saved
+    if saved.update:
+        saved.save()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    saved = getattr(config, "_perf_baseline", None)
+    if saved is None or not saved.measured:
+        return
+    terminalreporter.section("performance")
+    for name, value in sorted(saved.measured.items()):
+        entry = saved.metrics.get(name)
+        reference = f"baseline {entry['value']}" if entry else "no baseline"
+        terminalreporter.write_line(f"{name:<48} {value:>12.3f}   ({reference})")
+    if saved.update:
+        terminalreporter.write_line(f"Baseline written to {saved.path}")
+
+
+# -------------------- SERVICE --------------------
+class Service:
+    """The hotkey service's module state, wired to a fake model, sound device and platform"""
+
+    def __init__(self, jw, model: FakeWhisperModel):
+        self.jw = jw
+        self.model = model
+        self.stream = None
+        self.deliveries = queue.Queue()
+
+    def deliver(self, job, text):
+        self.jw.deliver_text(job, text)
+        self.deliveries.put((time.perf_counter(), text))
+
+    def open_stream(self, sd: FakeSoundDevice = None):
+        """Start capture on a fake device (16 kHz mono unless given)"""
+        self.stream = self.jw.open_audio_stream(sd or FakeSoundDevice())
+        return self.stream
+
+    def dictate(self, audio, command: bool = False, realtime: bool = False) -> float:
+        """Hold the hotkey while audio plays, then release it; returns when it was released"""
+        self.jw.start_recording(command=command)
+        self.stream.play(audio, realtime=realtime)
+        released = time.perf_counter()
+        self.jw.stop_recording_and_transcribe()
+        return released
+
+    def wait_delivery(self, timeout: float = 10.0):
+        """(perf_counter time, text) of the next delivered job"""
+        return self.deliveries.get(timeout=timeout)
+
+    @property
+    def window_text(self) -> str:
+        return self.jw.platform_backend.window_text
+
+
+@pytest.fixture
+def service(monkeypatch):
+    import jwhisper as jw
+    from jwhisper_audio import RingBuffer
+    from jwhisper_models import ModelPool
+    from jwhisper_platform import NullPlatform
+    from jwhisper_worker import TranscriptionWorker
+
+    model = FakeWhisperModel()
+    state = Service(jw, model)
+    monkeypatch.setattr(jw, "platform_backend", NullPlatform())
+    monkeypatch.setattr(jw, "audio_ring", RingBuffer(int(jw.RING_BUFFER_SEC * jw.SAMPLE_RATE)))
+    monkeypatch.setattr(jw, "preroll_samples", int(jw.PREROLL_MS * jw.SAMPLE_RATE / 1000))
+    monkeypatch.setattr(jw, "last_recording_end", 0)
+    monkeypatch.setattr(jw, "recording_flag", False)
+    monkeypatch.setattr(jw, "current_recording", None)
+    monkeypatch.setattr(jw, "capture_converter", None)
+    monkeypatch.setattr(jw, "model_pool", ModelPool("cpu", "int8", loader=fake_loader(model)))
+    monkeypatch.setattr(jw, "text_inserter", None)
+    monkeypatch.setattr(jw, "command_matcher", jw.CommandMatcher(jw.COMMANDS, jw.COMMAND_MIN_SCORE))
+    jw.text_inserter = jw.create_inserter()
+    worker = TranscriptionWorker(
+        jw.transcribe_recording,
+        state.deliver,
+        discard=jw.Recording.cancel,
+        max_pending=jw.WORKER_MAX_PENDING,
+        policy=jw.WORKER_POLICY,
+        decode_batch=jw.transcribe_recordings,
+        max_batch=jw.BATCH_MAX_SIZE,
+        batch_window_sec=jw.BATCH_WINDOW_SEC,
+    )
+    monkeypatch.setattr(jw, "transcription_worker", worker)
+    worker.start()
+    jw.model_ready.set()
+    try:
+        yield state
+    finally:
+        jw.model_ready.clear()
+        worker.stop()
+        if jw.capture_converter is not None:
+            jw.capture_converter.stop()
@@ -0,0 +1,194 @@
+"""Stand-ins for the Whisper model, the sound device and a speaker.
+
+They let the performance tests drive the hotkey service's real capture,
+queueing, gating, decoding and insertion code without a microphone, a GPU,
+Windows or a model download.
+"""
+import os
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# WAV/NPY recordings to run through the pipeline besides synthetic speech
+RECORDED_AUDIO_ENV = "JWHISPER_TEST_AUDIO"
+
+
+# -------------------- MODEL --------------------
+class FakeSegment:
+    def __init__(self, text: str, start: float, end: float):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.no_speech_prob = 0.01
+        self.avg_logprob = -0.2
+
+
+class FakeInfo:
+    def __init__(self, language: str, duration: float):
+        self.language = language
+        self.language_probability = 0.99
+        self.duration = duration
+
+
+class FakeWhisperModel:
+    """Answers every clip with the same text after a controllable delay
+
+    The delay is delay_sec plus sec_per_audio_sec for every second of audio,
+    so tests can tell the time spent "decoding" from the pipeline's own
+    overhead. decode_sec totals the time spent in transcribe.
+    """
+
+    def __init__(self, text: str = " Hello world.", delay_sec: float = 0.0, sec_per_audio_sec: float = 0.0,
+                 language: str = "en"):
+        self.text = text
+        self.delay_sec = delay_sec
+        self.sec_per_audio_sec = sec_per_audio_sec
+        self.language = language
+        self.calls: List[int] = []  # Samples per decoded clip
+        self.decode_sec = 0.0
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio: np.ndarray, **options):
+        duration = len(audio) / SAMPLE_RATE
+        delay = self.delay_sec + self.sec_per_audio_sec * duration
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.calls.append(len(audio))
+            self.decode_sec += delay
+        segment = FakeSegment(self.text, 0.0, duration)
+        return iter([segment]), FakeInfo(options.get("language") or self.language, duration)
+
+    def transcribe_batch(self, clips: Sequence[np.ndarray], options: Optional[dict] = None):
+        # Same hook the inference server's remote models use
+        results = []
+        for clip in clips:
+            segments, info = self.transcribe(clip, **(options or {}))
+            results.append((list(segments), info))
+        return results
+
+
+def fake_loader(model: FakeWhisperModel):
+    """ModelPool loader that hands out model for every name"""
+    def load(name, device, compute_type, **kwargs):
+        return model
+    return load
+
+
+# -------------------- SOUND DEVICE --------------------
+class FakeInputStream:
+    """sounddevice.InputStream that is fed by play() instead of a microphone"""
+
+    def __init__(self, callback, channels: int, samplerate: int, dtype: str = "float32", **kwargs):
+        self.callback = callback
+        self.channels = channels
+        self.samplerate = samplerate
+        self.dtype = dtype
+        self.active = False
+        self.closed = False
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.closed = True
+
+    def play(self, audio: np.ndarray, block_sec: float = 0.01, realtime: bool = False) -> List[float]:
+        """Deliver audio to the callback in blocks, returning the seconds each callback took
+
+        audio is at the stream's rate, mono or (frames, channels). Like a real
+        device, every block is a fresh slice of one buffer the callback must
+        not keep. realtime=True paces the blocks like a live microphone.
+        """
+        if audio.ndim == 1:
+            audio = to_device(audio, self.channels)
+        frames = max(1, int(round(block_sec * self.samplerate)))
+        timings = []
+        start = time.perf_counter()
+        for i, offset in enumerate(range(0, len(audio), frames)):
+            block = audio[offset:offset + frames]
+            if realtime:
+                wait = start + i * block_sec - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            call_start = time.perf_counter()
+            self.callback(block, len(block), None, None)
+            timings.append(time.perf_counter() - call_start)
+        return timings
+
+
+class FakeSoundDevice:
+    """Takes the place of the sounddevice module for open_audio_stream"""
+
+    def __init__(self, samplerate: int = SAMPLE_RATE, channels: int = 1,
+                 reject: Sequence[Tuple[int, int]] = ()):
+        """
+        Args:
+            samplerate: The device's default rate
+            channels: The device's input channels
+            reject: (rate, channels) formats that fail to open, like an exclusive-mode device
+        """
+        self.samplerate = samplerate
+        self.channels = channels
+        self.reject = set(reject)
+        self.streams: List[FakeInputStream] = []
+
+    def query_devices(self, kind: Optional[str] = None) -> dict:
+        return {"name": "Fake microphone", "default_samplerate": float(self.samplerate),
+                "max_input_channels": self.channels}
+
+    def InputStream(self, callback, channels: int, samplerate: int, dtype: str = "float32", **kwargs):
+        if (samplerate, channels) in self.reject:
+            raise RuntimeError(f"Invalid sample rate or channel count ({samplerate} Hz x{channels})")
+        stream = FakeInputStream(callback, channels, samplerate, dtype, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+
+# -------------------- AUDIO --------------------
+def synthetic_speech(seconds: float, rate: int = SAMPLE_RATE, seed: int = 0, lead_sec: float = 0.3) -> np.ndarray:
+    """Speech-like float32 audio: voiced syllables at about 4 Hz between quiet lead-in and tail
+
+    Each syllable is a few harmonics of a wandering pitch under a smooth
+    envelope, over a faint noise floor, so gating and energy VAD treat it
+    like a real utterance.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    speech = t >= lead_sec
+    speech &= t < seconds - lead_sec
+    audio = 0.15 * voiced * envelope * speech + 0.002 * rng.standard_normal(n)
+    return audio.astype(np.float32)
+
+
+def to_device(audio: np.ndarray, channels: int) -> np.ndarray:
+    """Mono audio as the (frames, channels) float32 blocks a device delivers, the same signal on every channel"""
+    if channels == 1:
+        return np.ascontiguousarray(audio, dtype=np.float32).reshape(-1, 1)
+    return np.ascontiguousarray(np.repeat(audio[:, None], channels, axis=1), dtype=np.float32)
+
+
+def recorded_clips() -> List[str]:
+    """Recordings named by JWHISPER_TEST_AUDIO (a directory or file); empty when unset"""
+    path = os.environ.get(RECORDED_AUDIO_ENV)
+    if not path:
+        return []
+    from jwhisper_bench import find_fixtures
+    return find_fixtures([path])
+
+
+def load_clip(path: str) -> np.ndarray:
+    from jwhisper_bench import load_fixture
+    return load_fixture(path)
@@ -0,0 +1,151 @@
+"""Capture buffers, resampling and silence trimming."""
+import numpy as np
+import pytest
+
+from jwhisper_audio import CaptureConverter, PolyphaseResampler, RingBuffer, trim_silence
+from jwhisper_bench import (
+    MAX_ALIAS_DB, MIN_PASSBAND_SNR_DB, PASSBAND_TONES, RESAMPLER_RATES, SAMPLE_RATE, alias_db, tone_snr_db,
+)
+
+
+# -------------------- RING BUFFER --------------------
+def test_ring_buffer_wraparound_views_are_contiguous():
+    ring = RingBuffer(10)
+    ring.write(np.arange(7, dtype=np.float32))
+    ring.write(np.arange(7, 14, dtype=np.float32))
+    assert ring.write_pos == 14
+    assert ring.oldest_pos == 4
+    view = ring.view(4, 14)
+    np.testing.assert_array_equal(view, np.arange(4, 14))
+    assert not view.flags.writeable
+    np.testing.assert_array_equal(ring.view(8), np.arange(8, 14))
+
+
+def test_ring_buffer_clips_overwritten_positions():
+    ring = RingBuffer(10)
+    ring.write(np.arange(14, dtype=np.float32))
+    assert ring.is_valid(4)
+    assert not ring.is_valid(3)
+    np.testing.assert_array_equal(ring.view(0, 6), np.arange(4, 6))
+    assert len(ring.view(20)) == 0
+
+
+def test_ring_buffer_block_larger_than_capacity_keeps_newest():
+    ring = RingBuffer(10)
+    ring.write(np.arange(3, dtype=np.float32))
+    ring.write(np.arange(100, 125, dtype=np.float32))
+    assert ring.write_pos == 28
+    np.testing.assert_array_equal(ring.view(ring.oldest_pos), np.arange(115, 125))
+
+
+# -------------------- SILENCE TRIMMING --------------------
+def speech_with_pause(pause_sec: float, edge_sec: float = 0.5, burst_sec: float = 0.5) -> np.ndarray:
+    """Quiet noise, a tone burst, a pause, another burst and quiet noise"""
+    rng = np.random.default_rng(0)
+
+    def noise(seconds):
+        return 0.001 * rng.standard_normal(int(seconds * SAMPLE_RATE))
+
+    def burst():
+        t = np.arange(int(burst_sec * SAMPLE_RATE)) / SAMPLE_RATE
+        return 0.3 * np.sin(2 * np.pi * 220 * t)
+
+    parts = [noise(edge_sec), burst(), noise(pause_sec), burst(), noise(edge_sec)]
+    return np.concatenate(parts).astype(np.float32)
+
+
+def test_trim_silence_cuts_ends_to_a_view():
+    audio = speech_with_pause(0.3)
+    trimmed, removed = trim_silence(audio, SAMPLE_RATE)
+    # Both bursts and the short pause stay, with about padding_ms on each side
+    assert 1.3 + 0.4 <= len(trimmed) / SAMPLE_RATE <= 1.3 + 0.5
+    assert removed == pytest.approx((len(audio) - len(trimmed)) / SAMPLE_RATE)
+    assert np.shares_memory(trimmed, audio)
+
+
+def test_trim_silence_shortens_long_pauses():
+    audio = speech_with_pause(2.0)
+    trimmed, _ = trim_silence(audio, SAMPLE_RATE, padding_ms=200, max_pause_ms=1000)
+    # The 2 s pause shrinks to about 2 * padding_ms between the bursts
+    assert 1.0 + 0.4 + 0.4 <= len(trimmed) / SAMPLE_RATE <= 1.0 + 0.5 + 0.5
+
+    kept, _ = trim_silence(audio, SAMPLE_RATE, padding_ms=200, max_pause_ms=0)
+    assert 3.0 + 0.4 <= len(kept) / SAMPLE_RATE <= 3.0 + 0.5
+
+
+def test_trim_silence_digital_silence_is_empty():
+    trimmed, removed = trim_silence(np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+    assert len(trimmed) == 0
+    assert removed == 1.0
+
+
+# -------------------- RESAMPLER --------------------
+@pytest.mark.parametrize("rate", RESAMPLER_RATES)
+def test_resampler_passband_snr(rate):
+    passband = 0.94 * min(rate, SAMPLE_RATE) / 2
+    tones = [f for f in PASSBAND_TONES if f < 0.9 * passband]
+    for frequency in tones:
+        assert tone_snr_db(rate, frequency) >= MIN_PASSBAND_SNR_DB, f"{frequency} Hz"
+        # Odd-sized blocks, as the converter thread feeds it
+        assert tone_snr_db(rate, frequency, block=317) >= MIN_PASSBAND_SNR_DB, f"{frequency} Hz streamed"
+
+
+@pytest.mark.parametrize("rate", [rate for rate in RESAMPLER_RATES if rate > SAMPLE_RATE])
+def test_resampler_rejects_aliases(rate):
+    assert alias_db(rate) <= MAX_ALIAS_DB
+
+
+def test_resampler_streaming_matches_one_block():
+    x = np.random.default_rng(0).standard_normal(48000).astype(np.float32)
+    whole = PolyphaseResampler(48000, SAMPLE_RATE)
+    expected = np.concatenate([whole.process(x), whole.flush()])
+    streamed = PolyphaseResampler(48000, SAMPLE_RATE)
+    parts = [streamed.process(x[i:i + 441]) for i in range(0, len(x), 441)]
+    np.testing.assert_allclose(np.concatenate(parts + [streamed.flush()]), expected, atol=1e-5)
+
+
+# -------------------- CAPTURE CONVERTER --------------------
+def test_capture_converter_mixes_down_across_flushes():
+    out = RingBuffer(SAMPLE_RATE)
+    converter = CaptureConverter(out, SAMPLE_RATE, 2)
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal((1000, 2)).astype(np.float32)
+    for start, end in [(0, 7), (7, 300), (300, 301), (301, 1000)]:
+        converter.write(audio[start:end])
+        converter.flush()
+    converter.flush()  # Nothing new - writes nothing
+    np.testing.assert_allclose(out.view(0), audio.mean(axis=1), atol=1e-6)
+    assert converter.dropped_sec == 0.0
+
+
+def test_capture_converter_resamples_device_rate():
+    out = RingBuffer(SAMPLE_RATE * 2)
+    converter = CaptureConverter(out, 48000, 2)
+    tone = np.sin(2 * np.pi * 440 * np.arange(48000) / 48000).astype(np.float32)
+    stereo = np.stack([tone, tone], axis=1)
+    for start in range(0, len(stereo), 480):
+        converter.write(stereo[start:start + 480])
+        if start % 4800 == 0:
+            converter.flush()
+    converter.flush()
+    # Everything but the resampler's latency is out, in step with the input
+    latency = int(converter.resampler.latency_sec * SAMPLE_RATE) + 1
+    assert SAMPLE_RATE - latency <= out.write_pos <= SAMPLE_RATE
+    reference = np.sin(2 * np.pi * 440 * np.arange(out.write_pos) / SAMPLE_RATE)
+    np.testing.assert_allclose(out.view(0)[800:], reference[800:], atol=1e-3)
+
+
+def test_capture_converter_overrun_drops_oldest_whole_frames():
+    out = RingBuffer(SAMPLE_RATE)
+    converter = CaptureConverter(out, SAMPLE_RATE, 3, raw_buffer_sec=0.1)
+    audio = np.random.default_rng(0).standard_normal((4000, 3)).astype(np.float32)
+    for start in range(0, len(audio), 160):
+        converter.write(audio[start:start + 160])  # 0.25 s with no flush - the thread stalled
+    converter.flush()
+    assert converter.dropped_sec == pytest.approx(0.15)
+    # The newest 0.1 s survives, still on frame boundaries
+    np.testing.assert_allclose(out.view(0), audio[-1600:].mean(axis=1), atol=1e-6)
+
+    converter.write(audio[:10])
+    converter.flush()
+    np.testing.assert_allclose(out.view(1600), audio[:10].mean(axis=1), atol=1e-6)
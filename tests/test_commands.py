@@ -0,0 +1,74 @@
+"""Spoken command matching."""
+import numpy as np
+import pytest
+
+from fakes import FakeWhisperModel
+from jwhisper_commands import KIND_KEY, KIND_TEXT, Command, CommandMatcher, normalize_phrase
+
+COMMANDS = [
+    ("undo", KIND_KEY, "ctrl+z"),
+    ("redo", KIND_KEY, "ctrl+y"),
+    ("select all", KIND_KEY, "ctrl+a"),
+    ("new paragraph", KIND_TEXT, "\n\n"),
+]
+
+
+@pytest.fixture
+def matcher():
+    return CommandMatcher(COMMANDS, min_score=0.8)
+
+
+def test_normalize_phrase():
+    assert normalize_phrase("  Select ALL. ") == "select all"
+    assert normalize_phrase("New-paragraph!") == "new paragraph"
+    assert normalize_phrase("don't") == "don't"
+
+
+def test_exact_phrase_scores_one(matcher):
+    command, score = matcher.match(" Select all.")
+    assert command.value == "ctrl+a"
+    assert score == 1.0
+
+
+def test_near_miss_picks_the_closest_phrase(matcher):
+    command, score = matcher.match("Select alll")
+    assert command.phrase == "select all"
+    assert 0.8 <= score < 1.0
+
+
+def test_below_min_score_is_dictation(matcher):
+    command, score = matcher.match("Send the report tomorrow")
+    assert command is None
+    assert score < 0.8
+    assert matcher.match("...") == (None, 0.0)
+
+
+def test_min_score_is_inclusive():
+    score = CommandMatcher(COMMANDS, min_score=0.0).match("undone")[1]
+    assert CommandMatcher(COMMANDS, min_score=score).match("undone")[0].phrase == "undo"
+    assert CommandMatcher(COMMANDS, min_score=score + 1e-6).match("undone")[0] is None
+
+
+def test_prompt_lists_the_phrases(matcher):
+    assert matcher.prompt == "Undo, Redo, Select all, New paragraph."
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        Command("undo", "macro", "ctrl+z")
+
+
+def test_recognize_rejects_unsure_decodes(matcher):
+    audio = np.zeros(16000, dtype=np.float32)
+    assert matcher.recognize(FakeWhisperModel(" Undo."), audio).command.value == "ctrl+z"
+
+    class Unsure(FakeWhisperModel):
+        def transcribe(self, audio, **options):
+            segments, info = super().transcribe(audio, **options)
+            segments = list(segments)
+            segments[0].avg_logprob = -2.0
+            return iter(segments), info
+
+    match = matcher.recognize(Unsure(" Undo."), audio)
+    assert match.command is None
+    assert match.reason == "low confidence"
@@ -0,0 +1,75 @@
+"""Settings file validation."""
+import json
+
+import pytest
+
+from jwhisper_config import RESTART, SETTINGS, ConfigError, load_config, validate
+
+
+def test_validate_normalizes_values():
+    values = validate({
+        "_comment": "ignored",
+        "BEAM_SIZE": 3.0,
+        "CHUNK_SEC": 10,
+        "CAPTURE_SAMPLE_RATE": None,
+        "WHISPER_DEVICE": "cuda",
+        "INFERENCE_CPU_CORES": [0, 2],
+    })
+    assert values == {"BEAM_SIZE": 3, "CHUNK_SEC": 10.0, "CAPTURE_SAMPLE_RATE": None,
+                      "WHISPER_DEVICE": "cuda", "INFERENCE_CPU_CORES": [0, 2]}
+    assert isinstance(values["BEAM_SIZE"], int)
+    assert isinstance(values["CHUNK_SEC"], float)
+
+
+@pytest.mark.parametrize("name, value, reason", [
+    ("BEAM_SIZE", 1.5, "must be a whole number"),
+    ("BEAM_SIZE", 0, "must be at least 1"),
+    ("CHUNK_SEC", 31, "must be at most 30"),
+    ("CHUNK_SEC", True, "must be a number"),
+    ("CHUNK_SEC", None, "must be a number"),
+    ("WHISPER_DEVICE", "tpu", "must be one of cpu, cuda, auto"),
+    ("WARMUP_ENABLED", 1, "must be true or false"),
+    ("INFERENCE_CPU_CORES", [0, -1], "must be a list of non-negative whole numbers"),
+    ("WORKER_MAX_PENDING", 0, "must be at least 1"),
+])
+def test_validate_rejects_bad_values(name, value, reason):
+    with pytest.raises(ConfigError, match=f"{name}: {reason}"):
+        validate({name: value})
+
+
+def test_validate_lists_every_problem():
+    with pytest.raises(ConfigError) as error:
+        validate({"BEAM_SIZE": "five", "NO_SUCH_SETTING": 1, "CHUNK_SEC": 10})
+    message = str(error.value)
+    assert "BEAM_SIZE: must be a number" in message
+    assert "NO_SUCH_SETTING: unknown setting" in message
+    assert "CHUNK_SEC" not in message
+
+
+def test_validate_rows():
+    commands = [["undo", "key", "ctrl+z"], ["sign off", "text", "Best regards"]]
+    assert validate({"COMMANDS": commands}) == {"COMMANDS": [tuple(row) for row in commands]}
+    with pytest.raises(ConfigError, match="COMMANDS: row 1 must have 3 values"):
+        validate({"COMMANDS": [["undo", "key"]]})
+    with pytest.raises(ConfigError, match="COMMANDS: row 2: must be one of key, text"):
+        validate({"COMMANDS": [["undo", "key", "ctrl+z"], ["redo", "macro", "ctrl+y"]]})
+
+
+def test_validate_needs_an_object():
+    with pytest.raises(ConfigError, match="JSON object"):
+        validate([1, 2])
+
+
+def test_load_config(tmp_path):
+    path = tmp_path / "jwhisper_config.json"
+    assert load_config(str(path)) == {}
+    path.write_text(json.dumps({"MIN_SPEECH_SEC": 0.3}), encoding="utf-8")
+    assert load_config(str(path)) == {"MIN_SPEECH_SEC": 0.3}
+    path.write_text("{not json", encoding="utf-8")
+    with pytest.raises(ConfigError, match="can't read jwhisper_config.json"):
+        load_config(str(path))
+
+
+def test_capture_layout_needs_a_restart():
+    for name in ("RING_BUFFER_SEC", "PREROLL_MS", "CAPTURE_SAMPLE_RATE", "CHANNELS"):
+        assert SETTINGS[name].reload == RESTART
@@ -0,0 +1,46 @@
+"""Settings file changes applied to the running service."""
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def jw(monkeypatch):
+    import jwhisper as jw
+    monkeypatch.setattr(jw, "restart_pending", {})
+    monkeypatch.setattr(jw, "transcription_worker", None)
+    return jw
+
+
+def restart_warnings(caplog):
+    return [record.getMessage() for record in caplog.records if "Restart JWhisper to apply" in record.getMessage()]
+
+
+def test_removed_restart_setting_asks_for_restart(jw, monkeypatch, caplog):
+    # Started with METRICS_FLUSH_SEC from the file, then the line is deleted
+    monkeypatch.setattr(jw, "METRICS_FLUSH_SEC", 30)
+    with caplog.at_level(logging.WARNING, logger="JWhisperHotkey"):
+        jw.apply_settings({})
+    assert restart_warnings(caplog) == ["Restart JWhisper to apply: METRICS_FLUSH_SEC"]
+    assert jw.restart_pending == {"METRICS_FLUSH_SEC": jw.DEFAULT_SETTINGS["METRICS_FLUSH_SEC"]}
+    assert jw.METRICS_FLUSH_SEC == 30  # Still the running value until a restart
+
+
+def test_restart_setting_returned_to_running_value_is_no_longer_pending(jw, monkeypatch, caplog):
+    monkeypatch.setattr(jw, "METRICS_FLUSH_SEC", 30)
+    jw.apply_settings({"METRICS_FLUSH_SEC": 60})
+    assert jw.restart_pending == {"METRICS_FLUSH_SEC": 60}
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="JWhisperHotkey"):
+        jw.apply_settings({"METRICS_FLUSH_SEC": 30})
+        jw.apply_settings({"METRICS_FLUSH_SEC": 30})
+    assert restart_warnings(caplog) == []
+    assert jw.restart_pending == {}
+
+
+def test_pending_restart_setting_warns_once(jw, caplog):
+    with caplog.at_level(logging.WARNING, logger="JWhisperHotkey"):
+        jw.apply_settings({"METRICS_FLUSH_SEC": 60})
+        jw.apply_settings({"METRICS_FLUSH_SEC": 60})
+    assert restart_warnings(caplog) == ["Restart JWhisper to apply: METRICS_FLUSH_SEC"]